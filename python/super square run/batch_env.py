@@ -0,0 +1,602 @@
+"""Vectorized batch version of the engine for reinforcement-learning rollouts.
+
+BatchEnv keeps N parallel runs in NumPy arrays and steps all of them at once.
+The rules are the same as engine.Simulation (Dinosaur.update, Obstacle.update,
+update_difficulty, collisions and spawning, with the fairness check on double
+obstacles). Spawns read the same level generator streams as the engine, kept
+as one array chunk per env, so an env reset with seed s plays exactly like
+Simulation(s) given the same inputs (tests/test_batch_env.py checks this).
+The difficulty curve's level rows are copied into arrays indexed by level.
+Clouds are left out because they never affect gameplay.
+"""
+from itertools import accumulate
+
+import numpy as np
+
+from engine import (SCREEN_WIDTH, SCREEN_HEIGHT, GROUND_HEIGHT, GRAVITY, JUMP_FORCE,
+                    GAME_SPEED_INITIAL, CACTUS_MIN_HEIGHT, CACTUS_MAX_HEIGHT, ACTION_JUMP,
+                    ACTION_DUCK, ACTION_SHOOT, Dinosaur, Obstacle, BUFF_TYPES, BUFFS_BY_NAME,
+                    EARLY_BUFF_TYPES, LATE_BUFF_TYPES, obstacles_are_fair)
+from difficulty import DEFAULT_CURVE
+from levelgen import LevelGenerator, chunk_draws
+
+GROUND_Y = SCREEN_HEIGHT - GROUND_HEIGHT
+
+# Buff columns in the buff arrays, in engine.BUFF_TYPES order
+BUFF_NAMES = [buff.name for buff in BUFF_TYPES]
+DOUBLE_JUMP = BUFFS_BY_NAME["double_jump"].index
+GIANT = BUFFS_BY_NAME["giant"].index
+INVINCIBLE = BUFFS_BY_NAME["invincible"].index
+WEAPON = BUFFS_BY_NAME["weapon"].index
+
+_dino = Dinosaur()
+DINO_X = _dino.x
+DINO_WIDTH = _dino.width
+NORMAL_HEIGHT = _dino.normal_height
+DUCK_HEIGHT = _dino.duck_height
+BUFF_MAX_TIME = np.array([buff.duration for buff in BUFF_TYPES])
+del _dino
+
+# Pickup types as BUFF_NAMES columns (their weights come from the curve)
+EARLY_TYPES = np.array([BUFF_NAMES.index(name) for name in EARLY_BUFF_TYPES])
+LATE_TYPES = np.array([BUFF_NAMES.index(name) for name in LATE_BUFF_TYPES])
+
+MAX_BULLETS = 3
+BULLET_WIDTH = 20
+BULLET_HEIGHT = 8
+BUFF_SIZE = 28
+INFINITY = np.inf
+
+def roll_ints(rolls, low, high):
+    """engine.roll_int over arrays."""
+    return low + (rolls * (high - low + 1)).astype(np.int64)
+
+def roll_choices(rolls, types, weights):
+    """engine.roll_choice over arrays, with cumulative weights."""
+    return types[np.searchsorted(weights[:-1], rolls * weights[-1], side="right")]
+
+def sweep_times(x, y, width, height, dx, dy, other_x, other_y, other_width, other_height,
+                other_dx, other_dy):
+    """collision.sweep over arrays: the time of impact of each pair of boxes, INFINITY for
+    the pairs that don't meet during the tick."""
+    enter = np.zeros(np.broadcast_shapes(np.shape(x), np.shape(other_x), np.shape(y), np.shape(other_y)))
+    leave = np.full_like(enter, INFINITY)
+    for start, size, step, other_start, other_size in ((x, width, dx - other_dx, other_x, other_width),
+                                                      (y, height, dy - other_dy, other_y, other_height)):
+        still = step == 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            first = (other_start - size - start) / step
+            last = (other_start + other_size - start) / step
+        # Not moving along this axis: overlapping the whole tick or not at all
+        apart = (start >= other_start + other_size) | (start + size <= other_start)
+        low = np.where(still, np.where(apart, INFINITY, -INFINITY), np.minimum(first, last))
+        high = np.where(still, np.where(apart, -INFINITY, INFINITY), np.maximum(first, last))
+        np.maximum(enter, low, out=enter)
+        np.minimum(leave, high, out=leave)
+    hit = (enter < leave) & (enter < 1) & (leave > 0)
+    return np.where(hit, enter, INFINITY)
+
+class LevelTables:
+    """A curve's level rows as arrays, so a whole batch can look up its levels at once.
+    Grows when a run gets past the last level in it."""
+
+    def __init__(self, curve, levels=32):
+        self.curve = curve
+        self.size = 0
+        self.grow(levels)
+
+    def grow(self, levels):
+        rows = [self.curve.row(level) for level in range(levels)]
+        self.speed = np.array([row.speed for row in rows])
+        self.obstacle_frequency = np.array([row.obstacle_frequency for row in rows], dtype=np.int64)
+        self.score_per_tick = np.array([row.score_per_tick for row in rows])
+        self.cactus_chance = np.array([row.cactus_chance for row in rows])
+        self.double_chance = np.array([row.double_chance for row in rows])
+        self.size_base = np.array([row.size for row in rows])
+        bird_range = np.array([row.bird_range for row in rows], dtype=np.int64)
+        self.bird_top, self.bird_middle, self.bird_bottom = bird_range.T
+        self.buff_chance = np.array([row.buff_chance for row in rows])
+        self.buff_hard_chance = np.array([row.buff_heights[0] for row in rows])
+        hard = np.array([row.buff_heights[1] for row in rows], dtype=np.int64)
+        easy = np.array([row.buff_heights[2] for row in rows], dtype=np.int64)
+        self.buff_hard_low, self.buff_hard_high = hard.T
+        self.buff_easy_low, self.buff_easy_high = easy.T
+        self.size = levels
+
+    def cover(self, level):
+        if level >= self.size:
+            self.grow(max(level + 1, self.size * 2))
+
+class SpawnArrays:
+    """One levelgen.SpawnStream per env: each env's current chunk of records in one array.
+    A chunk is made when an env gets to it, so a reset costs nothing."""
+
+    def __init__(self, stream, num_envs):
+        self.name = stream.name
+        self.record_size = stream.record_size
+        self.chunk_size = stream.chunk_size
+        self.records = np.zeros((num_envs, self.chunk_size, self.record_size))
+        # The same memory with one row of draws per env, to copy a new chunk straight in
+        self.draws = self.records.reshape(num_envs, -1)
+        self.seeds = np.zeros(num_envs, dtype=np.int64)
+        self.index = np.zeros(num_envs, dtype=np.int64)
+        self.position = np.zeros(num_envs, dtype=np.int64)
+
+    def reset(self, rows, seeds):
+        self.seeds[rows] = seeds
+        self.index[rows] = -1
+        self.position[rows] = self.chunk_size
+
+    def next(self, rows):
+        """The next record of each of these envs, one row each."""
+        for row in rows[self.position[rows] == self.chunk_size]:
+            self.index[row] += 1
+            self.draws[row] = chunk_draws(int(self.seeds[row]), self.name, int(self.index[row]),
+                                          self.chunk_size * self.record_size)
+            self.position[row] = 0
+        records = self.records[rows, self.position[rows]]
+        self.position[rows] += 1
+        return records
+
+class BatchEnv:
+    def __init__(self, num_envs, seed=None, max_obstacles=12, max_buffs=5, curve=None):
+        self.num_envs = num_envs
+        self.max_obstacles = max_obstacles
+        self.max_buffs = max_buffs
+        # Only picks the seed of each run; the runs themselves use the level generator streams
+        self.rng = np.random.default_rng(seed)
+        self.seeds = np.zeros(num_envs, dtype=np.int64)
+        generator = LevelGenerator()
+        self.obstacle_spawns = SpawnArrays(generator.obstacles, num_envs)
+        self.buff_spawns = SpawnArrays(generator.buffs, num_envs)
+        self.gate_spawns = SpawnArrays(generator.gates, num_envs)
+        self.curve = curve or DEFAULT_CURVE
+        self.levels = LevelTables(self.curve)
+        # The cumulative weights engine.roll_choice uses
+        self.early_weights = np.array(list(accumulate(self.curve.early_buff_weights)))
+        self.late_weights = np.array(list(accumulate(self.curve.late_buff_weights)))
+
+        n = num_envs
+        # One extra obstacle slot: a double spawn can go one over max_obstacles
+        o = max_obstacles + 1
+
+        # Run state
+        self.score = np.zeros(n)
+        self.game_speed = np.zeros(n)
+        self.distance_traveled = np.zeros(n)
+        self.game_time = np.zeros(n, dtype=np.int64)
+        self.difficulty_level = np.zeros(n, dtype=np.int64)
+        self.obstacle_frequency = np.zeros(n, dtype=np.int64)
+        self.obstacle_timer = np.zeros(n, dtype=np.int64)
+        self.buff_timer = np.zeros(n, dtype=np.int64)
+        self.done = np.zeros(n, dtype=bool)
+        # Double obstacles spawned, and dropped by the fairness check
+        self.double_obstacles = np.zeros(n, dtype=np.int64)
+        self.unfair_doubles = np.zeros(n, dtype=np.int64)
+
+        # Dinosaur
+        self.dino_y = np.zeros(n)
+        self.dino_vy = np.zeros(n)
+        self.dino_height = np.zeros(n, dtype=np.int64)
+        self.is_jumping = np.zeros(n, dtype=bool)
+        self.is_ducking = np.zeros(n, dtype=bool)
+        self.jumps_remaining = np.zeros(n, dtype=np.int64)
+        self.buff_active = np.zeros((n, len(BUFF_NAMES)), dtype=bool)
+        self.buff_time = np.zeros((n, len(BUFF_NAMES)), dtype=np.int64)
+
+        # Bullets
+        self.bullet_x = np.zeros((n, MAX_BULLETS))
+        self.bullet_y = np.zeros((n, MAX_BULLETS))
+        self.bullet_alive = np.zeros((n, MAX_BULLETS), dtype=bool)
+
+        # Obstacles (obs_seq keeps the spawn order, which decides bullet hits)
+        self.obs_x = np.zeros((n, o))
+        self.obs_y = np.zeros((n, o))
+        self.obs_w = np.zeros((n, o))
+        self.obs_h = np.zeros((n, o))
+        self.obs_bird = np.zeros((n, o), dtype=bool)
+        self.obs_speed_mult = np.ones((n, o))
+        self.obs_alive = np.zeros((n, o), dtype=bool)
+        self.obs_passed = np.zeros((n, o), dtype=bool)
+        self.obs_destroyed = np.zeros((n, o), dtype=bool)
+        self.obs_seq = np.zeros((n, o), dtype=np.int64)
+        self.spawn_count = np.zeros(n, dtype=np.int64)
+
+        # Buff pickups on the track
+        self.item_x = np.zeros((n, max_buffs))
+        self.item_y = np.zeros((n, max_buffs))
+        self.item_type = np.zeros((n, max_buffs), dtype=np.int64)
+        self.item_alive = np.zeros((n, max_buffs), dtype=bool)
+        self.item_collected = np.zeros((n, max_buffs), dtype=bool)
+
+        self.reset()
+
+    def reset(self, mask=None, seeds=None):
+        """Restart the runs selected by the boolean mask (all runs by default), on the given
+        seeds (one per selected run) or on new ones."""
+        if mask is None:
+            mask = np.ones(self.num_envs, dtype=bool)
+        rows = np.flatnonzero(mask)
+        if seeds is None:
+            seeds = self.rng.integers(1 << 32, size=rows.size)
+        self.seeds[rows] = seeds
+        for spawns in (self.obstacle_spawns, self.buff_spawns, self.gate_spawns):
+            spawns.reset(rows, seeds)
+
+        self.score[mask] = 0
+        self.game_speed[mask] = GAME_SPEED_INITIAL
+        self.distance_traveled[mask] = 0
+        self.game_time[mask] = 0
+        self.difficulty_level[mask] = 1
+        self.obstacle_frequency[mask] = self.curve.base_obstacle_frequency
+        self.obstacle_timer[mask] = 0
+        self.buff_timer[mask] = 0
+        self.done[mask] = False
+        self.double_obstacles[mask] = 0
+        self.unfair_doubles[mask] = 0
+
+        self.dino_y[mask] = GROUND_Y - NORMAL_HEIGHT
+        self.dino_vy[mask] = 0
+        self.dino_height[mask] = NORMAL_HEIGHT
+        self.is_jumping[mask] = False
+        self.is_ducking[mask] = False
+        self.jumps_remaining[mask] = 2
+        self.buff_active[mask] = False
+        self.buff_time[mask] = 0
+
+        self.bullet_alive[mask] = False
+        self.obs_alive[mask] = False
+        self.obs_passed[mask] = False
+        self.obs_destroyed[mask] = False
+        self.spawn_count[mask] = 0
+        self.item_alive[mask] = False
+        self.item_collected[mask] = False
+
+    def step(self, actions):
+        """Advance every running env one tick.
+
+        actions is an int array of ACTION_* bitmasks, one per env. Returns the
+        score gained this tick and the done flags. Finished envs stay frozen
+        until reset() is called for them.
+        """
+        actions = np.asarray(actions)
+        live = ~self.done
+        start_score = self.score.copy()
+
+        self._apply_input(actions, live)
+        # Where the dino starts the tick, for the swept collision checks
+        self.dino_start_y = np.trunc(self.dino_y)
+        self._update_dinosaur(live)
+        self._update_difficulty(live)
+
+        # Faster speed increase
+        self.game_speed += (self.curve.game_speed_increment + np.minimum(self.score / 30000, 0.003)) * live
+        self.score += self.levels.score_per_tick[self.difficulty_level] * live
+
+        # Remove off-screen objects
+        live_col = live[:, None]
+        self.obs_alive &= ~(live_col & ((self.obs_x <= -100) | self.obs_destroyed))
+        self.obs_passed &= self.obs_alive
+        self.obs_destroyed &= self.obs_alive
+        self.item_alive &= ~(live_col & ((self.item_x <= -100) | self.item_collected))
+        self.item_collected &= self.item_alive
+
+        self._update_obstacles(live)
+        self._update_items(live)
+        self._spawn_obstacles(live)
+        self._spawn_items(live)
+
+        return self.score - start_score, self.done.copy()
+
+    def dino_rect(self):
+        giant = self.buff_active[:, GIANT]
+        width = np.where(giant, int(DINO_WIDTH * 1.5), DINO_WIDTH)
+        height = np.where(giant, (self.dino_height * 1.5).astype(np.int64), self.dino_height)
+        return DINO_X, np.trunc(self.dino_y), width, height
+
+    def _apply_input(self, actions, live):
+        jump = ((actions & ACTION_JUMP) != 0) & live
+        shoot = ((actions & ACTION_SHOOT) != 0) & live
+        duck = (actions & ACTION_DUCK) != 0
+
+        # Dinosaur.jump
+        double_jump = self.buff_active[:, DOUBLE_JUMP] & (self.jumps_remaining > 0)
+        ground_jump = jump & ~self.is_jumping
+        air_jump = jump & self.is_jumping & double_jump
+        self.dino_vy[ground_jump] = JUMP_FORCE
+        self.dino_vy[air_jump] = JUMP_FORCE * 0.8
+        self.jumps_remaining -= (ground_jump | air_jump) & double_jump
+        self.is_jumping |= ground_jump
+
+        # Dinosaur.shoot (at most MAX_BULLETS in flight)
+        free = ~self.bullet_alive
+        rows = np.flatnonzero(shoot & self.buff_active[:, WEAPON] & free.any(axis=1))
+        if rows.size:
+            slots = free[rows].argmax(axis=1)
+            self.bullet_alive[rows, slots] = True
+            self.bullet_x[rows, slots] = DINO_X + DINO_WIDTH
+            self.bullet_y[rows, slots] = self.dino_y[rows] + self.dino_height[rows] / 2 - 5
+
+        # Dinosaur.duck
+        np.copyto(self.is_ducking, duck, where=live)
+        np.copyto(self.dino_height, np.where(self.is_ducking, DUCK_HEIGHT, NORMAL_HEIGHT), where=live)
+        stand = live & ~duck & ~self.is_jumping
+        self.dino_y[stand] = GROUND_Y - NORMAL_HEIGHT
+
+    def _update_dinosaur(self, live):
+        # Jump movement
+        jumping = self.is_jumping & live
+        np.add(self.dino_vy, GRAVITY, out=self.dino_vy, where=jumping)
+        np.add(self.dino_y, self.dino_vy, out=self.dino_y, where=jumping)
+
+        floor = GROUND_Y - self.dino_height
+        landed = jumping & (self.dino_y >= floor)
+        self.dino_y[landed] = floor[landed]
+        self.is_jumping[landed] = False
+        self.dino_vy[landed] = 0
+        self.jumps_remaining[landed & self.buff_active[:, DOUBLE_JUMP]] = 2
+
+        # Buff timers
+        self.buff_time += self.buff_active & live[:, None]
+        expired = self.buff_active & (self.buff_time >= BUFF_MAX_TIME)
+        self.buff_active &= ~expired
+        self.buff_time[expired] = 0
+        self.bullet_alive[expired[:, WEAPON]] = False
+
+        # Projectiles
+        np.add(self.bullet_x, 15, out=self.bullet_x, where=self.bullet_alive & live[:, None])
+        self.bullet_alive &= self.bullet_x <= SCREEN_WIDTH + 50
+
+    def _update_difficulty(self, live):
+        np.add(self.distance_traveled, self.game_speed, out=self.distance_traveled, where=live)
+        self.game_time += live
+
+        curve = self.curve
+        combined_factor = self.score / curve.level_score + self.game_time / curve.level_ticks
+        new_level = 1 + (combined_factor * curve.level_rate).astype(np.int64)
+        np.maximum(self.difficulty_level, np.where(live, new_level, 0), out=self.difficulty_level)
+        levels = self.levels
+        levels.cover(self.difficulty_level.max())
+        level = self.difficulty_level
+
+        score_speed_boost = np.minimum(self.score / curve.speed_score, curve.speed_score_max)
+        np.copyto(self.game_speed, levels.speed[level] + score_speed_boost, where=live)
+
+        score_reduction = np.minimum((self.score / curve.frequency_score).astype(np.int64),
+                                     curve.frequency_score_max)
+        frequency = np.maximum(curve.min_obstacle_frequency, levels.obstacle_frequency[level] - score_reduction)
+        np.copyto(self.obstacle_frequency, frequency, where=live)
+
+    def _update_obstacles(self, live):
+        moving = self.obs_alive & live[:, None]
+        start = np.trunc(self.obs_x)
+        np.subtract(self.obs_x, self.game_speed[:, None] * self.obs_speed_mult, out=self.obs_x, where=moving)
+        end = np.trunc(self.obs_x)
+        step = end - start
+        oy = self.obs_y
+        # What each obstacle covers along x during the tick: only pairs whose paths overlap
+        # along x can meet, and that test is cheap, so the sweep only runs on those
+        left = np.minimum(start, end)
+        right = np.maximum(start, end) + self.obs_w
+
+        # Collision with dinosaur: when it touches each obstacle during the tick. The dino
+        # doesn't move sideways, so nearly every obstacle is ruled out by x alone
+        dx, dy, dw, dh = self.dino_rect()
+        rows, slots = np.nonzero(moving & (left < dx + dw[:, None]) & (right > dx))
+        start_y = self.dino_start_y[rows]
+        crash_time = sweep_times(dx, start_y, dw[rows], dh[rows], 0, dy[rows] - start_y,
+                                 start[rows, slots], oy[rows, slots], self.obs_w[rows, slots],
+                                 self.obs_h[rows, slots], step[rows, slots], 0)
+
+        # Collision with projectiles: each bullet hits the first obstacle it reaches (the oldest
+        # on a tie), unless another bullet destroyed that one earlier in the tick
+        shooting = np.flatnonzero(self.bullet_alive.any(axis=1) & live)
+        if shooting.size:
+            destroy_time = np.full(self.obs_x.shape, INFINITY)
+            bullet_x = self.bullet_x[shooting][:, :, None]
+            near = (self.bullet_alive[shooting][:, :, None] & moving[shooting][:, None, :] &
+                    (left[shooting][:, None, :] < bullet_x + BULLET_WIDTH) &
+                    (right[shooting][:, None, :] > bullet_x - 15))
+            hit_rows, bullets, hit_slots = np.nonzero(near)
+            if hit_rows.size:
+                env_rows = shooting[hit_rows]
+                times = np.full(near.shape, INFINITY)
+                times[hit_rows, bullets, hit_slots] = sweep_times(
+                    self.bullet_x[env_rows, bullets] - 15, self.bullet_y[env_rows, bullets],
+                    BULLET_WIDTH, BULLET_HEIGHT, 15, 0, start[env_rows, hit_slots],
+                    oy[env_rows, hit_slots], self.obs_w[env_rows, hit_slots],
+                    self.obs_h[env_rows, hit_slots], step[env_rows, hit_slots], 0)
+                if np.isfinite(times).any():
+                    self._resolve_bullet_hits(shooting, times, destroy_time)
+            crash_time[crash_time > destroy_time[rows, slots]] = INFINITY
+
+        dead = rows[np.isfinite(crash_time)]
+        self.done[dead[~self.buff_active[dead, INVINCIBLE]]] = True
+
+        # Mark as passed
+        passing = moving & ~self.obs_passed & (self.obs_x < DINO_X)
+        self.obs_passed |= passing
+        self.score += 5 * passing.sum(axis=1)
+
+    def _resolve_bullet_hits(self, shooting, times, destroy_time):
+        # Hits in order of time (then bullet, then spawn order), one bullet at a time per env
+        # like the engine's sorted list: there are only MAX_BULLETS of them
+        seq = self.obs_seq[shooting][:, None, :]
+        rows = np.arange(shooting.size)
+        tie_break = np.arange(MAX_BULLETS)[None, :, None] * (self.spawn_count.max() + 1) + seq
+        for _ in range(MAX_BULLETS):
+            # A bullet can't reach an obstacle another bullet destroyed before it got there
+            blocked = destroy_time[shooting][:, None, :] < times
+            valid = np.where(blocked, INFINITY, times)
+            first = valid.min(axis=(1, 2))
+            hitting = np.isfinite(first)
+            if not hitting.any():
+                break
+            key = np.where(valid == first[:, None, None], tie_break, np.iinfo(np.int64).max)
+            flat = key.reshape(rows.size, -1).argmin(axis=1)
+            bullets, slots = np.divmod(flat, times.shape[2])
+            rows_hit = rows[hitting]
+            env_rows = shooting[hitting]
+            bullets = bullets[hitting]
+            slots = slots[hitting]
+            destroy_time[env_rows, slots] = np.minimum(destroy_time[env_rows, slots], first[hitting])
+            self.obs_destroyed[env_rows, slots] = True
+            self.bullet_alive[env_rows, bullets] = False
+            self.score[env_rows] += 20
+            times[rows_hit, bullets, :] = INFINITY
+
+    def _update_items(self, live):
+        # Pickups spawn at least 500 ticks apart, so only one can touch the dino in
+        # a tick and the dino rect does not need refreshing between them.
+        moving = self.item_alive & live[:, None]
+        start = np.trunc(self.item_x)
+        np.subtract(self.item_x, self.game_speed[:, None], out=self.item_x, where=moving)
+
+        # Same x test as the obstacles before sweeping
+        end = np.trunc(self.item_x)
+        dx, dy, dw, dh = self.dino_rect()
+        rows, slots = np.nonzero(moving & ~self.item_collected & (np.minimum(start, end) < dx + dw[:, None]) &
+                                 (np.maximum(start, end) + BUFF_SIZE > dx))
+        if not rows.size:
+            return
+        start_y = self.dino_start_y[rows]
+        times = sweep_times(dx, start_y, dw[rows], dh[rows], 0, dy[rows] - start_y,
+                            start[rows, slots], self.item_y[rows, slots], BUFF_SIZE, BUFF_SIZE,
+                            end[rows, slots] - start[rows, slots], 0)
+        touching = np.isfinite(times)
+        if not touching.any():
+            return
+        collected = np.zeros_like(moving)
+        collected[rows[touching], slots[touching]] = True
+
+        self.item_collected |= collected
+        self.score += 30 * collected.sum(axis=1)
+        for buff in range(len(BUFF_NAMES)):
+            got = (collected & (self.item_type == buff)).any(axis=1)
+            self.buff_active[got, buff] = True
+            self.buff_time[got, buff] = 0
+            if buff == DOUBLE_JUMP:
+                self.jumps_remaining[got] = 2
+            elif buff == WEAPON:
+                self.bullet_alive[got] = False
+
+    def _spawn_obstacles(self, live):
+        self.obstacle_timer += live
+        ready = (live & (self.obstacle_timer >= self.obstacle_frequency) &
+                 (self.obs_alive.sum(axis=1) < self.max_obstacles))
+        rows = np.flatnonzero(ready)
+        if not rows.size:
+            return
+        self.obstacle_timer[rows] = 0
+        # Same record layout as Simulation.make_obstacles
+        records = self.obstacle_spawns.next(rows)
+
+        # MORE BIRDS as difficulty increases
+        level = self.difficulty_level[rows]
+        first_bird = records[:, 0] >= self.levels.cactus_chance[level]
+        first_slots = self._add_obstacles(rows, np.full(rows.size, SCREEN_WIDTH), first_bird, records[:, 3:6])
+
+        # MORE CHANCE FOR DOUBLE OBSTACLES
+        double = records[:, 1] < self.levels.double_chance[level]
+        if not double.any():
+            return
+        rows = rows[double]
+        extra_x = SCREEN_WIDTH + roll_ints(records[double, 2], 30, 100)
+        extra_slots = self._add_obstacles(rows, extra_x, ~first_bird[double], records[double, 6:9])
+        # The fairness check walks the pair tick by tick; doubles are few enough to do one at a time
+        fair = np.array([self._is_fair(row, pair) for row, pair in zip(rows, zip(first_slots[double], extra_slots))])
+        self.double_obstacles[rows[fair]] += 1
+        self.unfair_doubles[rows[~fair]] += 1
+        self.obs_alive[rows[~fair], extra_slots[~fair]] = False
+
+    def _is_fair(self, row, slots):
+        pair = []
+        for slot in slots:
+            obstacle = Obstacle.__new__(Obstacle)
+            obstacle.type = "bird" if self.obs_bird[row, slot] else "cactus"
+            obstacle.x = self.obs_x[row, slot]
+            obstacle.y = int(self.obs_y[row, slot])
+            obstacle.width = int(self.obs_w[row, slot])
+            obstacle.height = int(self.obs_h[row, slot])
+            pair.append(obstacle)
+        return obstacles_are_fair(pair, self.game_speed[row])
+
+    def _add_obstacles(self, rows, x, bird, rolls):
+        # Same sizes and heights as Obstacle.spawn, from the same rolls. Returns the slots used
+        cactus_roll, half_roll, bird_roll = rolls.T
+        slots = (~self.obs_alive[rows]).argmax(axis=1)
+        curve = self.curve
+        levels = self.levels
+        level = self.difficulty_level[rows]
+        score_factor = np.minimum(self.score[rows] / curve.size_score, curve.size_score_max)
+        size_multiplier = levels.size_base[level] + score_factor * curve.size_score_weight
+
+        cactus_height = roll_ints(cactus_roll, (CACTUS_MIN_HEIGHT * size_multiplier).astype(np.int64),
+                                  (CACTUS_MAX_HEIGHT * size_multiplier).astype(np.int64))
+        bird_y_min = levels.bird_top[level]
+        bird_y_mid = levels.bird_middle[level]
+        bird_y_max = levels.bird_bottom[level]
+        top = half_roll < curve.bird_top_chance
+        bird_y = np.where(top, roll_ints(bird_roll, bird_y_min, bird_y_mid),
+                          roll_ints(bird_roll, bird_y_mid, bird_y_max))
+
+        width = np.where(bird, (32 * size_multiplier).astype(np.int64), (24 * size_multiplier).astype(np.int64))
+        height = np.where(bird, (24 * size_multiplier).astype(np.int64), cactus_height)
+
+        self.obs_x[rows, slots] = x
+        self.obs_y[rows, slots] = np.where(bird, bird_y, GROUND_Y - height)
+        self.obs_w[rows, slots] = width
+        self.obs_h[rows, slots] = height
+        self.obs_bird[rows, slots] = bird
+        self.obs_speed_mult[rows, slots] = np.where(bird, 1.1, 1.0)
+        self.obs_alive[rows, slots] = True
+        self.obs_passed[rows, slots] = False
+        self.obs_destroyed[rows, slots] = False
+        self.obs_seq[rows, slots] = self.spawn_count[rows]
+        self.spawn_count[rows] += 1
+        return slots
+
+    def _spawn_items(self, live):
+        self.buff_timer += live
+        levels = self.levels
+        level = self.difficulty_level
+        ready = live & (self.buff_timer >= 500) & (self.item_alive.sum(axis=1) < self.max_buffs)
+        rows = np.flatnonzero(ready)
+        if not rows.size:
+            return
+        rows = rows[self.gate_spawns.next(rows)[:, 0] < levels.buff_chance[level[rows]]]
+        if not rows.size:
+            return
+        self.buff_timer[rows] = 0
+
+        # Same height ranges and type weights as Buff.spawn, from the same rolls
+        hard_roll, height_roll, type_roll = self.buff_spawns.next(rows).T
+        level = level[rows]
+        hard = hard_roll < levels.buff_hard_chance[level]
+        low = np.where(hard, levels.buff_hard_low[level], levels.buff_easy_low[level])
+        high = np.where(hard, levels.buff_hard_high[level], levels.buff_easy_high[level])
+        early_type = roll_choices(type_roll, EARLY_TYPES, self.early_weights)
+        late_type = roll_choices(type_roll, LATE_TYPES, self.late_weights)
+
+        slots = (~self.item_alive[rows]).argmax(axis=1)
+        self.item_x[rows, slots] = SCREEN_WIDTH
+        self.item_y[rows, slots] = roll_ints(height_roll, low, high)
+        self.item_type[rows, slots] = np.where(level < 3, early_type, late_type)
+        self.item_alive[rows, slots] = True
+        self.item_collected[rows, slots] = False
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    num_envs = int(sys.argv[1]) if len(sys.argv) > 1 else 4096
+    ticks = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    env = BatchEnv(num_envs, seed=0)
+    rng = np.random.default_rng(1)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        actions = rng.choice([0, ACTION_JUMP, ACTION_DUCK], size=num_envs, p=[0.9, 0.05, 0.05])
+        reward, done = env.step(actions)
+        env.reset(done)
+    elapsed = time.perf_counter() - start
+    print(f"{num_envs * ticks} env-steps in {elapsed:.2f}s ({num_envs * ticks / elapsed:.0f} steps/s)")
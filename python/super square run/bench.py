@@ -0,0 +1,209 @@
+"""Benchmarks for the game loop, with a regression gate.
+
+Every benchmark runs a fixed, seeded workload and reports operations per
+second (best of a few repeats, so a busy machine hurts less). Results are
+written to JSON; with --check they are compared to a saved baseline and the
+run exits with status 1 if anything got slower than the tolerance allows.
+
+    python bench.py --save-baseline     # on the commit you trust
+    python bench.py --check             # after a change
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+from engine import Simulation, GameState, simple_policy, ACTION_SHOOT
+
+BASELINE_PATH = "bench_baseline.json"
+RESULTS_PATH = "bench_results.json"
+
+# Score that puts update_difficulty() at a given level with game_time at 0
+def level_score(level):
+    return 800 * (level - 1) / 3 + 1
+
+def tick_level(level, ticks=20000):
+    """Simulation.update at a fixed difficulty level. The bot plays, a lost run restarts with the next seed."""
+    def bench():
+        sim = Simulation(0)
+        score = level_score(level)
+        seed = 0
+        for _ in range(ticks):
+            # Hold the level (and the speed and spawn rate that come with it) still
+            sim.score = score
+            sim.game_time = 0
+            if not sim.step(simple_policy(sim)):
+                seed += 1
+                sim.reset(seed)
+        return ticks
+    return bench
+
+def saturated_obstacles(sim):
+    """Fill the track with max_obstacles obstacles ahead of the dino, and three bullets flying above them."""
+    sim.reset(0)
+    for i in range(sim.max_obstacles):
+        obstacle = sim.obstacle_pool.acquire()
+        obstacle.spawn(150 + i * 50, "cactus" if i % 2 else "bird", 10, 2000)
+        sim.obstacles.append(obstacle)
+    dinosaur = sim.dinosaur
+    dinosaur.activate_buff("weapon")
+    for i in range(3):
+        sim.apply_input(ACTION_SHOOT)
+        bullet = dinosaur.bullets[-1]
+        bullet.x = 150 + i * 200
+        bullet.y = 0
+    # Nothing moves in the benchmark: every tick starts where it ends
+    sim.record_starts()
+
+def collisions(iterations=50000):
+    """check_obstacle_collisions with max_obstacles on screen and bullets out. Nothing is hit,
+    so every iteration does the same work."""
+    def bench():
+        sim = Simulation(0)
+        saturated_obstacles(sim)
+        check = sim.check_obstacle_collisions
+        for _ in range(iterations):
+            check()
+        assert sim.game_state == GameState.PLAYING
+        return iterations
+    return bench
+
+def churn(cycles=20000):
+    """Spawn a full set of obstacles, buffs and clouds off screen, then clean them all up again."""
+    def bench():
+        sim = Simulation(0)
+        for _ in range(cycles):
+            for _ in range(sim.max_obstacles):
+                obstacle = sim.obstacle_pool.acquire()
+                obstacle.spawn(-150, "cactus", 5, 1000, sim.spawns.obstacles.next()[3:6])
+                sim.obstacles.append(obstacle)
+            for _ in range(sim.max_buffs):
+                buff = sim.buff_pool.acquire()
+                buff.spawn(-150, 5, 1000, sim.spawns.buffs.next())
+                sim.buffs.append(buff)
+            for _ in range(sim.max_clouds):
+                cloud = sim.create_cloud()
+                cloud.x = -250
+                sim.clouds.append(cloud)
+            sim.cleanup_off_screen_objects()
+        assert not sim.obstacles and not sim.buffs and not sim.clouds
+        return cycles
+    return bench
+
+def draw_frames(frames=3000):
+    """Game.draw while playing, with the raylib calls stubbed out: the Python cost of a frame."""
+    import stub_raylib
+    if "raylibpy" not in sys.modules:
+        stub_raylib.install()
+    import main
+
+    def bench():
+        game = main.Game(persistent=False)
+        game.reset(0)
+        game.game_state = GameState.PLAYING
+        # Play into level 5 first, so there is something on screen
+        while game.game_time < 1500:
+            if not game.step(simple_policy(game)):
+                game.reset(game.seed + 1)
+        drawn = 0
+        elapsed = 0.0
+        clock = time.perf_counter
+        for _ in range(frames):
+            if not game.step(simple_policy(game)):
+                game.reset(game.seed + 1)
+            start = clock()
+            game.draw()
+            elapsed += clock() - start
+            drawn += 1
+        return drawn, elapsed
+    return bench
+
+BENCHMARKS = {
+    "tick_level_1": tick_level(1),
+    "tick_level_5": tick_level(5),
+    "tick_level_10": tick_level(10),
+    "tick_level_20": tick_level(20),
+    "collisions_saturated": collisions(),
+    "spawn_cleanup_churn": churn(),
+    "draw_stub": draw_frames(),
+}
+
+def measure(bench, repeats):
+    best = 0.0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = bench()
+        elapsed = time.perf_counter() - start
+        # A benchmark can time just its own part by returning (count, seconds)
+        if isinstance(result, tuple):
+            result, elapsed = result
+        best = max(best, result / elapsed)
+    return best
+
+def run(names, repeats=3):
+    results = {}
+    for name in names:
+        results[name] = measure(BENCHMARKS[name], repeats)
+        print(f"{name:24} {results[name]:12.0f} /s")
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "results": results,
+    }
+
+def compare(results, baseline, tolerance):
+    """Names of the benchmarks that are more than `tolerance` slower than the baseline."""
+    slower = []
+    for name, value in results["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        change = value / old - 1
+        flag = "SLOWER" if change < -tolerance else ""
+        print(f"{name:24} {old:12.0f} -> {value:12.0f} /s  {change:+7.1%} {flag}")
+        if flag:
+            slower.append(name)
+    return slower
+
+def main():
+    parser = argparse.ArgumentParser(description="Super Square Run benchmarks")
+    parser.add_argument("names", nargs="*", help="benchmarks to run (default: all)")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--out", default=RESULTS_PATH, help="where to write the results")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--check", action="store_true", help="fail if slower than the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed slowdown (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    names = args.names or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark {', '.join(unknown)} (have: {', '.join(BENCHMARKS)})")
+
+    results = run(names, args.repeats)
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+
+    if args.check:
+        if not os.path.exists(args.baseline):
+            print(f"no baseline at {args.baseline}, run with --save-baseline first")
+            return 1
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        slower = compare(results, baseline, args.tolerance)
+        if slower:
+            print(f"regression: {', '.join(slower)}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
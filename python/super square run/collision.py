@@ -0,0 +1,122 @@
+"""Collision checks for Simulation.update.
+
+Collisions are swept: everything moves in a straight line from where it
+was at the start of the tick to where it is at the end, and sweep() finds
+the time of impact of two boxes moving like that, so nothing can pass
+through a thin obstacle in one tick however fast it goes. A pair that
+overlaps at the end of the tick always counts as a hit, as the plain
+overlap test did; a pair that only touches on the way (a corner clipped
+between two ticks) counts too.
+
+BoundsList is the broad phase: it keeps the boxes of one kind of entity
+(each one covering where it went during the tick) sorted by their left
+edge in lists that are allocated once and reused every tick. A query only
+looks at the boxes whose x range can reach the query box (sweep and prune
+on x), instead of testing every obstacle against the dino and every bullet.
+"""
+from bisect import bisect_left
+
+INFINITY = float("inf")
+
+def sweep(x, y, width, height, dx, dy, other_x, other_y, other_width, other_height, other_dx, other_dy):
+    """When box 1, moving by (dx, dy) over the tick, first overlaps box 2, moving by
+    (other_dx, other_dy): a time of impact in [0, 1], 0 if they overlap from the start, or
+    None if they never do. Overlap is the same strict test as check_collision."""
+    enter = 0.0
+    leave = INFINITY
+    # Box 1 relative to box 2, one axis at a time: the times at which the edges meet
+    for start, size, step, other_start, other_size in ((x, width, dx - other_dx, other_x, other_width),
+                                                      (y, height, dy - other_dy, other_y, other_height)):
+        if step == 0:
+            if start >= other_start + other_size or start + size <= other_start:
+                return None
+            continue
+        first = (other_start - size - start) / step
+        last = (other_start + other_size - start) / step
+        if first > last:
+            first, last = last, first
+        if first > enter:
+            enter = first
+        if last < leave:
+            leave = last
+    if enter >= leave or enter >= 1 or leave <= 0:
+        return None
+    return enter
+
+class BoundsList:
+    def __init__(self, capacity):
+        self.capacity = 0
+        self.count = 0
+        self.max_width = 0
+        self.left = []
+        self.top = []
+        self.right = []
+        self.bottom = []
+        self.index = []  # Position of the entity in the list given to load()
+        self.grow(capacity)
+
+    def grow(self, capacity):
+        extra = capacity - self.capacity
+        if extra <= 0:
+            return
+        for values in (self.left, self.top, self.right, self.bottom, self.index):
+            values.extend([0] * extra)
+        self.capacity = capacity
+
+    def load(self, entities, starts=None):
+        """Copy the entity rects (same as get_rect) and sort them by left edge. With starts
+        (int x of each entity at the start of the tick), each box reaches back to there."""
+        count = len(entities)
+        if count > self.capacity:
+            self.grow(count)
+        left, top, right, bottom, index = self.left, self.top, self.right, self.bottom, self.index
+        max_width = 0
+
+        for i in range(count):
+            entity = entities[i]
+            x = int(entity.x)
+            y = int(entity.y)
+            width = entity.width
+            x_end = x + width
+            if starts is not None:
+                start = starts[i]
+                if start < x:
+                    x = start
+                elif start + width > x_end:
+                    x_end = start + width
+
+            # Insertion sort: spawns come in nearly sorted, so this is close to one pass
+            j = i
+            while j > 0 and left[j - 1] > x:
+                left[j] = left[j - 1]
+                top[j] = top[j - 1]
+                right[j] = right[j - 1]
+                bottom[j] = bottom[j - 1]
+                index[j] = index[j - 1]
+                j -= 1
+            left[j] = x
+            top[j] = y
+            right[j] = x_end
+            bottom[j] = y + entity.height
+            index[j] = i
+
+            if x_end - x > max_width:
+                max_width = x_end - x
+
+        self.count = count
+        self.max_width = max_width
+
+    def query(self, x0, y0, x1, y1, out):
+        """Write the list positions of the boxes overlapping (x0, y0)-(x1, y1) into out.
+        Returns how many were written. Overlap is the same test as check_collision."""
+        left, right = self.left, self.right
+        count = self.count
+        found = 0
+        # Boxes that start further left than this cannot reach x0
+        k = bisect_left(left, x0 - self.max_width, 0, count)
+        while k < count and left[k] < x1:
+            if right[k] > x0 and self.top[k] < y1 and self.bottom[k] > y0:
+                out[found] = self.index[k]
+                found += 1
+            k += 1
+        return found
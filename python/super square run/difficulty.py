@@ -0,0 +1,296 @@
+"""Difficulty curves: how speed, obstacles and pickups change as a run goes on.
+
+Every number that used to be written into update_difficulty, Obstacle.spawn
+and Buff.spawn is a named parameter here. A DifficultyCurve compiles what only
+depends on the level into one row per level (built the first time a run gets
+there), so a tick looks those up instead of redoing the sums. The score terms
+are still worked out per tick: the score is not a whole number, and a table
+over it would change the runs.
+
+Curves load from JSON. Any parameter can be overridden, and a "<column>_points"
+list of [level, value] pairs replaces one per-level column with straight lines
+between the points (flat before the first and after the last):
+
+    {"name": "gentle", "speed_per_level": 0.5,
+     "obstacle_frequency_points": [[1, 100], [10, 60], [30, 30]]}
+
+A file without a "name" is named after the file (gentle.json is "gentle").
+
+    python difficulty.py                         # table of the default curve
+    python difficulty.py gentle.json --csv gentle.csv --levels 40
+    python difficulty.py gentle.json --timeline timeline.csv --plot gentle.png
+
+Replays are only checked against the default curve.
+"""
+import json
+import os
+
+# The original game. Heights are screen y, the ground is at 450.
+DEFAULTS = {
+    # Level: 1 + int((score / level_score + ticks / level_ticks) * level_rate), never goes down
+    "level_score": 800,
+    "level_ticks": 4000,
+    "level_rate": 3,
+    # Speed: speed_base + level * speed_per_level + min(score / speed_score, speed_score_max)
+    "speed_base": 3,
+    "speed_per_level": 0.7,
+    "speed_score": 3000,
+    "speed_score_max": 4.0,
+    # Added on top every tick, with min(score / 30000, 0.003)
+    "game_speed_increment": 0.0005,
+    # Ticks between obstacles:
+    # base - level * per_level - min(int(score / frequency_score), frequency_score_max), at least min
+    "base_obstacle_frequency": 100,
+    "min_obstacle_frequency": 15,
+    "frequency_per_level": 10,
+    "frequency_score": 150,
+    "frequency_score_max": 50,
+    # Score per tick: score_per_tick * (1 + level * score_level_bonus)
+    "score_per_tick": 0.1,
+    "score_level_bonus": 0.15,
+    # Obstacles: more birds and more doubles as the level goes up
+    "cactus_chance": 0.7,
+    "cactus_chance_per_level": 0.04,
+    "cactus_chance_min": 0.4,
+    "double_level": 3,  # First level with double obstacles
+    "double_chance": 0.4,
+    # Obstacle size: 1 + level * size_per_level + min(score / size_score, size_score_max) * size_score_weight
+    "size_per_level": 0.05,
+    "size_score": 5000,
+    "size_score_max": 2.0,
+    "size_score_weight": 0.1,
+    # Bird heights: between top and bottom, in the top half with bird_top_chance
+    "bird_top": 150,
+    "bird_top_per_level": 10,
+    "bird_top_min": 100,
+    "bird_bottom": 250,
+    "bird_bottom_per_level": 20,
+    "bird_bottom_min": 200,
+    "bird_top_chance": 0.7,
+    # Buffs: chance to spawn when the buff timer is up
+    "buff_chance": 0.5,
+    "buff_chance_per_level": 0.06,
+    "buff_chance_min": 0.2,
+    # Buff type weights, in engine.EARLY_BUFF_TYPES order below level 3, LATE_BUFF_TYPES from then on
+    "early_buff_weights": [0.3, 0.25, 0.25, 0.2],
+    "late_buff_weights": [0.25, 0.25, 0.25, 0.25],
+    # Buff heights: the first bracket whose "below" is above the level. With hard_chance
+    # the pickup goes in the hard range, otherwise in the easy one (a chance of 0 draws no
+    # random number). "below": null is the last bracket.
+    "buff_heights": [
+        {"below": 3, "hard_chance": 0, "hard": [100, 350], "easy": [100, 350]},
+        {"below": 6, "hard_chance": 0.4, "hard": [50, 150], "easy": [200, 400]},
+        {"below": None, "hard_chance": 0.7, "hard": [50, 180], "easy": [250, 370]},
+    ],
+}
+
+# Per-level columns that "<column>_points" can replace
+COLUMNS = ["speed", "obstacle_frequency", "score_per_tick", "cactus_chance", "double_chance",
+           "size", "buff_chance"]
+
+class LevelRow:
+    """Everything about one level that does not depend on the score."""
+    __slots__ = ("level", "speed", "obstacle_frequency", "score_per_tick", "cactus_chance",
+                 "double_chance", "size", "bird_range", "buff_chance", "buff_heights")
+
+def interpolate(points, x):
+    """Straight lines between sorted (x, y) points, flat outside them."""
+    if x <= points[0][0]:
+        return points[0][1]
+    for (x0, y0), (x1, y1) in zip(points, points[1:]):
+        if x <= x1:
+            return y0 + (y1 - y0) * (x - x0) / (x1 - x0)
+    return points[-1][1]
+
+class DifficultyCurve:
+    def __init__(self, name="default", **params):
+        unknown = [key for key in params if key not in DEFAULTS and
+                   not (key.endswith("_points") and key[:-len("_points")] in COLUMNS)]
+        if unknown:
+            raise ValueError(f"unknown difficulty parameter {', '.join(unknown)}")
+        self.name = name
+        self.params = dict(DEFAULTS, **params)
+        for key, value in self.params.items():
+            if not key.endswith("_points"):
+                setattr(self, key, value)
+        self.points = {column: sorted(map(tuple, self.params[column + "_points"]))
+                       for column in COLUMNS if column + "_points" in self.params}
+        self.buff_brackets = [(bracket["below"], bracket["hard_chance"], tuple(bracket["hard"]),
+                               tuple(bracket["easy"])) for bracket in self.buff_heights]
+        self.rows = []
+
+    @classmethod
+    def load(cls, path):
+        """A curve from a JSON file, named after the file unless it has a "name"."""
+        with open(path) as f:
+            params = json.load(f)
+        name = params.pop("name", None) or os.path.splitext(os.path.basename(path))[0]
+        return cls(name, **params)
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(dict(self.params, name=self.name), f, indent=2)
+
+    def with_params(self, **changes):
+        """A copy of this curve with some parameters changed."""
+        return DifficultyCurve(self.name, **dict(self.params, **changes))
+
+    def row(self, level):
+        rows = self.rows
+        if level < len(rows):
+            return rows[level]
+        while len(rows) <= level:
+            rows.append(self.compile_row(len(rows)))
+        return rows[level]
+
+    def compile_row(self, level):
+        # Same sums, in the same order, as the old per-tick code, so the default curve
+        # plays exactly like it did
+        row = LevelRow()
+        row.level = level
+        row.speed = self.speed_base + level * self.speed_per_level
+        row.obstacle_frequency = self.base_obstacle_frequency - level * self.frequency_per_level
+        row.score_per_tick = self.score_per_tick * (1 + level * self.score_level_bonus)
+        row.cactus_chance = max(self.cactus_chance_min, self.cactus_chance - level * self.cactus_chance_per_level)
+        row.double_chance = self.double_chance if level >= self.double_level else 0
+        row.size = 1.0 + level * self.size_per_level
+        row.buff_chance = max(self.buff_chance_min, self.buff_chance - level * self.buff_chance_per_level)
+
+        for column, points in self.points.items():
+            setattr(row, column, interpolate(points, level))
+        row.obstacle_frequency = int(round(row.obstacle_frequency))
+
+        top = max(self.bird_top_min, self.bird_top - level * self.bird_top_per_level)
+        bottom = max(self.bird_bottom_min, self.bird_bottom - level * self.bird_bottom_per_level)
+        row.bird_range = (int(top), int((top + bottom) / 2), int(bottom))
+
+        for below, hard_chance, hard, easy in self.buff_brackets:
+            if below is None or level < below:
+                row.buff_heights = (hard_chance, hard, easy)
+                break
+        return row
+
+    def level(self, score, ticks):
+        return 1 + int((score / self.level_score + ticks / self.level_ticks) * self.level_rate)
+
+    def speed(self, row, score):
+        return row.speed + min(score / self.speed_score, self.speed_score_max)
+
+    def obstacle_frequency(self, row, score):
+        return max(self.min_obstacle_frequency,
+                   row.obstacle_frequency - min(int(score / self.frequency_score), self.frequency_score_max))
+
+    def size_multiplier(self, row, score):
+        return row.size + min(score / self.size_score, self.size_score_max) * self.size_score_weight
+
+    def table(self, levels):
+        """One dict per level from 1 to levels, for exporting."""
+        table = []
+        for level in range(1, levels + 1):
+            row = self.row(level)
+            top, middle, bottom = row.bird_range
+            hard_chance, hard, easy = row.buff_heights
+            table.append({
+                "level": level, "speed": row.speed, "obstacle_frequency": row.obstacle_frequency,
+                "score_per_tick": row.score_per_tick, "cactus_chance": row.cactus_chance,
+                "double_chance": row.double_chance, "size": row.size, "bird_top": top,
+                "bird_middle": middle, "bird_bottom": bottom, "buff_chance": row.buff_chance,
+                "buff_hard_chance": hard_chance, "buff_hard": f"{hard[0]}-{hard[1]}",
+                "buff_easy": f"{easy[0]}-{easy[1]}",
+            })
+        return table
+
+    def timeline(self, ticks, every=60, score_per_second=0.0):
+        """Level, speed and obstacle frequency over a run that dodges everything.
+
+        The score only grows by the per-tick amount plus score_per_second (for the
+        points a player gets from passing obstacles), so this is a lower bound on
+        how fast a real run gets hard."""
+        rows = []
+        score = 0.0
+        level = 1
+        for tick in range(1, ticks + 1):
+            level = max(level, self.level(score, tick))
+            row = self.row(level)
+            if tick % every == 0:
+                rows.append({"tick": tick, "seconds": tick / 60, "score": score, "level": level,
+                             "speed": self.speed(row, score),
+                             "obstacle_frequency": self.obstacle_frequency(row, score)})
+            score += row.score_per_tick + score_per_second / 60
+        return rows
+
+DEFAULT_CURVE = DifficultyCurve()
+
+def write_csv(path, rows):
+    import csv
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+def plot(path, curve, table, timeline):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    figure, (by_level, by_time) = plt.subplots(1, 2, figsize=(12, 4))
+    levels = [row["level"] for row in table]
+    by_level.plot(levels, [row["speed"] for row in table], label="speed (no score)")
+    by_level.plot(levels, [row["obstacle_frequency"] / 10 for row in table], label="ticks between obstacles / 10")
+    by_level.plot(levels, [row["cactus_chance"] * 10 for row in table], label="cactus chance x 10")
+    by_level.set_xlabel("level")
+    by_level.legend()
+    seconds = [row["seconds"] for row in timeline]
+    by_time.plot(seconds, [row["level"] for row in timeline], label="level")
+    by_time.plot(seconds, [row["speed"] for row in timeline], label="speed")
+    by_time.set_xlabel("seconds")
+    by_time.legend()
+    figure.suptitle(f"difficulty curve: {curve.name}")
+    figure.savefig(path, dpi=100, bbox_inches="tight")
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Print or export a difficulty curve")
+    parser.add_argument("curve", nargs="?", help="curve JSON file (default: the built-in curve)")
+    parser.add_argument("--levels", type=int, default=20)
+    parser.add_argument("--csv", help="write the per-level table here")
+    parser.add_argument("--timeline", help="write level and speed over time here")
+    parser.add_argument("--minutes", type=float, default=5, help="length of the timeline")
+    parser.add_argument("--bonus", type=float, default=2.0,
+                        help="extra score per second in the timeline (passing obstacles)")
+    parser.add_argument("--plot", help="save a PNG of both (needs matplotlib)")
+    args = parser.parse_args()
+
+    curve = DifficultyCurve.load(args.curve) if args.curve else DEFAULT_CURVE
+    table = curve.table(args.levels)
+    timeline = curve.timeline(int(args.minutes * 3600), score_per_second=args.bonus)
+
+    print(f"curve: {curve.name}")
+    print(f"{'level':>5} {'speed':>6} {'freq':>5} {'score/t':>8} {'cactus':>7} {'double':>7} "
+          f"{'size':>5} {'birds':>12} {'buff':>5} {'buff heights':>24}")
+    for row in table:
+        birds = f"{row['bird_top']}-{row['bird_middle']}-{row['bird_bottom']}"
+        heights = f"{row['buff_hard_chance']:.0%} {row['buff_hard']} / {row['buff_easy']}"
+        print(f"{row['level']:5} {row['speed']:6.2f} {row['obstacle_frequency']:5} "
+              f"{row['score_per_tick']:8.3f} {row['cactus_chance']:7.2f} {row['double_chance']:7.2f} "
+              f"{row['size']:5.2f} {birds:>12} {row['buff_chance']:5.2f} {heights:>24}")
+    for row in timeline[::max(1, len(timeline) // 10)]:
+        print(f"{row['seconds']:6.0f}s  level {row['level']:3}  speed {row['speed']:5.2f}  "
+              f"obstacle every {row['obstacle_frequency']} ticks")
+
+    if args.csv:
+        write_csv(args.csv, table)
+        print(f"table written to {args.csv}")
+    if args.timeline:
+        write_csv(args.timeline, timeline)
+        print(f"timeline written to {args.timeline}")
+    if args.plot:
+        try:
+            plot(args.plot, curve, table, timeline)
+        except ImportError:
+            parser.error("--plot needs matplotlib (pip install matplotlib)")
+        print(f"plot written to {args.plot}")
+
+if __name__ == "__main__":
+    main()
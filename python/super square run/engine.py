@@ -0,0 +1,1047 @@
+"""Headless simulation core for Super Square Run.
+
+Everything in here is plain Python: no raylib import, no window, no frame
+cap. main.py builds the rendered game on top of these classes, and bots or
+balance scripts can drive a Simulation directly, one input action per tick.
+"""
+import random
+from bisect import bisect
+from itertools import accumulate
+from operator import attrgetter
+
+from collision import BoundsList, sweep
+from difficulty import DEFAULT_CURVE
+from events import (RUN_START, OBSTACLE_SPAWN, BUFF_SPAWN, BUFF_COLLECT, BULLET_HIT, PASSED,
+                    LEVEL_UP, DEATH, SUBJECTS)
+from levelgen import LevelGenerator
+
+# Game constants
+SCREEN_WIDTH = 800
+SCREEN_HEIGHT = 500
+GRAVITY = 0.6
+JUMP_FORCE = -15
+GAME_SPEED_INITIAL = 3
+GROUND_HEIGHT = 50
+CACTUS_MIN_HEIGHT = 40
+CACTUS_MAX_HEIGHT = 60
+BIRD_MIN_HEIGHT = 150
+BIRD_MAX_HEIGHT = 250
+CLOUD_SPEED = 1
+BIRD_SPEED = 1.1  # Birds fly this much faster than the ground scrolls
+BULLET_SPEED = 15
+NO_HIT = 2.0  # A time of impact past the end of the tick
+
+# Bump when a change to the rules or the random stream makes old replays play differently
+RULES_VERSION = 4
+
+# Fixed simulation rate: one Simulation.step is 1/60 s of game time
+TICK_RATE = 60
+TICK_TIME = 1 / TICK_RATE
+
+# Input actions for one tick (can be combined, e.g. ACTION_JUMP | ACTION_SHOOT)
+ACTION_NONE = 0
+ACTION_JUMP = 1   # SPACE / UP pressed this tick
+ACTION_DUCK = 2   # DOWN held this tick
+ACTION_SHOOT = 4  # F pressed this tick
+
+# Game states
+class GameState:
+    MENU = 0
+    PLAYING = 1
+    CONTROLS = 2
+    CREDITS = 3
+    GAME_OVER = 4
+
+def check_collision(rect1, rect2):
+    # Same test as rl.check_collision_recs, on (x, y, width, height) tuples
+    return (rect1[0] < rect2[0] + rect2[2] and rect1[0] + rect1[2] > rect2[0] and
+            rect1[1] < rect2[1] + rect2[3] and rect1[1] + rect1[3] > rect2[1])
+
+# Spawns take pre-made random numbers in [0, 1) from the level generator (see levelgen.py)
+def roll_int(roll, low, high):
+    # Like rng.randint(low, high)
+    return low + int(roll * (high - low + 1))
+
+def roll_choice(roll, population, weights):
+    # Like rng.choices(population, weights)[0]
+    cum_weights = list(accumulate(weights))
+    return population[bisect(cum_weights, roll * cum_weights[-1], 0, len(cum_weights) - 1)]
+
+class Pool:
+    """Free list of entities, so spawning reuses old objects instead of allocating new ones.
+    Objects come out uninitialised: call their spawn() method before use."""
+
+    def __init__(self, cls, capacity):
+        self.cls = cls
+        self.capacity = capacity
+        self.free = [cls.__new__(cls) for _ in range(capacity)]
+
+    def acquire(self):
+        if self.free:
+            return self.free.pop()
+        return self.cls.__new__(self.cls)
+
+    def release(self, item):
+        if len(self.free) < self.capacity:
+            self.free.append(item)
+
+class Bullet:
+    __slots__ = ("x", "y", "width", "height")
+
+    def spawn(self, x, y):
+        self.x = x
+        self.y = y
+        self.width = 20  # Wider
+        self.height = 8  # Lower
+
+    def state(self):
+        return (self.x, self.y, self.width, self.height)
+
+    def load(self, state):
+        self.x, self.y, self.width, self.height = state
+
+class Cloud:
+    __slots__ = ("x", "y", "width", "height", "speed")
+
+    def spawn(self, rng):
+        self.x = SCREEN_WIDTH + rng.randint(0, 100)
+        self.y = rng.randint(30, 150)
+        self.width = rng.randint(60, 100)
+        self.height = rng.randint(20, 40)
+        self.speed = CLOUD_SPEED + rng.uniform(-0.3, 0.3)
+
+    def state(self):
+        return (self.x, self.y, self.width, self.height, self.speed)
+
+    def load(self, state):
+        self.x, self.y, self.width, self.height, self.speed = state
+
+class BuffType:
+    """One kind of buff. on_activate / on_expire are Dinosaur methods called when it
+    starts and when it runs out; what it does while active is checked through its bit."""
+    __slots__ = ("name", "index", "bit", "duration", "color", "symbol", "on_activate", "on_expire")
+
+    def __init__(self, name, duration, color, symbol, on_activate=None, on_expire=None):
+        self.name = name
+        self.duration = duration
+        self.color = color  # RGB for the pickup and the indicator
+        self.symbol = symbol  # Text on the pickup
+        self.on_activate = on_activate
+        self.on_expire = on_expire
+        self.index = 0
+        self.bit = 0
+
+class Dinosaur:
+    def __init__(self):
+        self.width = 40
+        self.height = 60
+        self.x = 80
+        self.y = SCREEN_HEIGHT - GROUND_HEIGHT - self.height
+        self.velocity_y = 0
+        self.is_jumping = False
+        self.is_ducking = False
+        self.duck_height = 30
+        self.normal_height = 60
+
+        # Buff system: one bit per BUFF_TYPES entry, and how long each one has been on
+        self.active_buffs = 0
+        self.buff_timers = [0] * len(BUFF_TYPES)
+        self.jumps_remaining = 2
+        self.bullets = []
+        self.bullet_pool = Pool(Bullet, 3)
+
+    def jump(self):
+        if not self.is_jumping:
+            self.is_jumping = True
+            self.velocity_y = JUMP_FORCE
+            if self.active_buffs & BUFF_DOUBLE_JUMP and self.jumps_remaining > 0:
+                self.jumps_remaining -= 1
+        elif self.active_buffs & BUFF_DOUBLE_JUMP and self.jumps_remaining > 0:
+            self.velocity_y = JUMP_FORCE * 0.8
+            self.jumps_remaining -= 1
+            self.is_jumping = True
+
+    def duck(self, is_ducking):
+        self.is_ducking = is_ducking
+        if is_ducking:
+            self.height = self.duck_height
+        else:
+            self.height = self.normal_height
+            if not self.is_jumping:
+                self.y = SCREEN_HEIGHT - GROUND_HEIGHT - self.height
+
+    def update(self):
+        # Jump movement
+        if self.is_jumping:
+            self.velocity_y += GRAVITY
+            self.y += self.velocity_y
+
+            if self.y >= SCREEN_HEIGHT - GROUND_HEIGHT - self.height:
+                self.y = SCREEN_HEIGHT - GROUND_HEIGHT - self.height
+                self.is_jumping = False
+                self.velocity_y = 0
+                if self.active_buffs & BUFF_DOUBLE_JUMP:
+                    self.jumps_remaining = 2
+
+        # Update buffs
+        if self.active_buffs:
+            timers = self.buff_timers
+            for buff in BUFF_TYPES:
+                if self.active_buffs & buff.bit:
+                    timers[buff.index] += 1
+                    if timers[buff.index] >= buff.duration:
+                        self.end_buff(buff)
+
+        # Update projectiles (there are only bullets while the weapon is on)
+        if self.bullets:
+            bullets = self.bullets
+            keep = 0
+            for bullet in bullets:
+                bullet.x += BULLET_SPEED
+                if bullet.x > SCREEN_WIDTH + 50:
+                    self.bullet_pool.release(bullet)
+                else:
+                    bullets[keep] = bullet
+                    keep += 1
+            del bullets[keep:]
+
+    def has_buff(self, buff_type):
+        return bool(self.active_buffs & BUFFS_BY_NAME[buff_type].bit)
+
+    def buff_time_left(self, buff):
+        """Fraction of the buff's duration still to go, 0 when it is off."""
+        if not self.active_buffs & buff.bit:
+            return 0.0
+        return 1 - self.buff_timers[buff.index] / buff.duration
+
+    def activate_buff(self, buff_type):
+        buff = BUFFS_BY_NAME.get(buff_type)
+        if buff is not None:
+            self.active_buffs |= buff.bit
+            self.buff_timers[buff.index] = 0
+            if buff.on_activate:
+                buff.on_activate(self)
+
+    def remove_buff(self, buff_type):
+        buff = BUFFS_BY_NAME.get(buff_type)
+        if buff is not None:
+            self.end_buff(buff)
+
+    def end_buff(self, buff):
+        self.active_buffs &= ~buff.bit
+        self.buff_timers[buff.index] = 0
+        if buff.on_expire:
+            buff.on_expire(self)
+
+    def reset_jumps(self):
+        self.jumps_remaining = 2
+
+    def clear_bullets(self):
+        bullets = self.bullets
+        for bullet in bullets:
+            self.bullet_pool.release(bullet)
+        bullets.clear()
+
+    def shoot(self):
+        if self.active_buffs & BUFF_WEAPON and len(self.bullets) < 3:  # Less bullets
+            bullet = self.bullet_pool.acquire()
+            bullet.spawn(self.x + self.width, self.y + self.height / 2 - 5)
+            self.bullets.append(bullet)
+
+    def state(self):
+        """Plain tuple of everything that changes during a run (see Simulation.snapshot)."""
+        return (self.x, self.y, self.width, self.height, self.velocity_y, self.is_jumping, self.is_ducking,
+                self.active_buffs, tuple(self.buff_timers), self.jumps_remaining,
+                tuple([bullet.state() for bullet in self.bullets]))
+
+    def load(self, state):
+        (self.x, self.y, self.width, self.height, self.velocity_y, self.is_jumping, self.is_ducking,
+         self.active_buffs, timers, self.jumps_remaining, bullets) = state
+        self.buff_timers[:] = timers
+        self.clear_bullets()
+        for bullet_state in bullets:
+            bullet = self.bullet_pool.acquire()
+            bullet.load(bullet_state)
+            self.bullets.append(bullet)
+
+    def get_rect(self):
+        current_width = self.width
+        current_height = self.height
+
+        if self.active_buffs & BUFF_GIANT:
+            current_width = int(self.width * 1.5)
+            current_height = int(self.height * 1.5)
+
+        return (int(self.x), int(self.y), current_width, current_height)
+
+# Every buff in the game. Adding one is a new entry here, in EARLY_BUFF_TYPES and
+# LATE_BUFF_TYPES below and in the weights in difficulty.DEFAULTS;
+# the order is the bit order in Dinosaur.active_buffs
+BUFF_TYPES = [
+    BuffType("double_jump", 250, (80, 160, 255), "2X", on_activate=Dinosaur.reset_jumps),  # Less time
+    BuffType("giant", 350, (255, 140, 0), "G"),  # Less time
+    BuffType("invincible", 400, (255, 215, 0), "S"),  # Less time
+    BuffType("weapon", 450, (180, 80, 220), "W",
+             on_activate=Dinosaur.clear_bullets, on_expire=Dinosaur.clear_bullets),  # Less time
+]
+for index, buff in enumerate(BUFF_TYPES):
+    buff.index = index
+    buff.bit = 1 << index
+del index, buff
+BUFFS_BY_NAME = {buff.name: buff for buff in BUFF_TYPES}
+
+# Bits for the checks in the hot loop
+BUFF_DOUBLE_JUMP = BUFFS_BY_NAME["double_jump"].bit
+BUFF_GIANT = BUFFS_BY_NAME["giant"].bit
+BUFF_INVINCIBLE = BUFFS_BY_NAME["invincible"].bit
+BUFF_WEAPON = BUFFS_BY_NAME["weapon"].bit
+
+def jump_tops():
+    """Top of the dinosaur on each tick of a jump from standing, until it lands."""
+    dino = Dinosaur()
+    dino.jump()
+    dino.update()
+    tops = []
+    while dino.is_jumping:
+        tops.append(int(dino.y))
+        dino.update()
+    return tops
+
+JUMP_TOPS = jump_tops()
+
+def obstacles_are_fair(obstacles, speed):
+    """Can a plain jump at the right tick get past all of these obstacles, ducking the rest
+    of the time? Used on double spawns; the obstacles are taken on their own, at a steady speed."""
+    dino = Dinosaur()
+    left = dino.x
+    right = dino.x + dino.width
+    ground = SCREEN_HEIGHT - GROUND_HEIGHT
+    standing = ground - dino.normal_height
+    # Ducking keeps the dinosaur's top where it was, so take the box from the dinosaur itself
+    dino.duck(True)
+    _, ducking_top, _, ducked_height = dino.get_rect()
+    ducking_bottom = ducking_top + ducked_height
+
+    # Ticks on which an obstacle is level with the dinosaur: (tick, top, bottom)
+    level_with = []
+    for obstacle in obstacles:
+        step = speed * (BIRD_SPEED if obstacle.type == "bird" else 1.0)
+        x = obstacle.x
+        tick = 0
+        while int(x) + obstacle.width > left:
+            tick += 1
+            x -= step
+            if int(x) < right and int(x) + obstacle.width > left:
+                level_with.append((tick, obstacle.y, obstacle.y + obstacle.height))
+    if not level_with:
+        return True
+
+    # Never jumping: ducked the whole way
+    if all(bottom <= ducking_top or top >= ducking_bottom for _, top, bottom in level_with):
+        return True
+
+    # Jumping at jump_tick: standing up the tick before (a jump from a duck lands at once),
+    # in the air for len(JUMP_TOPS) ticks, standing on the tick it lands
+    airtime = len(JUMP_TOPS)
+    first = min(tick for tick, _, _ in level_with)
+    last = max(tick for tick, _, _ in level_with)
+    for jump_tick in range(max(1, first - airtime), last + 1):
+        for tick, top, bottom in level_with:
+            k = tick - jump_tick
+            if 0 <= k < airtime:
+                dino_top = JUMP_TOPS[k]
+                dino_bottom = dino_top + dino.normal_height
+            elif k == -1 or k == airtime:
+                dino_top, dino_bottom = standing, ground
+            else:
+                dino_top, dino_bottom = ducking_top, ducking_bottom
+            if dino_top < bottom and dino_bottom > top:
+                break
+        else:
+            return True
+    return False
+
+class Obstacle:
+    __slots__ = ("type", "x", "y", "width", "height", "passed", "destroyed", "wing_up", "wing_timer")
+
+    def __init__(self, x, obstacle_type="cactus", difficulty_level=1, score=0, rolls=(0.5, 0.5, 0.5),
+                 curve=DEFAULT_CURVE):
+        self.spawn(x, obstacle_type, difficulty_level, score, rolls, curve)
+
+    def spawn(self, x, obstacle_type="cactus", difficulty_level=1, score=0, rolls=(0.5, 0.5, 0.5),
+              curve=DEFAULT_CURVE):
+        # Also used to recycle pooled obstacles, so every slot is set here.
+        # rolls: random numbers for a cactus height, or the half of the bird range and the bird height
+        cactus_roll, half_roll, bird_roll = rolls
+        self.type = obstacle_type
+        self.x = x
+        self.passed = False
+        self.destroyed = False
+
+        # Size increases with difficulty AND score
+        row = curve.row(difficulty_level)
+        size_multiplier = curve.size_multiplier(row, score)
+
+        if self.type == "cactus":
+            self.width = int(24 * size_multiplier)
+            self.height = roll_int(cactus_roll, int(CACTUS_MIN_HEIGHT * size_multiplier),
+                                   int(CACTUS_MAX_HEIGHT * size_multiplier))
+            self.y = SCREEN_HEIGHT - GROUND_HEIGHT - self.height
+            self.wing_up = True
+            self.wing_timer = 0
+        else:  # bird - MORE DANGEROUS
+            self.width = int(32 * size_multiplier)
+            self.height = int(24 * size_multiplier)
+            # Birds come lower as the level goes up
+            bird_y_min, bird_y_mid, bird_y_max = row.bird_range
+
+            # MORE BIRDS AT CHALLENGING HEIGHTS
+            if half_roll < curve.bird_top_chance:
+                self.y = roll_int(bird_roll, bird_y_min, bird_y_mid)
+            else:
+                self.y = roll_int(bird_roll, bird_y_mid, bird_y_max)
+
+            self.wing_up = True
+            self.wing_timer = 0
+
+    def update(self, game_speed):
+        self.x -= game_speed * (BIRD_SPEED if self.type == "bird" else 1.0)
+
+        if self.type == "bird":
+            self.wing_timer += 1
+            if self.wing_timer >= 8:  # Faster wings
+                self.wing_up = not self.wing_up
+                self.wing_timer = 0
+
+    def state(self):
+        return (self.type, self.x, self.y, self.width, self.height, self.passed, self.destroyed,
+                self.wing_up, self.wing_timer)
+
+    def load(self, state):
+        (self.type, self.x, self.y, self.width, self.height, self.passed, self.destroyed,
+         self.wing_up, self.wing_timer) = state
+
+    def get_rect(self):
+        return (int(self.x), int(self.y), self.width, self.height)
+
+# Buff types - LESS FREQUENT (their weights are in the difficulty curve)
+EARLY_BUFF_TYPES = ["double_jump", "invincible", "weapon", "giant"]
+LATE_BUFF_TYPES = ["double_jump", "giant", "invincible", "weapon"]
+
+class Buff:
+    __slots__ = ("x", "y", "width", "height", "collected", "types", "type")
+
+    def __init__(self, x, difficulty_level=1, score=0, rolls=(0.5, 0.5, 0.5), curve=DEFAULT_CURVE):
+        self.spawn(x, difficulty_level, score, rolls, curve)
+
+    def spawn(self, x, difficulty_level=1, score=0, rolls=(0.5, 0.5, 0.5), curve=DEFAULT_CURVE):
+        # rolls: random numbers for hard or easy spot, the height and the type
+        hard_roll, height_roll, type_roll = rolls
+        self.x = x
+        self.width = 28
+        self.height = 28
+
+        # BUFFS IN MORE CHALLENGING POSITIONS - more of them high up as the level goes up
+        hard_chance, hard, easy = curve.row(difficulty_level).buff_heights
+        height_range = hard if hard_roll < hard_chance else easy
+
+        self.y = roll_int(height_roll, int(height_range[0]), int(height_range[1]))
+        self.collected = False
+
+        if difficulty_level < 3:
+            self.types = EARLY_BUFF_TYPES
+            weights = curve.early_buff_weights
+        else:
+            self.types = LATE_BUFF_TYPES
+            weights = curve.late_buff_weights
+
+        self.type = roll_choice(type_roll, self.types, weights)
+
+    def update(self, game_speed):
+        self.x -= game_speed
+
+    def state(self):
+        return (self.x, self.y, self.width, self.height, self.collected, self.types, self.type)
+
+    def load(self, state):
+        self.x, self.y, self.width, self.height, self.collected, self.types, self.type = state
+
+    def get_rect(self):
+        return (int(self.x), int(self.y), self.width, self.height)
+
+class Simulation:
+    # Entity classes, so the rendered game can swap in drawable subclasses
+    dinosaur_class = Dinosaur
+    obstacle_class = Obstacle
+    buff_class = Buff
+
+    # Make spawn chunks on a background thread (the rendered game turns this on)
+    background_spawns = False
+
+    def __init__(self, seed=None, curve=None, max_obstacles=12, max_buffs=5):
+        self.screen_width = SCREEN_WIDTH
+        self.screen_height = SCREEN_HEIGHT
+        self.game_speed = GAME_SPEED_INITIAL
+        self.score = 0
+        self.high_score = 0
+        self.game_state = GameState.PLAYING
+        self.difficulty_level = 1
+        self.distance_traveled = 0
+        self.game_time = 0
+
+        self.dinosaur = self.dinosaur_class()
+        self.obstacles = []
+        self.buffs = []
+        self.clouds = []
+
+        # Optimization - adjusted limits
+        self.max_obstacles = max_obstacles
+        self.max_buffs = max_buffs  # LESS BUFFS
+        self.max_clouds = 6
+
+        # Recycled entities, so a running game allocates nothing once the pools are warm
+        self.obstacle_pool = Pool(self.obstacle_class, self.max_obstacles + 1)
+        self.buff_pool = Pool(self.buff_class, self.max_buffs)
+        self.cloud_pool = Pool(Cloud, self.max_clouds)
+
+        # Speed, spawn rates and spawn shapes by level (see difficulty.py)
+        self.curve = curve or DEFAULT_CURVE
+
+        self.obstacle_timer = 0
+        self.obstacle_frequency = self.curve.base_obstacle_frequency
+        self.buff_timer = 0
+        self.buff_frequency = 500  # BUFFS LESS FREQUENT
+        self.cloud_timer = 0
+
+        # Double obstacles spawned, and dropped by the fairness check
+        self.double_obstacles = 0
+        self.unfair_doubles = 0
+
+        # For the score store (see scores.py): buffs picked up, and what ended the run
+        self.buffs_collected = 0
+        self.death_cause = None
+        # For balance statistics (see rollout.py): pickups by BUFF_TYPES index (a tuple, so
+        # snapshots can share it) and obstacles shot down
+        self.buff_counts = (0,) * len(BUFF_TYPES)
+        self.obstacles_shot = 0
+
+        # Every run owns its random streams, so seed + inputs always replay the same run
+        self.seed = None
+        self.rng = None
+        self.spawns = None
+        self.new_rng(seed)
+
+        # One action byte per tick, enough to replay the run (see replay.py)
+        self.input_log = bytearray()
+
+        # Gameplay event stream (see events.py), off unless an EventLog is attached
+        self.events = None
+
+        # Collision scratch space, reused every tick (a double spawn can go one over max_obstacles)
+        obstacle_capacity = self.max_obstacles + 1
+        self.obstacle_bounds = BoundsList(obstacle_capacity)
+        self.buff_bounds = BoundsList(self.max_buffs)
+        self.bullet_hits = []
+        self.candidates = []
+        self.obstacle_starts = []  # int x at the start of the tick
+        self.buff_starts = [0] * self.max_buffs
+        self.dino_start = (0, 0)
+        self.grow_collision_lists(obstacle_capacity)
+
+    def grow_collision_lists(self, count):
+        extra = count - len(self.bullet_hits)
+        self.bullet_hits.extend([0] * extra)
+        self.candidates.extend([0] * extra)
+        self.obstacle_starts.extend([0] * extra)
+
+    def new_rng(self, seed=None):
+        if seed is None:
+            seed = random.randrange(1 << 32)
+        self.seed = seed
+        # Gameplay spawns come from the level generator; this one is only for the clouds
+        self.rng = random.Random(seed)
+        if self.spawns is None:
+            self.spawns = LevelGenerator(seed, self.background_spawns)
+        else:
+            self.spawns.reset(seed)
+
+    def save_high_score(self):
+        # Headless runs keep the high score in memory only
+        pass
+
+    def reset(self, seed=None):
+        self.new_rng(seed)
+        self.dinosaur = self.dinosaur_class()
+        for obstacle in self.obstacles:
+            self.obstacle_pool.release(obstacle)
+        for buff in self.buffs:
+            self.buff_pool.release(buff)
+        for cloud in self.clouds:
+            self.cloud_pool.release(cloud)
+        self.obstacles.clear()
+        self.buffs.clear()
+        self.clouds.clear()
+        self.game_speed = GAME_SPEED_INITIAL
+        self.score = 0
+        self.distance_traveled = 0
+        self.game_time = 0
+        self.difficulty_level = 1
+        self.game_state = GameState.PLAYING
+        self.obstacle_timer = 0
+        self.buff_timer = 0
+        self.obstacle_frequency = self.curve.base_obstacle_frequency
+        self.cloud_timer = 0
+        self.double_obstacles = 0
+        self.unfair_doubles = 0
+        self.buffs_collected = 0
+        self.death_cause = None
+        self.buff_counts = (0,) * len(BUFF_TYPES)
+        self.obstacles_shot = 0
+        self.input_log = bytearray()
+        if self.events is not None:
+            self.events.add(0, RUN_START, value=self.seed)
+
+    def apply_input(self, action):
+        if action & ACTION_JUMP:
+            self.dinosaur.jump()
+
+        if action & ACTION_SHOOT:
+            self.dinosaur.shoot()
+
+        self.dinosaur.duck(bool(action & ACTION_DUCK))
+
+    def step(self, action=ACTION_NONE):
+        """Advance one tick with the given input action. Returns False once the run is over."""
+        if self.game_state == GameState.PLAYING:
+            self.input_log.append(action)
+            self.apply_input(action)
+            self.update()
+        return self.game_state == GameState.PLAYING
+
+    # Everything that changes during a run, besides the entities and the random stream
+    # (the input log lives in the replay instead)
+    SNAPSHOT_FIELDS = ["game_speed", "score", "high_score", "game_state", "difficulty_level",
+                       "distance_traveled", "game_time", "obstacle_timer", "obstacle_frequency",
+                       "buff_timer", "cloud_timer", "double_obstacles", "unfair_doubles",
+                       "buffs_collected", "death_cause", "buff_counts", "obstacles_shot", "seed"]
+    snapshot_fields = attrgetter(*SNAPSHOT_FIELDS)
+
+    def snapshot(self):
+        """Copy of the run state, including the random stream positions.
+
+        Only immutable tuples of numbers and strings, so taking one costs a few
+        microseconds and a snapshot can be restored any number of times."""
+        return (self.snapshot_fields(self),
+                self.dinosaur.state(),
+                tuple([obstacle.state() for obstacle in self.obstacles]),
+                tuple([buff.state() for buff in self.buffs]),
+                tuple([cloud.state() for cloud in self.clouds]),
+                self.rng.getstate(),
+                self.spawns.state())
+
+    def restore(self, state):
+        """Go back to a state returned by snapshot(). The snapshot can be restored again later."""
+        fields, dinosaur, obstacles, buffs, clouds, rng_state, spawns_state = state
+        for name, value in zip(self.SNAPSHOT_FIELDS, fields):
+            setattr(self, name, value)
+        self.dinosaur.load(dinosaur)
+        self.load_entities(self.obstacles, self.obstacle_pool, obstacles)
+        self.load_entities(self.buffs, self.buff_pool, buffs)
+        self.load_entities(self.clouds, self.cloud_pool, clouds)
+        self.rng.setstate(rng_state)
+        self.spawns.load(spawns_state)
+        del self.input_log[self.game_time:]
+
+    def interpolate(self, previous, alpha):
+        """For drawing between two ticks: after restore() of the latest snapshot, move
+        everything back (1 - alpha) of the way to where it was in the snapshot before.
+        The run can't go on from the result, restore a snapshot first."""
+        back = 1 - alpha
+        if back <= 0:
+            return
+        fields, dinosaur = previous[0], previous[1]
+        self.score -= (self.score - fields[SCORE_FIELD]) * back
+        self.distance_traveled -= (self.distance_traveled - fields[DISTANCE_FIELD]) * back
+
+        dino = self.dinosaur
+        if dino.height == dinosaur[3]:  # Ducking snaps the dino up or down, don't slide that
+            dino.y -= (dino.y - dinosaur[1]) * back
+        for bullet in dino.bullets:
+            bullet.x -= BULLET_SPEED * back
+
+        # Every entity moved by a known step last tick (new ones just start a bit off screen)
+        speed = self.game_speed
+        for obstacle in self.obstacles:
+            obstacle.x += speed * (BIRD_SPEED if obstacle.type == "bird" else 1.0) * back
+        for buff in self.buffs:
+            buff.x += speed * back
+        for cloud in self.clouds:
+            cloud.x += cloud.speed * back
+
+    def load_entities(self, entities, pool, states):
+        for entity in entities:
+            pool.release(entity)
+        entities.clear()
+        for entity_state in states:
+            entity = pool.acquire()
+            entity.load(entity_state)
+            entities.append(entity)
+
+    def update_difficulty(self):
+        self.distance_traveled += self.game_speed
+        self.game_time += 1
+
+        # The level only goes up; everything that depends on it alone is in the curve's row
+        curve = self.curve
+        new_level = curve.level(self.score, self.game_time)
+        if new_level > self.difficulty_level:
+            self.difficulty_level = new_level
+            if self.events is not None:
+                self.events.add(self.game_time, LEVEL_UP, value=new_level)
+        row = curve.row(self.difficulty_level)
+
+        self.game_speed = curve.speed(row, self.score)
+        self.obstacle_frequency = curve.obstacle_frequency(row, self.score)
+        return row
+
+    def update(self):
+        if self.game_state != GameState.PLAYING:
+            return
+
+        # Remove off-screen objects (first, so what is left can be numbered for the starts)
+        self.cleanup_off_screen_objects()
+
+        self.record_starts()
+        dinosaur = self.dinosaur
+        dinosaur.update()
+        row = self.update_difficulty()
+
+        # Faster speed increase
+        score_speed_increment = min(self.score / 30000, 0.003)
+        self.game_speed += self.curve.game_speed_increment + score_speed_increment
+
+        # Update score
+        self.score += row.score_per_tick
+
+        # Update obstacles
+        for obstacle in self.obstacles:
+            obstacle.update(self.game_speed)
+
+        self.check_obstacle_collisions()
+
+        # Buffs
+        for buff in self.buffs:
+            buff.update(self.game_speed)
+
+        self.check_buff_collisions()
+
+        # Clouds
+        for cloud in self.clouds:
+            cloud.x -= cloud.speed
+
+        # Generate obstacles - MORE CHALLENGING
+        self.obstacle_timer += 1
+        if self.obstacle_timer >= self.obstacle_frequency and len(self.obstacles) < self.max_obstacles:
+            self.obstacle_timer = 0
+            spawned, dropped = self.make_obstacles(self.spawns.obstacles.next(), row, self.obstacle_pool.acquire)
+            self.obstacles += spawned
+            if dropped is not None:
+                self.unfair_doubles += 1
+                self.obstacle_pool.release(dropped)
+            elif len(spawned) == 2:
+                self.double_obstacles += 1
+            if self.events is not None:
+                for obstacle in spawned:
+                    self.events.add(self.game_time, OBSTACLE_SPAWN, SUBJECTS[obstacle.type],
+                                    int(obstacle.x), int(obstacle.y), self.score)
+
+        # Generate buffs - LESS FREQUENT AND HARDER
+        self.buff_timer += 1
+        if (self.buff_timer >= self.buff_frequency and
+            len(self.buffs) < self.max_buffs and
+            self.spawns.gates.next() < row.buff_chance):
+
+            self.buff_timer = 0
+            buff = self.buff_pool.acquire()
+            buff.spawn(SCREEN_WIDTH, self.difficulty_level, self.score, self.spawns.buffs.next(), self.curve)
+            self.buffs.append(buff)
+            if self.events is not None:
+                self.events.add(self.game_time, BUFF_SPAWN, SUBJECTS[buff.type], int(buff.x), int(buff.y),
+                                self.score)
+
+        # Generate clouds
+        self.cloud_timer += 1
+        if self.cloud_timer >= 100 and len(self.clouds) < self.max_clouds:
+            self.cloud_timer = 0
+            if self.rng.random() < 0.4:
+                self.clouds.append(self.create_cloud())
+
+    def make_obstacles(self, record, row, acquire):
+        """Turn one obstacle record from the level generator into obstacles at the current
+        level and score. A double that cannot be got past loses its second obstacle.
+        Returns (obstacles, the dropped obstacle or None)."""
+        type_roll, double_roll, gap_roll = record[:3]
+
+        # MORE BIRDS as difficulty increases
+        obstacle_type = "cactus" if type_roll < row.cactus_chance else "bird"
+        obstacle = acquire()
+        obstacle.spawn(SCREEN_WIDTH, obstacle_type, self.difficulty_level, self.score, record[3:6], self.curve)
+
+        # MORE CHANCE FOR DOUBLE OBSTACLES
+        if double_roll >= row.double_chance:
+            return [obstacle], None
+        extra_type = "bird" if obstacle_type == "cactus" else "cactus"
+        extra_x = SCREEN_WIDTH + roll_int(gap_roll, 30, 100)  # Closer
+        extra = acquire()
+        extra.spawn(extra_x, extra_type, self.difficulty_level, self.score, record[6:9], self.curve)
+        if obstacles_are_fair((obstacle, extra), self.game_speed):
+            return [obstacle, extra], None
+        return [obstacle], extra
+
+    def upcoming_obstacles(self, count=10):
+        """The next count obstacle spawns as [(type, x, y, width, height), ...] lists, worked
+        out at the current level and score (the real ones can come out bigger if those go up first)."""
+        row = self.curve.row(self.difficulty_level)
+        upcoming = []
+        for record in self.spawns.obstacles.peek(count):
+            obstacles, _ = self.make_obstacles(record, row, lambda: Obstacle.__new__(Obstacle))
+            upcoming.append([(obstacle.type, obstacle.x, obstacle.y, obstacle.width, obstacle.height)
+                             for obstacle in obstacles])
+        return upcoming
+
+    def check_obstacle_collisions(self):
+        dinosaur = self.dinosaur
+        obstacles = self.obstacles
+        count = len(obstacles)
+        bullet_hits = self.bullet_hits
+        candidates = self.candidates
+        starts = self.obstacle_starts
+        for i in range(count):
+            bullet_hits[i] = 0
+        # Obstacle index -> time of impact in the tick, only for the few that get hit
+        crash_times = {}
+        destroy_times = {}
+
+        bounds = self.obstacle_bounds
+        bounds.load(obstacles, starts)
+
+        # Collision with dinosaur: when it touches each obstacle during the tick
+        if not dinosaur.active_buffs & BUFF_INVINCIBLE:
+            x, y, width, height = dinosaur.get_rect()
+            start_x, start_y = self.dino_start
+            # The dino only moves up and down
+            top, bottom = (y, start_y + height) if y < start_y else (start_y, y + height)
+            for k in range(bounds.query(x, top, x + width, bottom, candidates)):
+                i = candidates[k]
+                obstacle = obstacles[i]
+                obstacle_x = int(obstacle.x)
+                hit = sweep(start_x, start_y, width, height, x - start_x, y - start_y,
+                            starts[i], obstacle.y, obstacle.width, obstacle.height, obstacle_x - starts[i], 0)
+                if hit is not None:
+                    crash_times[i] = hit
+
+        # COLLISION WITH PROJECTILES - each bullet hits the first obstacle it reaches (the first in
+        # list order on a tie), unless another bullet destroyed that one earlier in the tick
+        if dinosaur.active_buffs & BUFF_WEAPON and dinosaur.bullets:
+            bullets = dinosaur.bullets
+            hits = []
+            for b, bullet in enumerate(bullets):
+                x, y = bullet.x, bullet.y
+                start_x = x - BULLET_SPEED
+                for k in range(bounds.query(start_x, y, x + bullet.width, y + bullet.height, candidates)):
+                    i = candidates[k]
+                    obstacle = obstacles[i]
+                    hit = sweep(start_x, y, bullet.width, bullet.height, BULLET_SPEED, 0,
+                                starts[i], obstacle.y, obstacle.width, obstacle.height,
+                                int(obstacle.x) - starts[i], 0)
+                    if hit is not None:
+                        hits.append((hit, b, i))
+            if hits:
+                hits.sort()
+                used = [False] * len(bullets)
+                for hit, b, i in hits:
+                    if used[b] or destroy_times.get(i, hit) < hit:
+                        continue
+                    used[b] = True
+                    destroy_times.setdefault(i, hit)
+                    bullet_hits[i] += 1
+                # Remove bullets that hit
+                keep = 0
+                for b, bullet in enumerate(bullets):
+                    if used[b]:
+                        dinosaur.bullet_pool.release(bullet)
+                    else:
+                        bullets[keep] = bullet
+                        keep += 1
+                del bullets[keep:]
+
+        # Apply the results in list order, so the score adds up exactly as before. An obstacle
+        # shot away before the dino got to it is not a crash
+        events = self.events
+        for i in range(count):
+            obstacle = obstacles[i]
+            if crash_times and i in crash_times and crash_times[i] <= destroy_times.get(i, NO_HIT):
+                if self.game_state != GameState.GAME_OVER:
+                    self.death_cause = obstacle.type
+                    if events is not None:
+                        events.add(self.game_time, DEATH, SUBJECTS[obstacle.type], int(obstacle.x),
+                                   int(obstacle.y), self.score)
+                self.game_state = GameState.GAME_OVER
+                if self.score > self.high_score:
+                    self.high_score = self.score
+                    self.save_high_score()
+
+            if bullet_hits[i]:
+                obstacle.destroyed = True
+                self.obstacles_shot += 1
+                for _ in range(bullet_hits[i]):
+                    self.score += 20  # More points for destroying
+                    if events is not None:
+                        events.add(self.game_time, BULLET_HIT, SUBJECTS[obstacle.type], int(obstacle.x),
+                                   int(obstacle.y), self.score)
+
+            # Mark as passed
+            if not obstacle.passed and obstacle.x < dinosaur.x:
+                obstacle.passed = True
+                self.score += 5
+                if events is not None:
+                    events.add(self.game_time, PASSED, SUBJECTS[obstacle.type], int(obstacle.x),
+                               int(obstacle.y), self.score)
+
+    def check_buff_collisions(self):
+        dinosaur = self.dinosaur
+        buffs = self.buffs
+        candidates = self.candidates
+        if not buffs:
+            return
+        starts = self.buff_starts
+        bounds = self.buff_bounds
+        bounds.load(buffs, starts)
+
+        # Collect in the order the dino reaches them (list order on a tie). A giant buff grows
+        # the dino, so look again after each pickup.
+        start_x, start_y = self.dino_start
+        while True:
+            x, y, width, height = dinosaur.get_rect()
+            top, bottom = (y, start_y + height) if y < start_y else (start_y, y + height)
+            first = None
+            first_time = NO_HIT
+            for k in range(bounds.query(x, top, x + width, bottom, candidates)):
+                i = candidates[k]
+                buff = buffs[i]
+                if buff.collected:
+                    continue
+                hit = sweep(start_x, start_y, width, height, x - start_x, y - start_y,
+                            starts[i], buff.y, buff.width, buff.height, int(buff.x) - starts[i], 0)
+                if hit is not None and (hit < first_time or hit == first_time and i < first):
+                    first = i
+                    first_time = hit
+            if first is None:
+                break
+
+            buff = buffs[first]
+            buff.collected = True
+            dinosaur.activate_buff(buff.type)
+            self.buffs_collected += 1
+            counts = list(self.buff_counts)
+            counts[BUFFS_BY_NAME[buff.type].index] += 1
+            self.buff_counts = tuple(counts)
+            self.score += 30  # More points for collecting hard buff
+            if self.events is not None:
+                self.events.add(self.game_time, BUFF_COLLECT, SUBJECTS[buff.type], int(buff.x), int(buff.y),
+                                self.score)
+
+    def record_starts(self):
+        """Where the dino, obstacles and buffs start the tick, for the swept collision checks
+        (by list position, so the lists must not change before the checks)."""
+        dinosaur = self.dinosaur
+        self.dino_start = (int(dinosaur.x), int(dinosaur.y))
+        obstacles = self.obstacles
+        if len(obstacles) > len(self.obstacle_starts):
+            self.grow_collision_lists(len(obstacles))
+        starts = self.obstacle_starts
+        for i, obstacle in enumerate(obstacles):
+            starts[i] = int(obstacle.x)
+        starts = self.buff_starts
+        for i, buff in enumerate(self.buffs):
+            starts[i] = int(buff.x)
+
+    def cleanup_off_screen_objects(self):
+        """Remove objects completely off screen"""
+        # Compacted in place (keeping the order) and the removed ones go back to their pool
+
+        # Obstacles
+        obstacles = self.obstacles
+        keep = 0
+        for obstacle in obstacles:
+            if obstacle.x > -100 and not obstacle.destroyed:
+                obstacles[keep] = obstacle
+                keep += 1
+            else:
+                self.obstacle_pool.release(obstacle)
+        del obstacles[keep:]
+
+        # Buffs
+        buffs = self.buffs
+        keep = 0
+        for buff in buffs:
+            if buff.x > -100 and not buff.collected:
+                buffs[keep] = buff
+                keep += 1
+            else:
+                self.buff_pool.release(buff)
+        del buffs[keep:]
+
+        # Clouds
+        clouds = self.clouds
+        keep = 0
+        for cloud in clouds:
+            if cloud.x > -200:
+                clouds[keep] = cloud
+                keep += 1
+            else:
+                self.cloud_pool.release(cloud)
+        del clouds[keep:]
+
+    def create_cloud(self):
+        cloud = self.cloud_pool.acquire()
+        cloud.spawn(self.rng)
+        return cloud
+
+SCORE_FIELD = Simulation.SNAPSHOT_FIELDS.index("score")
+DISTANCE_FIELD = Simulation.SNAPSHOT_FIELDS.index("distance_traveled")
+
+def simple_policy(sim):
+    # Jump when a cactus gets close, duck under low birds
+    dino = sim.dinosaur
+    for obstacle in sim.obstacles:
+        distance = obstacle.x - (dino.x + dino.width)
+        if 0 <= distance < 40 + sim.game_speed * 8:
+            if obstacle.type == "cactus":
+                return ACTION_JUMP
+            if obstacle.y + obstacle.height > SCREEN_HEIGHT - GROUND_HEIGHT - dino.normal_height:
+                return ACTION_DUCK
+    return ACTION_NONE
+
+def run(policy=simple_policy, seed=None, max_ticks=100000):
+    """Play one headless run to the end (or max_ticks). Returns the finished Simulation."""
+    sim = Simulation(seed)
+    for _ in range(max_ticks):
+        if not sim.step(policy(sim)):
+            break
+    return sim
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    start = time.perf_counter()
+    ticks = 0
+    best = 0
+    for seed in range(runs):
+        sim = run(seed=seed)
+        ticks += sim.game_time
+        best = max(best, sim.score)
+    elapsed = time.perf_counter() - start
+    print(f"{runs} runs, {ticks} ticks in {elapsed:.2f}s ({ticks / elapsed:.0f} ticks/s), best score {int(best)}")
@@ -0,0 +1,299 @@
+"""Reinforcement-learning environment around the headless engine.
+
+RunnerEnv follows the Gymnasium API (reset(seed) -> obs, info and
+step(action) -> obs, reward, terminated, truncated, info) without needing
+gymnasium installed. Actions are the engine's ACTION_* bitmasks (0-7).
+Observations are a feature vector, a small grayscale frame of boxes, or
+the game as it looks on screen ("screen": the real drawing code, drawn on
+the CPU by soft_raylib.py). VectorEnv steps many of them and writes every
+observation straight into one preallocated array.
+"""
+import sys
+
+import numpy as np
+
+from engine import (Simulation, GameState, SCREEN_WIDTH, SCREEN_HEIGHT, GROUND_HEIGHT,
+                    ACTION_DUCK, BUFF_WEAPON, BUFF_TYPES)
+
+class Discrete:
+    def __init__(self, n):
+        self.n = n
+        self.shape = ()
+        self.dtype = np.int64
+
+    def sample(self, rng=None):
+        rng = rng or np.random.default_rng()
+        return int(rng.integers(self.n))
+
+    def contains(self, x):
+        return 0 <= int(x) < self.n
+
+class Box:
+    def __init__(self, low, high, shape, dtype=np.float32):
+        self.low = np.full(shape, low, dtype=dtype)
+        self.high = np.full(shape, high, dtype=dtype)
+        self.shape = tuple(shape)
+        self.dtype = dtype
+
+    def sample(self, rng=None):
+        rng = rng or np.random.default_rng()
+        if np.issubdtype(self.dtype, np.integer):
+            return rng.integers(self.low, self.high, endpoint=True).astype(self.dtype)
+        return rng.uniform(self.low, self.high).astype(self.dtype)
+
+    def contains(self, x):
+        x = np.asarray(x)
+        return x.shape == self.shape and bool(np.all(x >= self.low) and np.all(x <= self.high))
+
+# Feature vector layout: the dino, then K obstacles, then the nearest buff on the track
+DINO_FEATURES = 6 + len(BUFF_TYPES)  # y, velocity, jumping, ducking, speed, level, buff timers
+OBSTACLE_FEATURES = 6  # present, dx, dy, width, height, bird
+PICKUP_FEATURES = 3  # present, dx, dy
+
+# Shades for the pixel observation
+SKY = 0
+GROUND = 60
+PICKUP = 120
+BULLET = 160
+OBSTACLE = 200
+DINO = 255
+
+class RunnerEnv:
+    def __init__(self, observation="features", frame_skip=4, nearest_obstacles=4,
+                 pixel_scale=8, max_ticks=20000, out=None, curve=None):
+        if observation not in ("features", "pixels", "screen"):
+            raise ValueError("observation must be 'features', 'pixels' or 'screen'")
+        self.observation = observation
+        self.frame_skip = frame_skip
+        self.nearest_obstacles = nearest_obstacles
+        self.pixel_scale = pixel_scale
+        self.max_ticks = max_ticks
+        if observation == "screen":
+            self.sim = screen_game(curve, pixel_scale)
+        else:
+            self.sim = Simulation(curve=curve)
+
+        self.action_space = Discrete(8)
+        size = DINO_FEATURES + nearest_obstacles * OBSTACLE_FEATURES + PICKUP_FEATURES
+        if observation == "features":
+            self.observation_space = Box(-np.inf, np.inf, (size,))
+            # Written in place every step; VectorEnv hands in a row of its own array
+            self.obs = out if out is not None else np.zeros(size, dtype=np.float32)
+        elif observation == "screen":
+            import soft_raylib
+            shape = soft_raylib.frame().shape
+            self.observation_space = Box(0, 255, shape, np.uint8)
+            self.obs = out if out is not None else np.zeros(shape, dtype=np.uint8)
+        else:
+            shape = (SCREEN_HEIGHT // pixel_scale, SCREEN_WIDTH // pixel_scale)
+            self.observation_space = Box(0, 255, shape, np.uint8)
+            self.obs = out if out is not None else np.zeros(shape, dtype=np.uint8)
+
+        # Scratch space for the nearest obstacles: x and list index of each one ahead
+        capacity = self.sim.max_obstacles + 1
+        self.ahead_x = [0.0] * capacity
+        self.ahead_index = [0] * capacity
+
+    def reset(self, seed=None):
+        self.sim.reset(seed)
+        self.encode()
+        return self.obs.copy(), self.info()
+
+    def step(self, action):
+        reward, terminated, truncated = self.advance(action)
+        self.encode()
+        return self.obs.copy(), reward, terminated, truncated, self.info()
+
+    def advance(self, action):
+        """Play `action` for frame_skip ticks. Jump and shoot are presses, so they
+        only go in on the first tick; duck is held for all of them."""
+        sim = self.sim
+        start_score = sim.score
+        held = action & ACTION_DUCK
+        for _ in range(self.frame_skip):
+            if not sim.step(action):
+                break
+            action = held
+        terminated = sim.game_state == GameState.GAME_OVER
+        truncated = not terminated and sim.game_time >= self.max_ticks
+        return sim.score - start_score, terminated, truncated
+
+    def info(self):
+        sim = self.sim
+        return {"score": sim.score, "level": sim.difficulty_level, "ticks": sim.game_time,
+                "seed": sim.seed}
+
+    def encode(self):
+        if self.observation == "features":
+            self.encode_features(self.obs)
+        elif self.observation == "screen":
+            self.encode_screen(self.obs)
+        else:
+            self.encode_pixels(self.obs)
+
+    def encode_features(self, out):
+        sim = self.sim
+        dino = sim.dinosaur
+        out[:] = 0
+
+        out[0] = dino.y / SCREEN_HEIGHT
+        out[1] = dino.velocity_y / 20
+        out[2] = dino.is_jumping
+        out[3] = dino.is_ducking
+        out[4] = sim.game_speed / 20
+        out[5] = sim.difficulty_level / 20
+        # Time left on each buff, 0 when it is off
+        for buff in BUFF_TYPES:
+            out[6 + buff.index] = dino.buff_time_left(buff)
+
+        # Nearest obstacles that have not gone past the dino yet, picked out in place: only
+        # the first nearest_obstacles places are sorted (by x, then list order)
+        ahead_x = self.ahead_x
+        ahead_index = self.ahead_index
+        count = 0
+        for i, obstacle in enumerate(sim.obstacles):
+            if not obstacle.destroyed and obstacle.x + obstacle.width > dino.x:
+                ahead_x[count] = obstacle.x
+                ahead_index[count] = i
+                count += 1
+        base = DINO_FEATURES
+        for place in range(min(count, self.nearest_obstacles)):
+            best = place
+            for j in range(place + 1, count):
+                if ahead_x[j] < ahead_x[best] or (ahead_x[j] == ahead_x[best] and
+                                                  ahead_index[j] < ahead_index[best]):
+                    best = j
+            ahead_x[place], ahead_x[best] = ahead_x[best], ahead_x[place]
+            ahead_index[place], ahead_index[best] = ahead_index[best], ahead_index[place]
+            obstacle = sim.obstacles[ahead_index[place]]
+            out[base] = 1
+            out[base + 1] = (obstacle.x - dino.x) / SCREEN_WIDTH
+            out[base + 2] = (obstacle.y - dino.y) / SCREEN_HEIGHT
+            out[base + 3] = obstacle.width / 100
+            out[base + 4] = obstacle.height / 100
+            out[base + 5] = obstacle.type == "bird"
+            base += OBSTACLE_FEATURES
+
+        # Nearest buff pickup ahead
+        base = DINO_FEATURES + self.nearest_obstacles * OBSTACLE_FEATURES
+        best = None
+        for buff in sim.buffs:
+            if not buff.collected and buff.x + buff.width > dino.x and (best is None or buff.x < best.x):
+                best = buff
+        if best is not None:
+            out[base] = 1
+            out[base + 1] = (best.x - dino.x) / SCREEN_WIDTH
+            out[base + 2] = (best.y - dino.y) / SCREEN_HEIGHT
+
+    def encode_pixels(self, out):
+        """Boxes only, in shades of gray, at 1/pixel_scale of the screen size."""
+        sim = self.sim
+        scale = self.pixel_scale
+        out[:] = SKY
+        out[(SCREEN_HEIGHT - GROUND_HEIGHT) // scale:] = GROUND
+
+        def fill(rect, shade):
+            x, y, width, height = rect
+            x0 = max(int(x) // scale, 0)
+            y0 = max(int(y) // scale, 0)
+            x1 = (int(x) + width + scale - 1) // scale
+            y1 = (int(y) + height + scale - 1) // scale
+            if x1 > x0 and y1 > y0:
+                out[y0:y1, x0:x1] = shade
+
+        for buff in sim.buffs:
+            if not buff.collected:
+                fill(buff.get_rect(), PICKUP)
+        for obstacle in sim.obstacles:
+            if not obstacle.destroyed:
+                fill(obstacle.get_rect(), OBSTACLE)
+        dino = sim.dinosaur
+        if dino.active_buffs & BUFF_WEAPON:
+            for bullet in dino.bullets:
+                fill((bullet.x, bullet.y, bullet.width, bullet.height), BULLET)
+        fill(dino.get_rect(), DINO)
+
+    def encode_screen(self, out):
+        import soft_raylib
+        self.sim.draw()
+        out[:] = soft_raylib.frame()
+
+def screen_game(curve, pixel_scale):
+    """A main.Game (it has the drawing code) on the soft_raylib backend at 1/pixel_scale."""
+    import soft_raylib
+    if "raylibpy" not in sys.modules:
+        soft_raylib.install(scale=1 / pixel_scale)
+    if sys.modules["raylibpy"] is not soft_raylib or soft_raylib.scale != 1 / pixel_scale:
+        raise RuntimeError("observation='screen' draws with soft_raylib: call soft_raylib.install("
+                           "scale=1 / pixel_scale) before anything imports main.py")
+    from main import Game
+    return Game(curve, persistent=False)
+
+class VectorEnv:
+    """num_envs RunnerEnvs stepped together. A finished env is reset right away (seeded
+    with the next seed); its last observation is in info["final_obs"]."""
+
+    def __init__(self, num_envs, seed=0, **kwargs):
+        self.num_envs = num_envs
+        # The first env says how big the observations are, then writes into its row too
+        self.envs = [RunnerEnv(**kwargs)]
+        space = self.envs[0].observation_space
+        self.single_observation_space = space
+        self.action_space = self.envs[0].action_space
+        self.obs = np.zeros((num_envs,) + space.shape, dtype=space.dtype)
+        self.envs[0].obs = self.obs[0]
+        self.envs += [RunnerEnv(out=self.obs[i], **kwargs) for i in range(1, num_envs)]
+        self.rewards = np.zeros(num_envs)
+        self.terminated = np.zeros(num_envs, dtype=bool)
+        self.truncated = np.zeros(num_envs, dtype=bool)
+        self.next_seed = seed
+
+    def seed_for_next_run(self):
+        seed = self.next_seed
+        self.next_seed += 1
+        return seed
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.next_seed = seed
+        for env in self.envs:
+            env.sim.reset(self.seed_for_next_run())
+            env.encode()
+        return self.obs.copy(), {}
+
+    def step(self, actions):
+        final = {}
+        for i, env in enumerate(self.envs):
+            reward, terminated, truncated = env.advance(int(actions[i]))
+            self.rewards[i] = reward
+            self.terminated[i] = terminated
+            self.truncated[i] = truncated
+            if terminated or truncated:
+                env.encode()
+                final[i] = (env.obs.copy(), env.info())
+                env.sim.reset(self.seed_for_next_run())
+            env.encode()
+
+        info = {}
+        if final:
+            info["final_obs"] = {i: obs for i, (obs, _) in final.items()}
+            info["final_info"] = {i: run_info for i, (_, run_info) in final.items()}
+        return self.obs.copy(), self.rewards.copy(), self.terminated.copy(), self.truncated.copy(), info
+
+if __name__ == "__main__":
+    import time
+
+    num_envs = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    steps = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    observation = sys.argv[3] if len(sys.argv) > 3 else "features"
+    envs = VectorEnv(num_envs, observation=observation)
+    envs.reset(seed=0)
+    rng = np.random.default_rng(0)
+    start = time.perf_counter()
+    for _ in range(steps):
+        actions = rng.choice([0, 1, 2], size=num_envs, p=[0.9, 0.05, 0.05])
+        envs.step(actions)
+    elapsed = time.perf_counter() - start
+    ticks = num_envs * steps * envs.envs[0].frame_skip
+    print(f"{num_envs * steps} env steps ({ticks} ticks) in {elapsed:.2f}s, "
+          f"{num_envs * steps / elapsed:.0f} steps/s")
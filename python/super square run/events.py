@@ -0,0 +1,211 @@
+"""Gameplay event stream: what happened in a run, tick by tick.
+
+With an EventLog attached (sim.events = EventLog(...)), the simulation
+records every spawn, pickup, bullet hit, obstacle passed, level up and
+death as a fixed-size binary record in a ring buffer. The tick only packs
+the record into the ring; a background thread copies whatever is in it to
+the file in batches, so the disk never holds up a tick. If the writer falls
+a whole ring behind, new events are dropped and counted (dropped, and a
+DROPPED record in the file once there is room again); block=True makes
+the tick wait for room instead, for tools that want every event.
+
+One log is one file: the game keeps one for the whole session, with a
+RUN_START record at the start of each run.
+
+    python events.py events/session_xxx.ssev            # one JSON object per line
+    python events.py events/session_xxx.ssev --summary  # counts per run
+    python events.py --replay replays/run_xxx.ssr out.ssev
+"""
+import json
+import os
+import struct
+import threading
+import time
+
+EVENT_DIR = "events"
+
+MAGIC = b"SSEV"
+VERSION = 1
+HEADER = struct.Struct("<4sBxxx")
+
+# tick, kind, subject, x, y, value (the score, or the level for LEVEL_UP)
+RECORD = struct.Struct("<IBBhhd")
+
+# Event kinds
+RUN_START = 0  # value is the seed
+OBSTACLE_SPAWN = 1
+BUFF_SPAWN = 2
+BUFF_COLLECT = 3
+BULLET_HIT = 4
+PASSED = 5
+LEVEL_UP = 6
+DEATH = 7  # subject is what the dino hit
+DROPPED = 8  # value is how many events were lost before this one
+KIND_NAMES = ["run_start", "obstacle_spawn", "buff_spawn", "buff_collect", "bullet_hit", "passed",
+              "level_up", "death", "dropped"]
+
+# What an event is about, one byte: the obstacle types, then engine.BUFF_TYPES in order
+SUBJECT_NAMES = ["", "cactus", "bird", "double_jump", "giant", "invincible", "weapon"]
+SUBJECTS = {name: index for index, name in enumerate(SUBJECT_NAMES)}
+
+class EventLog:
+    def __init__(self, path=None, size=8192, flush_interval=0.25, block=False):
+        if path is None:
+            os.makedirs(EVENT_DIR, exist_ok=True)
+            path = os.path.join(EVENT_DIR, time.strftime("session_%Y%m%d_%H%M%S.ssev"))
+        self.path = path
+        self.size = size
+        self.buffer = bytearray(RECORD.size * size)
+        self.block = block
+        self.flush_interval = flush_interval
+        # Events ever added and ever written: only the tick moves head, only the writer moves
+        # tail, so the two threads never wait on each other for the ring itself
+        self.head = 0
+        self.tail = 0
+        self.dropped = 0
+        self.dropped_reported = 0
+        self.last_dropped_tick = 0
+        self.written = 0
+
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION))
+        self.wake = threading.Event()
+        self.room = threading.Event()
+        self.closing = False
+        self.thread = threading.Thread(target=self.loop, name="events", daemon=True)
+        self.thread.start()
+
+    def add(self, tick, kind, subject=0, x=0, y=0, value=0):
+        head = self.head
+        if self.dropped != self.dropped_reported and head - self.tail < self.size:
+            # There is room again: say how many went missing, in order with the rest
+            RECORD.pack_into(self.buffer, head % self.size * RECORD.size, tick, DROPPED, 0, 0, 0,
+                             self.dropped - self.dropped_reported)
+            self.dropped_reported = self.dropped
+            head += 1
+            self.head = head
+        if head - self.tail >= self.size:
+            if not self.block:
+                self.dropped += 1
+                self.last_dropped_tick = tick
+                self.wake.set()
+                return
+            while head - self.tail >= self.size:
+                self.room.clear()
+                self.wake.set()
+                self.room.wait(0.01)
+        RECORD.pack_into(self.buffer, head % self.size * RECORD.size, tick, kind, subject, x, y, value)
+        self.head = head + 1
+        # Half full: don't wait for the timer
+        if head - self.tail == self.size >> 1:
+            self.wake.set()
+
+    def loop(self):
+        # The file belongs to this thread: it is closed here, once everything is written
+        try:
+            while True:
+                self.wake.wait(self.flush_interval)
+                self.wake.clear()
+                closing = self.closing
+                self.drain()
+                if closing:
+                    # Events dropped since the last DROPPED record never got one in the ring
+                    missing = self.dropped - self.dropped_reported
+                    if missing:
+                        self.file.write(RECORD.pack(self.last_dropped_tick, DROPPED, 0, 0, 0, missing))
+                        self.dropped_reported += missing
+                        self.written += 1
+                    return
+        finally:
+            self.file.close()
+
+    def drain(self):
+        """Write out everything added so far, in at most two writes."""
+        head = self.head
+        tail = self.tail
+        if head == tail:
+            return
+        start = tail % self.size * RECORD.size
+        end = head % self.size * RECORD.size
+        view = memoryview(self.buffer)
+        if start < end:
+            self.file.write(view[start:end])
+        else:
+            self.file.write(view[start:])
+            self.file.write(view[:end])
+        self.file.flush()
+        self.written += head - tail
+        self.tail = head
+        self.room.set()
+
+    def close(self, timeout=2.0):
+        """Write out what is left and close the file. The writer thread does both, so
+        after a timeout it carries on in the background; returns whether it is done."""
+        self.closing = True
+        self.wake.set()
+        self.thread.join(timeout)
+        return not self.thread.is_alive()
+
+def read_events(path):
+    """The events in a file as dicts, in the order they happened."""
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not an event file")
+    if version != VERSION:
+        raise ValueError(f"{path} is event format v{version}, this reader is v{VERSION}")
+    end = len(data) - (len(data) - HEADER.size) % RECORD.size  # A record cut short by a crash
+    for tick, kind, subject, x, y, value in RECORD.iter_unpack(data[HEADER.size:end]):
+        yield {"tick": tick, "kind": KIND_NAMES[kind], "subject": SUBJECT_NAMES[subject],
+               "x": x, "y": y, "value": value}
+
+def summarize(events):
+    """Counts per kind for each run: [(seed, {kind: count})]."""
+    runs = []
+    counts = None
+    for event in events:
+        if event["kind"] == "run_start":
+            counts = {}
+            runs.append((int(event["value"]), counts))
+        elif counts is not None:
+            counts[event["kind"]] = counts.get(event["kind"], 0) + 1
+    return runs
+
+def replay_events(replay, path):
+    """Play a replay headlessly with an event log on, waiting for the writer rather than
+    dropping. Returns the number of events written."""
+    from engine import Simulation, RULES_VERSION
+
+    if replay.rules_version != RULES_VERSION:
+        raise ValueError(f"replay was recorded with rules v{replay.rules_version}, "
+                         f"this engine is v{RULES_VERSION}")
+    sim = Simulation()
+    sim.events = EventLog(path, block=True)
+    sim.reset(replay.seed)
+    for action in replay.actions:
+        sim.step(action)
+    sim.events.close(timeout=None)
+    return sim.events.written
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Print a gameplay event file, or make one from a replay")
+    parser.add_argument("path", help="an event file (.ssev), or a replay (.ssr) with --replay")
+    parser.add_argument("output", nargs="?", help="with --replay: the event file to write")
+    parser.add_argument("--summary", action="store_true", help="counts per run instead of every event")
+    parser.add_argument("--replay", action="store_true", help="play a replay and write its events")
+    args = parser.parse_args()
+
+    if args.replay:
+        from replay import Replay
+
+        output = args.output or os.path.splitext(args.path)[0] + ".ssev"
+        print(f"{replay_events(Replay.load(args.path), output)} events written to {output}")
+    elif args.summary:
+        for seed, counts in summarize(read_events(args.path)):
+            print(f"seed {seed}: " + ", ".join(f"{kind} {count}" for kind, count in sorted(counts.items())))
+    else:
+        for event in read_events(args.path):
+            print(json.dumps(event))
@@ -0,0 +1,177 @@
+"""Turn a replay into a video or a PNG sequence, faster than real time.
+
+The run is played once headlessly to take a snapshot at the start of every
+segment; then a process pool renders the segments side by side, each
+worker restoring its snapshot into a Game drawn by soft_raylib.py (no GPU
+or window needed) and stepping through its part of the input log. Frames
+go straight from the framebuffer to where they end up: into an ffmpeg pipe
+per segment (joined without re-encoding at the end), or row by row into
+PNG files.
+
+    python export.py replays/run_xxx.ssr clip.mp4            # needs ffmpeg on the PATH
+    python export.py replays/run_xxx.ssr frames/ --start 30 --end 45 --scale 0.5
+
+Text is not drawn by soft_raylib, so the exported frames have no HUD.
+"""
+import argparse
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from multiprocessing import Pool
+
+from engine import Simulation, TICK_RATE
+from replay import Replay, RULES_VERSION
+
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".webm", ".mov")
+
+# Worker process state, set up once by init_worker
+worker = {}
+
+def init_worker(scale):
+    import soft_raylib
+    soft_raylib.install(scale=scale)
+    from main import Game
+    worker["soft_raylib"] = soft_raylib
+    worker["game"] = Game(persistent=False)
+
+def png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+def write_png(path, pixels, level=1):
+    """RGBA pixels (height, width, 4) to a PNG file, compressed a row at a time."""
+    height, width, _ = pixels.shape
+    compressor = zlib.compressobj(level)
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)))
+        parts = []
+        for row in pixels:
+            parts.append(compressor.compress(b"\0"))  # No filter on this row
+            parts.append(compressor.compress(row.data))
+        parts.append(compressor.flush())
+        f.write(png_chunk(b"IDAT", b"".join(parts)))
+        f.write(png_chunk(b"IEND", b""))
+
+def ffmpeg_segment(path, width, height):
+    """An ffmpeg that reads raw RGBA frames on stdin and writes an H.264 segment."""
+    return subprocess.Popen(
+        ["ffmpeg", "-loglevel", "error", "-y", "-f", "rawvideo", "-pix_fmt", "rgba",
+         "-s", f"{width}x{height}", "-r", str(TICK_RATE), "-i", "-",
+         "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p", path],
+        stdin=subprocess.PIPE)
+
+def render_segment(job):
+    """Render frames start..end-1 of the run (frame n shows it after n ticks), then repeat
+    the last one hold times. Returns the number of frames written."""
+    index, snapshot, actions, start, end, hold, output, kind = job
+    soft_raylib = worker["soft_raylib"]
+    game = worker["game"]
+    game.restore(snapshot)
+    pixels = soft_raylib.screen.pixels
+    height, width, _ = pixels.shape
+
+    encoder = ffmpeg_segment(output, width, height) if kind == "video" else None
+    try:
+        for frame in range(start, end + hold):
+            if frame < end:
+                if frame > start:
+                    game.step(actions[frame - start - 1])
+                game.draw()
+            if encoder is not None:
+                # The framebuffer goes down the pipe as it is
+                encoder.stdin.write(pixels.data)
+            else:
+                write_png(os.path.join(output, f"frame_{frame:06d}.png"), pixels)
+    finally:
+        if encoder is not None:
+            encoder.stdin.close()
+            if encoder.wait() != 0:
+                raise RuntimeError(f"ffmpeg failed on segment {index}")
+    return end + hold - start
+
+def plan_segments(replay, first, last, segments):
+    """Play the run headlessly and snapshot it at the start of each of the segments that
+    frames first..last are split into. Returns [(snapshot, actions, start, end)]."""
+    actions = replay.actions
+    bounds = [first + (last + 1 - first) * k // segments for k in range(segments + 1)]
+    sim = Simulation(replay.seed)
+    plan = []
+    for start, end in zip(bounds, bounds[1:]):
+        if end > start:
+            while sim.game_time < start:
+                sim.step(actions[sim.game_time])
+            plan.append((sim.snapshot(), actions[start:end - 1], start, end))
+    return plan
+
+def export(replay, output, start=0.0, end=None, scale=1.0, workers=None, segments=None, hold=2.0):
+    """Render the replay (from start to end seconds) to output: a video file (.mp4, .mkv,
+    .webm, .mov; needs ffmpeg) or a folder for a PNG sequence. Returns the number of frames."""
+    if replay.rules_version != RULES_VERSION:
+        raise ValueError(f"replay was recorded with rules v{replay.rules_version}, "
+                         f"this engine is v{RULES_VERSION}")
+    workers = workers or os.cpu_count()
+    segments = segments or workers * 2  # A few more than workers, so nobody waits on one long segment
+    length = len(replay.actions)
+    first = min(int(start * TICK_RATE), length)
+    last = length if end is None else max(min(int(end * TICK_RATE), length), first)
+    # The game over frame stays on screen for a while, if it is in the clip
+    hold_frames = int(hold * TICK_RATE) if last == length else 0
+
+    kind = "video" if os.path.splitext(output)[1].lower() in VIDEO_EXTENSIONS else "png"
+    if kind == "video" and shutil.which("ffmpeg") is None:
+        raise RuntimeError("writing a video needs ffmpeg on the PATH; give a folder for PNG frames")
+    workdir = tempfile.mkdtemp(prefix="ssr_export_") if kind == "video" else None
+    if kind == "png":
+        os.makedirs(output, exist_ok=True)
+
+    plan = plan_segments(replay, first, last, segments)
+    jobs = []
+    for index, (snapshot, actions, segment_start, segment_end) in enumerate(plan):
+        target = os.path.join(workdir, f"segment_{index:04d}.mp4") if kind == "video" else output
+        hold = hold_frames if index == len(plan) - 1 else 0
+        jobs.append((index, snapshot, actions, segment_start, segment_end, hold, target, kind))
+
+    try:
+        with Pool(min(workers, len(jobs)), init_worker, (scale,)) as pool:
+            frames = sum(pool.imap_unordered(render_segment, jobs))
+        if kind == "video":
+            # Every segment was encoded with the same settings: join them without re-encoding
+            listing = os.path.join(workdir, "segments.txt")
+            with open(listing, "w") as f:
+                for job in jobs:
+                    f.write(f"file '{job[6]}'\n")
+            subprocess.run(["ffmpeg", "-loglevel", "error", "-y", "-f", "concat", "-safe", "0",
+                            "-i", listing, "-c", "copy", output], check=True)
+    finally:
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return frames
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render a replay to a video or PNG frames")
+    parser.add_argument("replay", help="a .ssr replay (seed + input log)")
+    parser.add_argument("output", help="video file (.mp4/.mkv/.webm/.mov, uses ffmpeg) or a folder for PNGs")
+    parser.add_argument("--start", type=float, default=0.0, help="seconds into the run")
+    parser.add_argument("--end", type=float, default=None, help="seconds into the run (default: the end)")
+    parser.add_argument("--scale", type=float, default=1.0, help="0.5 renders at half size")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--segments", type=int, default=None, help="default: two per worker")
+    parser.add_argument("--hold", type=float, default=2.0, help="seconds to show the game over frame")
+    args = parser.parse_args()
+
+    replay = Replay.load(args.replay)
+    started = time.perf_counter()
+    try:
+        frames = export(replay, args.output, args.start, args.end, args.scale, args.workers,
+                        args.segments, args.hold)
+    except (RuntimeError, ValueError) as error:
+        print(error)
+        sys.exit(1)
+    elapsed = time.perf_counter() - started
+    print(f"{frames} frames ({frames / TICK_RATE:.1f}s of video) in {elapsed:.1f}s, "
+          f"{frames / TICK_RATE / elapsed:.1f}x real time")
@@ -0,0 +1,318 @@
+"""Shared leaderboard server for running the game on many machines at once.
+
+A small asyncio HTTP service (standard library only). Kiosks send their
+finished runs in batches as replays (seed + input log, see replay.py); the
+server plays every one back headlessly on a pool of worker processes and
+only ranks the runs whose score comes out the same. Ranks come from an
+in-memory sorted index, and the encoded top-N list is cached until a run
+makes it into the top N.
+
+    python leaderboard.py --port 8765 --log leaderboard.jsonl
+
+    POST /submit   {"runs": [{"name": ..., "replay": <base64 replay file>}, ...]}
+                   -> {"results": [{"accepted": true, "rank": 3, "count": 120, ...}, ...]}
+    GET  /top?n=10 -> {"top": [{"name", "score", "level", "seconds", "seed"}, ...], "count": 120}
+    GET  /rank?score=1234 -> {"rank": 7, "count": 120}
+
+Accepted runs are appended to the --log file and loaded again on start.
+leaderboard_client.py is the game side.
+"""
+import asyncio
+import base64
+import bisect
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+from engine import Simulation, GameState, RULES_VERSION, TICK_RATE
+from replay import Replay
+
+MAX_BODY = 8 * 1024 * 1024  # A batch of long runs is well under this
+MAX_RUNS = 64  # Per submission
+MAX_TICKS = 60 * 60 * TICK_RATE  # An hour, nobody plays a single run longer
+TOP_SIZE = 10  # The cached top-N
+MAX_NAME = 24
+
+def check_run(data):
+    """Play a submitted replay back (in a worker process).
+    Returns (ok, reason, seed, score, level, ticks)."""
+    try:
+        replay = Replay.from_bytes(data)
+    except Exception as error:  # Anything can come out of a corrupt upload
+        return False, f"bad replay: {error}", None, 0, 0, 0
+    if replay.rules_version != RULES_VERSION:
+        return False, f"rules v{replay.rules_version}, the server has v{RULES_VERSION}", replay.seed, 0, 0, 0
+    if len(replay.actions) > MAX_TICKS:
+        return False, "run is too long", replay.seed, 0, 0, 0
+
+    sim = Simulation(replay.seed)
+    for action in replay.actions:
+        if action > 7 or not sim.step(action):
+            break
+    result = (replay.seed, sim.score, sim.difficulty_level, sim.game_time)
+    if sim.game_time != len(replay.actions) or sim.game_state != GameState.GAME_OVER:
+        return (False, "the inputs don't end in a game over") + result
+    if sim.score != replay.score:
+        return (False, "the score doesn't match the replay") + result
+    return (True, "") + result
+
+class Entry:
+    __slots__ = ("id", "name", "score", "level", "ticks", "seed", "digest", "finished")
+
+    def __init__(self, id, name, score, level, ticks, seed, digest, finished):
+        self.id = id
+        self.name = name
+        self.score = score
+        self.level = level
+        self.ticks = ticks
+        self.seed = seed
+        self.digest = digest  # sha256 of the replay, so a resent run is only counted once
+        self.finished = finished
+
+    def to_dict(self):
+        return {"id": self.id, "name": self.name, "score": self.score, "level": self.level,
+                "ticks": self.ticks, "seed": self.seed, "digest": self.digest,
+                "finished": self.finished}
+
+    def public(self):
+        return {"name": self.name, "score": int(self.score), "level": self.level,
+                "seconds": round(self.ticks / TICK_RATE), "seed": self.seed}
+
+class Board:
+    """Every accepted run, with a sorted index of (-score, id) for ranks."""
+
+    def __init__(self, top_size=TOP_SIZE):
+        self.top_size = top_size
+        self.entries = []  # By id
+        self.order = []  # (-score, id), best first; ties go to the earlier run
+        self.by_digest = {}
+        self.top_cache = None  # Encoded list of the top top_size (the count changes with every run)
+
+    def add(self, name, score, level, ticks, seed, digest, finished=None):
+        entry = Entry(len(self.entries), name, score, level, ticks, seed, digest,
+                      finished if finished is not None else time.time())
+        self.entries.append(entry)
+        self.by_digest[digest] = entry
+        key = (-score, entry.id)
+        bisect.insort(self.order, key)
+        if self.rank_of(entry) <= self.top_size:
+            self.top_cache = None
+        return entry
+
+    def rank_of(self, entry):
+        return bisect.bisect_left(self.order, (-entry.score, entry.id)) + 1
+
+    def rank(self, score):
+        """Where a run with this score would go (after the runs with the same score)."""
+        return bisect.bisect_left(self.order, (-score, len(self.entries))) + 1
+
+    def top(self, n):
+        return [self.entries[id] for _, id in self.order[:n]]
+
+    def top_body(self):
+        if self.top_cache is None:
+            self.top_cache = encode([entry.public() for entry in self.top(self.top_size)])
+        return b'{"top":' + self.top_cache + b',"count":%d}' % len(self.entries)
+
+def encode(payload):
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large", 500: "Internal Server Error"}
+
+class LeaderboardServer:
+    def __init__(self, board=None, workers=None, log_path=None):
+        self.board = board or Board()
+        # workers=0 checks runs on a thread in this process (handy for tests)
+        if workers == 0:
+            self.executor = ThreadPoolExecutor(1)
+        else:
+            self.executor = ProcessPoolExecutor(workers)
+        self.log_path = log_path
+        self.checking = {}  # Replay digest -> Future, so a resent batch waits for the first check
+        self.server = None
+        # Accepted runs are written to the log by a thread of their own, off the event loop
+        self.log_queue = queue.SimpleQueue()
+        self.log_writer = None
+        if log_path:
+            if os.path.exists(log_path):
+                self.load_log()
+            self.log_writer = threading.Thread(target=self.log_loop, name="leaderboard log", daemon=True)
+            self.log_writer.start()
+
+    def load_log(self):
+        with open(self.log_path) as f:
+            for line in f:
+                if line.strip():
+                    run = json.loads(line)
+                    self.board.add(run["name"], run["score"], run["level"], run["ticks"],
+                                   run["seed"], run["digest"], run["finished"])
+
+    def append_log(self, entry):
+        if self.log_writer is not None:
+            self.log_queue.put(json.dumps(entry.to_dict()) + "\n")
+
+    def log_loop(self):
+        # One short line per run, flushed as soon as it is written; whatever else is
+        # already queued goes out in the same write
+        with open(self.log_path, "a") as f:
+            while True:
+                lines = [self.log_queue.get()]
+                while not self.log_queue.empty():
+                    lines.append(self.log_queue.get())
+                stop = None in lines
+                try:
+                    f.write("".join(line for line in lines if line is not None))
+                    f.flush()
+                except OSError as error:
+                    # Losing a log line is better than taking the server down with it
+                    print(f"leaderboard: could not write the log: {error}")
+                if stop:
+                    return
+
+    async def start(self, host="127.0.0.1", port=8765):
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.executor.shutdown()
+        if self.log_writer is not None:
+            # Write out the runs still queued
+            self.log_queue.put(None)
+            self.log_writer.join()
+            self.log_writer = None
+
+    async def handle(self, reader, writer):
+        try:
+            status, body = await self.respond(reader)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        except HttpError as error:
+            status, body = error.status, encode({"error": str(error)})
+        except ValueError as error:
+            status, body = 400, encode({"error": str(error)})
+        except Exception as error:
+            # A broken worker pool and the like: answer, so the client backs off and retries
+            status, body = 500, encode({"error": repr(error)})
+        header = (f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                  f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                  "Connection: close\r\n\r\n")
+        writer.write(header.encode() + body)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def respond(self, reader):
+        request_line = (await reader.readline()).decode("latin-1").split()
+        if len(request_line) != 3:
+            raise HttpError(400, "bad request line")
+        method, target, _ = request_line
+        length = 0
+        while True:
+            line = (await reader.readline()).decode("latin-1")
+            if line in ("\r\n", "\n", ""):
+                break
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        if length > MAX_BODY:
+            raise HttpError(413, "request is too big")
+        body = await reader.readexactly(length) if length else b""
+
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        if url.path == "/submit":
+            if method != "POST":
+                raise HttpError(405, "POST runs to /submit")
+            try:
+                runs = json.loads(body)["runs"]
+            except (ValueError, KeyError, TypeError):
+                raise HttpError(400, "expected {\"runs\": [...]}")
+            if not isinstance(runs, list) or len(runs) > MAX_RUNS:
+                raise HttpError(400, f"send a list of at most {MAX_RUNS} runs")
+            return 200, encode({"results": await self.submit(runs)})
+        if method != "GET":
+            raise HttpError(405, "only /submit takes POST")
+        if url.path == "/top":
+            n = int(query.get("n", [TOP_SIZE])[0])
+            if n == self.board.top_size:
+                return 200, self.board.top_body()
+            return 200, encode({"top": [entry.public() for entry in self.board.top(max(n, 0))],
+                                "count": len(self.board.entries)})
+        if url.path == "/rank":
+            score = float(query.get("score", [0])[0])
+            return 200, encode({"rank": self.board.rank(score), "count": len(self.board.entries)})
+        if url.path == "/health":
+            return 200, encode({"ok": True, "count": len(self.board.entries)})
+        raise HttpError(404, f"no {url.path} here")
+
+    async def submit(self, runs):
+        """Check the runs of one batch side by side, then rank the good ones."""
+        return await asyncio.gather(*[self.submit_run(run) for run in runs])
+
+    async def submit_run(self, run):
+        try:
+            name = str(run.get("name") or "anonymous")[:MAX_NAME]
+            data = base64.b64decode(run["replay"], validate=True)
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return {"accepted": False, "reason": "expected {\"name\": ..., \"replay\": <base64>}"}
+        digest = hashlib.sha256(data).hexdigest()
+
+        entry = self.board.by_digest.get(digest)
+        if entry is None:
+            check = self.checking.get(digest)
+            if check is None:
+                loop = asyncio.get_running_loop()
+                check = self.checking[digest] = loop.run_in_executor(self.executor, check_run, data)
+            try:
+                ok, reason, seed, score, level, ticks = await check
+            finally:
+                self.checking.pop(digest, None)
+            if not ok:
+                return {"accepted": False, "reason": reason, "score": score}
+            # Another submission of the same run may have got here first
+            entry = self.board.by_digest.get(digest)
+            if entry is None:
+                entry = self.board.add(name, score, level, ticks, seed, digest)
+                self.append_log(entry)
+        return {"accepted": True, "rank": self.board.rank_of(entry), "count": len(self.board.entries),
+                "score": entry.score}
+
+async def serve(host, port, workers, log_path):
+    server = LeaderboardServer(workers=workers, log_path=log_path)
+    port = await server.start(host, port)
+    print(f"leaderboard on http://{host}:{port}/ ({len(server.board.entries)} runs loaded)")
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.close()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Shared leaderboard that checks every run by replaying it")
+    parser.add_argument("--host", default="127.0.0.1", help="0.0.0.0 to take runs from other machines")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None, help="replay checking processes (default: one per CPU)")
+    parser.add_argument("--log", default="leaderboard.jsonl", help="accepted runs are kept here")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.log))
+    except KeyboardInterrupt:
+        pass
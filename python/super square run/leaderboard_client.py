@@ -0,0 +1,151 @@
+"""Game side of the shared leaderboard (see leaderboard.py).
+
+LeaderboardClient.submit() only puts the run on a queue; a background
+thread packs runs into replays, sends them in batches and keeps a batch
+that could not be sent (server down, network gone) to try again later, so
+the game never waits on the network. The server drops runs it has already
+seen, so sending one twice is harmless.
+
+    python leaderboard_client.py --url http://127.0.0.1:8765 --submit replays/*.ssr
+    python leaderboard_client.py --url http://127.0.0.1:8765 --top 20
+"""
+import base64
+import json
+import queue
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from replay import Replay
+
+class LeaderboardClient:
+    def __init__(self, url, name=None, batch_size=16, flush_interval=1.0, timeout=5.0):
+        self.url = url.rstrip("/")
+        self.name = name or socket.gethostname()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval  # How long a run may wait for others to go with it
+        self.timeout = timeout
+        self.queue = queue.SimpleQueue()  # (ticket, Replay)
+        self.results = {}  # Ticket -> the server's answer for that run
+        self.last_error = None
+        self.sent = 0
+        self.next_ticket = 0
+        self.closing = threading.Event()
+        self.thread = threading.Thread(target=self.loop, name="leaderboard", daemon=True)
+        self.thread.start()
+
+    def submit(self, sim):
+        """Queue a finished run. Returns a ticket; results[ticket] turns up once the server
+        has checked it ({"accepted": ..., "rank": ..., "count": ...})."""
+        return self.submit_replay(Replay.from_simulation(sim))
+
+    def submit_replay(self, replay):
+        ticket = self.next_ticket
+        self.next_ticket += 1
+        self.queue.put((ticket, replay))
+        return ticket
+
+    def loop(self):
+        batch = []
+        failures = 0
+        while True:
+            # Wait for a run, then give others flush_interval to join it
+            if not batch:
+                item = self.queue.get()
+                if item is None:
+                    return
+                batch.append(item)
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    # Closing: one last try for what is left
+                    self.closing.set()
+                    break
+                batch.append(item)
+
+            try:
+                self.send(batch)
+                batch = []
+                failures = 0
+            except (OSError, ValueError) as error:
+                self.last_error = str(error)
+                failures += 1
+                if self.closing.is_set():
+                    return
+                # Back off (1 s, 2 s, ... up to a minute); runs that come in meanwhile wait in the queue
+                time.sleep(min(2 ** (failures - 1), 60))
+            if self.closing.is_set():
+                return
+
+    def send(self, batch):
+        runs = [{"name": self.name, "replay": base64.b64encode(replay.to_bytes()).decode()}
+                for _, replay in batch]
+        answer = self.request("/submit", {"runs": runs})
+        for (ticket, _), result in zip(batch, answer["results"]):
+            self.results[ticket] = result
+        self.sent += len(batch)
+        self.last_error = None
+
+    def request(self, path, payload=None):
+        data = None if payload is None else json.dumps(payload).encode()
+        request = urllib.request.Request(self.url + path, data,
+                                         {"Content-Type": "application/json"} if data else {})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as error:
+            # The server says why in the body
+            try:
+                message = json.loads(error.read())["error"]
+            except (ValueError, KeyError):
+                message = str(error)
+            raise OSError(f"leaderboard: {error.code} {message}")
+
+    def top(self, n=10):
+        """Ask for the top n (this one waits for the server, it is for menus and tools)."""
+        return self.request(f"/top?n={n}")
+
+    def rank(self, score):
+        return self.request(f"/rank?score={score}")
+
+    def close(self, timeout=2.0):
+        """Stop, giving runs still in the queue up to timeout seconds to get out."""
+        self.queue.put(None)
+        self.thread.join(timeout)
+
+if __name__ == "__main__":
+    import argparse
+    import glob
+
+    parser = argparse.ArgumentParser(description="Send replays to a leaderboard server, or show its top runs")
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--name", default=None)
+    parser.add_argument("--submit", nargs="*", default=[], help="replay files (.ssr) to send")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    client = LeaderboardClient(args.url, args.name, flush_interval=0.1)
+    tickets = {}
+    for pattern in args.submit:
+        for path in glob.glob(pattern) or [pattern]:
+            tickets[client.submit_replay(Replay.load(path))] = path
+    client.close(timeout=60)
+    for ticket, path in tickets.items():
+        result = client.results.get(ticket)
+        if result is None:
+            print(f"{path}: not sent ({client.last_error})")
+        elif result["accepted"]:
+            print(f"{path}: rank {result['rank']} of {result['count']} (score {int(result['score'])})")
+        else:
+            print(f"{path}: rejected, {result['reason']}")
+
+    board = client.top(args.top)
+    print(f"\n{'#':>3} {'score':>7} {'level':>5} {'time':>6}  name  ({board['count']} runs)")
+    for i, entry in enumerate(board["top"], 1):
+        print(f"{i:3} {entry['score']:7} {entry['level']:5} {entry['seconds']:5}s  {entry['name']}")
@@ -0,0 +1,174 @@
+"""Level generator: the random numbers for upcoming spawns, made ahead of time in chunks.
+
+Every obstacle spawn, buff spawn and buff spawn check takes one fixed-size
+record of random numbers from its own SpawnStream. Records are made
+chunk_size at a time, and chunk k only depends on (seed, stream name, k), so
+it can be built on a background thread before the run gets there and the
+result is the same either way. The frame loop just reads the next record and
+turns it into an obstacle at the current level (Simulation.make_obstacles),
+which is cheap; the schedule can also be read ahead with peek() to check
+what is coming (Simulation.upcoming_obstacles).
+
+    python levelgen.py --runs 50    # how many double obstacles the fairness check drops, by level
+"""
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+# Random numbers in one record
+OBSTACLE_ROLLS = 9  # type, double, gap, then (size, half, height) for each of the two obstacles
+BUFF_ROLLS = 3  # hard or easy spot, height, type
+GATE_ROLLS = 1  # does a buff spawn this tick
+
+_executor = None
+
+def background_executor():
+    """One worker thread shared by every stream that asks for background chunks."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(1, thread_name_prefix="levelgen")
+    return _executor
+
+def chunk_draws(seed, name, index, count):
+    """The random numbers chunk index of a stream is made of, record after record."""
+    draw = random.Random(f"{seed}/{name}/{index}").random
+    return [draw() for _ in range(count)]
+
+def make_chunk(seed, name, index, record_size, chunk_size):
+    draws = chunk_draws(seed, name, index, record_size * chunk_size)
+    if record_size == 1:
+        return draws
+    return list(zip(*[iter(draws)] * record_size))
+
+class SpawnStream:
+    def __init__(self, name, record_size, chunk_size=64, background=False):
+        self.name = name
+        self.record_size = record_size
+        self.chunk_size = chunk_size
+        self.background = background
+        self.seed = None
+        self.chunks = {}  # Chunk index -> list of records, or a Future while it is being made
+        self.index = 0
+        self.position = 0
+        self.current = None
+
+    def reset(self, seed):
+        self.seed = seed
+        self.chunks.clear()
+        self.move_to(0)
+
+    def chunk(self, index):
+        chunk = self.chunks.get(index)
+        if chunk is None:
+            chunk = self.chunks[index] = make_chunk(self.seed, self.name, index, self.record_size,
+                                                    self.chunk_size)
+        elif not isinstance(chunk, list):
+            chunk = self.chunks[index] = chunk.result()
+        return chunk
+
+    def prefetch(self, index):
+        # Without a background thread the chunk is made when it is first needed
+        if self.background and index not in self.chunks:
+            self.chunks[index] = background_executor().submit(
+                make_chunk, self.seed, self.name, index, self.record_size, self.chunk_size)
+
+    def move_to(self, index):
+        self.index = index
+        self.position = 0
+        self.current = None  # Made on the first next(), so a reset costs nothing
+        # Keep the chunk before (a restored snapshot often lands there) and start on the next one
+        for old in [key for key in self.chunks if key < index - 1]:
+            del self.chunks[old]
+        self.prefetch(index + 1)
+
+    def next(self):
+        if self.position == self.chunk_size:
+            self.move_to(self.index + 1)
+        if self.current is None:
+            self.current = self.chunk(self.index)
+        record = self.current[self.position]
+        self.position += 1
+        return record
+
+    def peek(self, count):
+        """The next count records, without using them up."""
+        records = []
+        index, position = self.index, self.position
+        while len(records) < count:
+            if position == self.chunk_size:
+                index += 1
+                position = 0
+            chunk = self.chunk(index)
+            take = min(count - len(records), self.chunk_size - position)
+            records += chunk[position:position + take]
+            position += take
+        return records
+
+    def state(self):
+        return (self.index, self.position)
+
+    def load(self, state):
+        index, position = state
+        if index != self.index:
+            self.move_to(index)
+        self.position = position
+
+class LevelGenerator:
+    """The spawn streams of one run."""
+
+    def __init__(self, seed=0, background=False):
+        # The chunk sizes are part of the rules: changing one changes the runs (bump RULES_VERSION)
+        self.obstacles = SpawnStream("obstacles", OBSTACLE_ROLLS, 64, background)
+        self.buffs = SpawnStream("buffs", BUFF_ROLLS, 16, background)
+        self.gates = SpawnStream("gates", GATE_ROLLS, 64, background)
+        self.streams = (self.obstacles, self.buffs, self.gates)
+        self.reset(seed)
+
+    def reset(self, seed):
+        self.seed = seed
+        for stream in self.streams:
+            stream.reset(seed)
+
+    def state(self):
+        return (self.seed, self.obstacles.state(), self.buffs.state(), self.gates.state())
+
+    def load(self, state):
+        seed, *streams = state
+        if seed != self.seed:
+            self.reset(seed)
+        for stream, stream_state in zip(self.streams, streams):
+            stream.load(stream_state)
+
+def fairness_report(runs, max_ticks):
+    """Play seeded runs with the simple bot and count double obstacles per level, and how
+    many of them the fairness check dropped."""
+    from engine import Simulation, simple_policy
+
+    doubles = {}
+    dropped = {}
+    for seed in range(runs):
+        sim = Simulation(seed)
+        seen_doubles = seen_dropped = 0
+        while sim.game_time < max_ticks and sim.step(simple_policy(sim)):
+            level = sim.difficulty_level
+            if sim.double_obstacles != seen_doubles:
+                doubles[level] = doubles.get(level, 0) + sim.double_obstacles - seen_doubles
+                seen_doubles = sim.double_obstacles
+            if sim.unfair_doubles != seen_dropped:
+                dropped[level] = dropped.get(level, 0) + sim.unfair_doubles - seen_dropped
+                seen_dropped = sim.unfair_doubles
+    return doubles, dropped
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check the spawn schedule for unfair double obstacles")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--max-ticks", type=int, default=20000)
+    args = parser.parse_args()
+
+    doubles, dropped = fairness_report(args.runs, args.max_ticks)
+    print(f"{'level':>5} {'doubles':>8} {'dropped':>8}")
+    # A level where every double was dropped is only in dropped
+    for level in sorted(set(doubles) | set(dropped)):
+        total = doubles.get(level, 0) + dropped.get(level, 0)
+        print(f"{level:5} {total:8} {dropped.get(level, 0):8}  ({dropped.get(level, 0) / total:.0%} unfair)")
@@ -1,21 +1,30 @@
 import raylibpy as rl
-import random
 import os
+import sys
 import math
+import time
+from engine import (SCREEN_WIDTH, SCREEN_HEIGHT, GROUND_HEIGHT, GameState, Simulation,
+                    ACTION_JUMP, ACTION_DUCK, ACTION_SHOOT, TICK_TIME,
+                    BUFF_TYPES, BUFFS_BY_NAME, BUFF_GIANT, BUFF_INVINCIBLE, BUFF_WEAPON)
+import engine
+import replay
+from profiler import Profiler, SIMULATION_SECTIONS
+from planner import Planner
+from difficulty import DifficultyCurve, DEFAULT_CURVE
+from render_cache import Layer, SpriteCache, TextCache, NumberText
+from palette import PALETTE
+from sim_thread import SimulationThread
+from scores import ScoreStore, RunRecord, curve_key, legacy_high_score
+from leaderboard_client import LeaderboardClient
+from events import EventLog
 
-# Game constants
-SCREEN_WIDTH = 800
-SCREEN_HEIGHT = 500
-GRAVITY = 0.6
-JUMP_FORCE = -15
-GAME_SPEED_INITIAL = 3
-GAME_SPEED_INCREMENT = 0.0005
-GROUND_HEIGHT = 50
-CACTUS_MIN_HEIGHT = 40
-CACTUS_MAX_HEIGHT = 60
-BIRD_MIN_HEIGHT = 150
-BIRD_MAX_HEIGHT = 250
-CLOUD_SPEED = 1
+# Run the simulation at a fixed 60 ticks per second, whatever the render frame rate is.
+# Set to False to go back to one update per drawn frame.
+FIXED_TIMESTEP = True
+MAX_FRAME_TIME = 0.25  # Don't try to catch up more than this after a stall
+# Tick on a thread of its own and draw interpolated snapshots (see sim_thread.py).
+# Set to False to tick in the render loop again.
+THREADED_SIMULATION = True
 
 # Colors
 WHITE = rl.Color(255, 255, 255, 255)
@@ -38,14 +47,20 @@ SHADOW_COLOR = rl.Color(0, 0, 0, 100)
 NEON_PINK = rl.Color(255, 20, 147, 255)
 NEON_GREEN = rl.Color(57, 255, 20, 255)
 NEON_BLUE = rl.Color(0, 191, 255, 255)
+GLOW_RED = rl.Color(255, 50, 50, 255)
+SPIKES_COLOR = rl.Color(180, 40, 40, 255)
+# Buff colours come from the engine's buff table, indexed like BUFF_TYPES
+BUFF_COLORS = [rl.Color(*buff.color, 255) for buff in BUFF_TYPES]
 
-# Game states
-class GameState:
-    MENU = 0
-    PLAYING = 1
-    CONTROLS = 2
-    CREDITS = 3
-    GAME_OVER = 4
+# Level of detail for draw_game(): small spectator tiles leave out the HUD, and the
+# smallest ones the clouds and buff indicators too
+DETAIL_LOW = 0
+DETAIL_REDUCED = 1
+DETAIL_FULL = 2
+
+# Shared cache of pre-drawn entities, and of text (see render_cache.py)
+SPRITES = SpriteCache()
+TEXT = TextCache()
 
 class Button:
     def __init__(self, x, y, width, height, text):
@@ -75,162 +90,63 @@ class Button:
         rl.draw_rectangle_rounded_lines(self.rect, 0.3, 6, WHITE)
         
         # Draw text
-        text_width = rl.measure_text(self.text, self.font_size)
+        text_width = TEXT.width(self.text, self.font_size)
         text_x = self.rect.x + (self.rect.width - text_width) // 2
         text_y = self.rect.y + (self.rect.height - self.font_size) // 2
-        rl.draw_text(self.text, int(text_x), int(text_y), self.font_size, self.text_color)
+        TEXT.begin()
+        TEXT.draw(self.text, int(text_x), int(text_y), self.font_size, self.text_color)
+        TEXT.end()
         
     def is_clicked(self):
         return self.is_hovered and rl.is_mouse_button_pressed(rl.MOUSE_BUTTON_LEFT)
 
-class Dinosaur:
+class Dinosaur(engine.Dinosaur):
     def __init__(self):
-        self.width = 40
-        self.height = 60
-        self.x = 80
-        self.y = SCREEN_HEIGHT - GROUND_HEIGHT - self.height
-        self.velocity_y = 0
-        self.is_jumping = False
-        self.is_ducking = False
-        self.duck_height = 30
-        self.normal_height = 60
+        super().__init__()
         self.color = WHITE
         self.eye_color = BLACK
         self.mouth_color = BLACK
         
-        # Buff system
-        self.buffs = {
-            "double_jump": {"active": False, "timer": 0, "max_time": 250, "jumps_remaining": 2},  # Less time
-            "giant": {"active": False, "timer": 0, "max_time": 350},  # Less time
-            "invincible": {"active": False, "timer": 0, "max_time": 400},  # Less time
-            "weapon": {"active": False, "timer": 0, "max_time": 450, "bullets": []}  # Less time
-        }
-        
-    def jump(self):
-        if not self.is_jumping:
-            self.is_jumping = True
-            self.velocity_y = JUMP_FORCE
-            if self.buffs["double_jump"]["active"] and self.buffs["double_jump"]["jumps_remaining"] > 0:
-                self.buffs["double_jump"]["jumps_remaining"] -= 1
-        elif self.buffs["double_jump"]["active"] and self.buffs["double_jump"]["jumps_remaining"] > 0:
-            self.velocity_y = JUMP_FORCE * 0.8
-            self.buffs["double_jump"]["jumps_remaining"] -= 1
-            self.is_jumping = True
-            
-    def duck(self, is_ducking):
-        self.is_ducking = is_ducking
-        if is_ducking:
-            self.height = self.duck_height
-        else:
-            self.height = self.normal_height
-            if not self.is_jumping:
-                self.y = SCREEN_HEIGHT - GROUND_HEIGHT - self.height
-            
-    def update(self):
-        # Jump movement
-        if self.is_jumping:
-            self.velocity_y += GRAVITY
-            self.y += self.velocity_y
-            
-            if self.y >= SCREEN_HEIGHT - GROUND_HEIGHT - self.height:
-                self.y = SCREEN_HEIGHT - GROUND_HEIGHT - self.height
-                self.is_jumping = False
-                self.velocity_y = 0
-                if self.buffs["double_jump"]["active"]:
-                    self.buffs["double_jump"]["jumps_remaining"] = 2
-                    
-        # Update buffs
-        for buff_name in list(self.buffs.keys()):
-            buff_data = self.buffs[buff_name]
-            if buff_data["active"]:
-                buff_data["timer"] += 1
-                if buff_data["timer"] >= buff_data["max_time"]:
-                    self.remove_buff(buff_name)
-                    
-        # Update projectiles
-        if self.buffs["weapon"]["active"]:
-            bullets_to_remove = []
-            for i, bullet in enumerate(self.buffs["weapon"]["bullets"]):
-                bullet["x"] += 15  # Faster
-                if bullet["x"] > SCREEN_WIDTH + 50:
-                    bullets_to_remove.append(i)
-            
-            for i in reversed(bullets_to_remove):
-                self.buffs["weapon"]["bullets"].pop(i)
-                    
-    def activate_buff(self, buff_type):
-        if buff_type in self.buffs:
-            if buff_type == "double_jump":
-                self.buffs[buff_type]["active"] = True
-                self.buffs[buff_type]["timer"] = 0
-                self.buffs[buff_type]["jumps_remaining"] = 2
-            elif buff_type == "giant":
-                self.buffs[buff_type]["active"] = True
-                self.buffs[buff_type]["timer"] = 0
-            elif buff_type == "invincible":
-                self.buffs[buff_type]["active"] = True
-                self.buffs[buff_type]["timer"] = 0
-            elif buff_type == "weapon":
-                self.buffs[buff_type]["active"] = True
-                self.buffs[buff_type]["timer"] = 0
-                self.buffs[buff_type]["bullets"] = []
-                
-    def remove_buff(self, buff_type):
-        if buff_type in self.buffs:
-            self.buffs[buff_type]["active"] = False
-            self.buffs[buff_type]["timer"] = 0
-            if "bullets" in self.buffs[buff_type]:
-                self.buffs[buff_type]["bullets"] = []
-            
-    def shoot(self):
-        if self.buffs["weapon"]["active"] and len(self.buffs["weapon"]["bullets"]) < 3:  # Less bullets
-            bullet_y = self.y + self.height / 2 - 5
-            self.buffs["weapon"]["bullets"].append({
-                "x": self.x + self.width,
-                "y": bullet_y,
-                "width": 20,  # Wider
-                "height": 8   # Lower
-            })
-            
-    def get_rect(self):
-        current_width = self.width
-        current_height = self.height
-        
-        if self.buffs["giant"]["active"]:
-            current_width = int(self.width * 1.5)
-            current_height = int(self.height * 1.5)
-            
-        return rl.Rectangle(int(self.x), int(self.y), current_width, current_height)
-        
     def draw(self):
         current_width = self.width
         current_height = self.height
         current_color = self.color
         
         # Apply buffs
-        if self.buffs["giant"]["active"]:
+        if self.active_buffs & BUFF_GIANT:
             current_width = int(self.width * 1.5)
             current_height = int(self.height * 1.5)
             
-        if self.buffs["invincible"]["active"]:
-            if (self.buffs["invincible"]["timer"] // 8) % 2 == 0:  # Faster blinking
+        if self.active_buffs & BUFF_INVINCIBLE:
+            if (self.buff_timers[BUFFS_BY_NAME["invincible"].index] // 8) % 2 == 0:  # Faster blinking
                 current_color = YELLOW
                 
+        SPRITES.draw(("dinosaur", current_width, current_height, current_color is YELLOW),
+                     current_width, current_height, self.x, self.y,
+                     self.paint, current_width, current_height, current_color)
+        
+        # Draw projectiles
+        if self.active_buffs & BUFF_WEAPON:
+            for bullet in self.bullets:
+                SPRITES.draw("bullet", bullet.width, bullet.height, bullet.x, bullet.y,
+                             self.paint_bullet, bullet.width, bullet.height)
+                
+    def paint(self, x, y, current_width, current_height, current_color):
         # Draw shadow
         shadow_offset = 3
-        shadow_rect = rl.Rectangle(self.x + shadow_offset, self.y + shadow_offset, 
+        shadow_rect = rl.Rectangle(x + shadow_offset, y + shadow_offset, 
                                   current_width, current_height)
         rl.draw_rectangle_rounded(shadow_rect, 0.2, 4, SHADOW_COLOR)
         
         # Dinosaur body
-        body_rect = rl.Rectangle(self.x, self.y, current_width, current_height)
+        body_rect = rl.Rectangle(x, y, current_width, current_height)
         rl.draw_rectangle_rounded(body_rect, 0.2, 4, current_color)
         rl.draw_rectangle_rounded_lines(body_rect, 0.2, 4, BLACK)
         
         # Eyes
         eye_size = 6
-        eye_x = self.x + current_width - 12
-        eye_y = self.y + 12
+        eye_x = x + current_width - 12
+        eye_y = y + 12
         rl.draw_rectangle(int(eye_x), int(eye_y), eye_size, eye_size, self.eye_color)
         
         # Smile
@@ -239,43 +155,27 @@ class Dinosaur:
         mouth_y = eye_y + 10
         rl.draw_line(int(mouth_start_x), int(mouth_y), int(mouth_end_x), int(mouth_y), self.mouth_color)
         
-        # Draw projectiles
-        if self.buffs["weapon"]["active"]:
-            for bullet in self.buffs["weapon"]["bullets"]:
-                # Shadow
-                rl.draw_rectangle(int(bullet["x"] + 2), int(bullet["y"] + 2), 
-                                 bullet["width"], bullet["height"], SHADOW_COLOR)
-                # Bullet
-                bullet_rect = rl.Rectangle(bullet["x"], bullet["y"], 
-                                          bullet["width"], bullet["height"])
-                rl.draw_rectangle_rounded(bullet_rect, 0.3, 3, PURPLE)
-                rl.draw_rectangle_rounded_lines(bullet_rect, 0.3, 3, BLACK)
-                
-        # Draw buff indicators
-        self.draw_buff_indicators()
+    def paint_bullet(self, x, y, width, height):
+        # Shadow
+        rl.draw_rectangle(int(x + 2), int(y + 2), width, height, SHADOW_COLOR)
+        # Bullet
+        bullet_rect = rl.Rectangle(x, y, width, height)
+        rl.draw_rectangle_rounded(bullet_rect, 0.3, 3, PURPLE)
+        rl.draw_rectangle_rounded_lines(bullet_rect, 0.3, 3, BLACK)
 
     def draw_buff_indicators(self):
         indicator_y = 10
         indicator_size = 16
         spacing = 5
         
-        active_buffs = [(name, data) for name, data in self.buffs.items() if data["active"]]
-        
-        for i, (buff_name, buff_data) in enumerate(active_buffs):
+        i = 0
+        for buff in BUFF_TYPES:
+            if not self.active_buffs & buff.bit:
+                continue
             indicator_x = 10 + i * (indicator_size + spacing)
+            i += 1
+            buff_color = BUFF_COLORS[buff.index]
             
-            # Buff color
-            if buff_name == "double_jump":
-                buff_color = BLUE
-            elif buff_name == "giant":
-                buff_color = ORANGE
-            elif buff_name == "invincible":
-                buff_color = YELLOW
-            elif buff_name == "weapon":
-                buff_color = PURPLE
-            else:
-                buff_color = GREEN
-                
             # Shadow
             rl.draw_rectangle(int(indicator_x + 1), int(indicator_y + 1), 
                              indicator_size, indicator_size, SHADOW_COLOR)
@@ -287,209 +187,106 @@ class Dinosaur:
             rl.draw_rectangle_rounded_lines(indicator_rect, 0.3, 4, BLACK)
             
             # Time bar
-            time_ratio = 1 - (buff_data["timer"] / buff_data["max_time"])
+            time_ratio = self.buff_time_left(buff)
             if time_ratio > 0:
                 time_bar_height = int(indicator_size * time_ratio)
                 time_bar_y = indicator_y + indicator_size - time_bar_height
                 rl.draw_rectangle(int(indicator_x), int(time_bar_y), 
                                  indicator_size, time_bar_height, BLACK)
 
-class Obstacle:
-    def __init__(self, x, obstacle_type="cactus", difficulty_level=1, score=0):
-        self.type = obstacle_type
-        self.x = x
-        self.passed = False
-        self.destroyed = False
-        
-        # Size increases with difficulty AND score
-        score_factor = min(score / 5000, 2.0)
-        size_multiplier = 1.0 + (difficulty_level * 0.05) + (score_factor * 0.1)
-        
-        if self.type == "cactus":
-            self.width = int(24 * size_multiplier)
-            self.height = random.randint(int(CACTUS_MIN_HEIGHT * size_multiplier), 
-                                        int(CACTUS_MAX_HEIGHT * size_multiplier))
-            self.y = SCREEN_HEIGHT - GROUND_HEIGHT - self.height
-            self.color = RED
-            self.spikes_color = rl.Color(180, 40, 40, 255)
-        else:  # bird - MORE DANGEROUS
-            self.width = int(32 * size_multiplier)
-            self.height = int(24 * size_multiplier)
-            # Adjust bird height to be more challenging
-            bird_y_min = BIRD_MIN_HEIGHT - (difficulty_level * 10)  # Lower
-            bird_y_max = BIRD_MAX_HEIGHT - (difficulty_level * 20)  # Even lower
-            bird_y_min = max(100, bird_y_min)  # Minimum 100
-            bird_y_max = max(200, bird_y_max)  # Minimum 200
-            
-            # MORE BIRDS AT CHALLENGING HEIGHTS
-            if random.random() < 0.7:  # 70% chance of medium/low height
-                self.y = random.randint(int(bird_y_min), int((bird_y_min + bird_y_max) / 2))
-            else:  # 30% chance of high height
-                self.y = random.randint(int((bird_y_min + bird_y_max) / 2), int(bird_y_max))
-                
-            self.color = BLUE
-            self.wing_up = True
-            self.wing_timer = 0
-            
-    def update(self, game_speed):
-        self.x -= game_speed * (1.1 if self.type == "bird" else 1.0)  # Birds faster
-        
-        if self.type == "bird":
-            self.wing_timer += 1
-            if self.wing_timer >= 8:  # Faster wings
-                self.wing_up = not self.wing_up
-                self.wing_timer = 0
-                
+
+class Obstacle(engine.Obstacle):
+    # The engine recycles these from a pool, so colours come from the type at draw time
+    __slots__ = ()
+    
     def draw(self):
         if not self.destroyed:
-            # Shadow
-            shadow_offset = 2
-            shadow_y = self.y + shadow_offset if self.type == "cactus" else self.y + shadow_offset
-            rl.draw_rectangle(int(self.x + shadow_offset), int(shadow_y), 
-                             self.width, self.height, SHADOW_COLOR)
-            
-            # Main obstacle
-            obstacle_rect = rl.Rectangle(self.x, self.y, self.width, self.height)
-            rl.draw_rectangle_rounded(obstacle_rect, 0.2, 4, self.color)
-            rl.draw_rectangle_rounded_lines(obstacle_rect, 0.2, 4, BLACK)
+            wing_up = self.type == "bird" and self.wing_up
+            SPRITES.draw(("obstacle", self.type, self.width, self.height, wing_up),
+                         self.width, self.height, self.x, self.y, self.paint)
             
-            # Details
-            if self.type == "cactus":
-                # Cactus spikes
-                spike_width = 4
-                spike_height = 8
-                for i in range(3):
-                    spike_x = self.x + (self.width // 2) - (spike_width // 2)
-                    spike_y = self.y + 10 + (i * 15)
-                    rl.draw_rectangle(int(spike_x), int(spike_y), spike_width, spike_height, self.spikes_color)
-            else:
-                # Bird wing
-                wing_y = self.y - 4 if self.wing_up else self.y + 8  # Less wing movement
-                wing_color = rl.Color(self.color.r - 30, self.color.g - 30, self.color.b - 30, 255)
-                wing_rect = rl.Rectangle(self.x + 6, wing_y, 22, 12)
-                rl.draw_rectangle_rounded(wing_rect, 0.3, 3, wing_color)
-                rl.draw_rectangle_rounded_lines(wing_rect, 0.3, 3, BLACK)
-                
-    def get_rect(self):
-        return rl.Rectangle(int(self.x), int(self.y), self.width, self.height)
-
-class Buff:
-    def __init__(self, x, difficulty_level=1, score=0):
-        self.x = x
-        self.width = 28
-        self.height = 28
-        
-        # BUFFS IN MORE CHALLENGING POSITIONS
-        # Higher difficulty and score make it harder to get
-        score_factor = min(score / 10000, 1.0)
-        
-        # Base height - harder as progress
-        if difficulty_level < 3:
-            # Beginning: accessible buffs
-            height_range = (100, SCREEN_HEIGHT - GROUND_HEIGHT - 100)
-        elif difficulty_level < 6:
-            # Medium: some difficult buffs
-            if random.random() < 0.4:  # 40% difficult
-                height_range = (50, 150)  # High
-            else:
-                height_range = (200, SCREEN_HEIGHT - GROUND_HEIGHT - 50)  # Low/medium
-        else:
-            # Difficult: majority difficult
-            if random.random() < 0.7:  # 70% difficult
-                height_range = (50, 180)  # High
-            else:
-                height_range = (250, SCREEN_HEIGHT - GROUND_HEIGHT - 80)  # Very low
-                
-        self.y = random.randint(int(height_range[0]), int(height_range[1]))
-        self.color = GREEN
-        self.collected = False
-        
-        # Buff types - LESS FREQUENT
-        if difficulty_level < 3:
-            self.types = ["double_jump", "invincible", "weapon", "giant"]
-            weights = [0.3, 0.25, 0.25, 0.2]  # More balanced
+    def paint(self, x, y):
+        color = RED if self.type == "cactus" else BLUE
+        
+        # Shadow
+        shadow_offset = 2
+        rl.draw_rectangle(int(x + shadow_offset), int(y + shadow_offset), 
+                         self.width, self.height, SHADOW_COLOR)
+        
+        # Main obstacle
+        obstacle_rect = rl.Rectangle(x, y, self.width, self.height)
+        rl.draw_rectangle_rounded(obstacle_rect, 0.2, 4, color)
+        rl.draw_rectangle_rounded_lines(obstacle_rect, 0.2, 4, BLACK)
+        
+        # Details
+        if self.type == "cactus":
+            # Cactus spikes
+            spike_width = 4
+            spike_height = 8
+            for i in range(3):
+                spike_x = x + (self.width // 2) - (spike_width // 2)
+                spike_y = y + 10 + (i * 15)
+                rl.draw_rectangle(int(spike_x), int(spike_y), spike_width, spike_height, SPIKES_COLOR)
         else:
-            self.types = ["double_jump", "giant", "invincible", "weapon"]
-            weights = [0.25, 0.25, 0.25, 0.25]  # Equally distributed
+            # Bird wing
+            wing_y = y - 4 if self.wing_up else y + 8  # Less wing movement
+            wing_color = PALETTE.darker(color, 30)
+            wing_rect = rl.Rectangle(x + 6, wing_y, 22, 12)
+            rl.draw_rectangle_rounded(wing_rect, 0.3, 3, wing_color)
+            rl.draw_rectangle_rounded_lines(wing_rect, 0.3, 3, BLACK)
             
-        self.type = random.choices(self.types, weights=weights)[0]
-        
-        # Colors
-        if self.type == "double_jump":
-            self.inner_color = BLUE
-        elif self.type == "giant":
-            self.inner_color = ORANGE
-        elif self.type == "invincible":
-            self.inner_color = YELLOW
-        elif self.type == "weapon":
-            self.inner_color = PURPLE
-            
-    def update(self, game_speed):
-        self.x -= game_speed
-        
+
+class Buff(engine.Buff):
+    __slots__ = ()
+    
     def draw(self):
         if not self.collected:
-            # Shadow
-            rl.draw_rectangle(int(self.x + 2), int(self.y + 2), 
-                             self.width, self.height, SHADOW_COLOR)
-            
-            # Outer buff
-            buff_rect = rl.Rectangle(self.x, self.y, self.width, self.height)
-            rl.draw_rectangle_rounded(buff_rect, 0.3, 5, self.color)
-            rl.draw_rectangle_rounded_lines(buff_rect, 0.3, 5, BLACK)
-            
-            # Inner buff
-            inner_margin = 4
-            inner_size = self.width - (inner_margin * 2)
-            inner_rect = rl.Rectangle(self.x + inner_margin, self.y + inner_margin, 
-                                      inner_size, inner_size)
-            rl.draw_rectangle_rounded(inner_rect, 0.3, 4, self.inner_color)
-            rl.draw_rectangle_rounded_lines(inner_rect, 0.3, 4, BLACK)
+            SPRITES.draw(("buff", self.type), self.width, self.height, self.x, self.y, self.paint)
             
-            # Symbol
-            symbol_color = BLACK
-            center_x = self.x + self.width / 2
-            center_y = self.y + self.height / 2
+    def paint(self, x, y):
+        # Shadow
+        rl.draw_rectangle(int(x + 2), int(y + 2), 
+                         self.width, self.height, SHADOW_COLOR)
+        
+        # Outer buff
+        buff_rect = rl.Rectangle(x, y, self.width, self.height)
+        rl.draw_rectangle_rounded(buff_rect, 0.3, 5, GREEN)
+        rl.draw_rectangle_rounded_lines(buff_rect, 0.3, 5, BLACK)
+        
+        # Inner buff
+        inner_margin = 4
+        inner_size = self.width - (inner_margin * 2)
+        inner_rect = rl.Rectangle(x + inner_margin, y + inner_margin, 
+                                  inner_size, inner_size)
+        buff = BUFFS_BY_NAME[self.type]
+        rl.draw_rectangle_rounded(inner_rect, 0.3, 4, BUFF_COLORS[buff.index])
+        rl.draw_rectangle_rounded_lines(inner_rect, 0.3, 4, BLACK)
+        
+        # Symbol
+        symbol_color = BLACK
+        center_x = x + self.width / 2
+        center_y = y + self.height / 2
+        
+        # Two letters need a smaller font to fit
+        font_size = 13 if len(buff.symbol) == 1 else 11
+        symbol_width = rl.measure_text(buff.symbol, font_size)
+        rl.draw_text(buff.symbol, int(center_x - symbol_width / 2), int(center_y - 9), font_size, symbol_color)
             
-            if self.type == "double_jump":
-                rl.draw_text("2X", int(center_x - 9), int(center_y - 9), 11, symbol_color)
-            elif self.type == "giant":
-                rl.draw_text("G", int(center_x - 5), int(center_y - 9), 13, symbol_color)
-            elif self.type == "invincible":
-                rl.draw_text("S", int(center_x - 5), int(center_y - 9), 13, symbol_color)
-            elif self.type == "weapon":
-                rl.draw_text("W", int(center_x - 6), int(center_y - 9), 13, symbol_color)
-                
-    def get_rect(self):
-        return rl.Rectangle(int(self.x), int(self.y), self.width, self.height)
 
-class Game:
-    def __init__(self):
-        self.screen_width = SCREEN_WIDTH
-        self.screen_height = SCREEN_HEIGHT
-        self.game_speed = GAME_SPEED_INITIAL
-        self.score = 0
-        self.high_score = 0
+class Game(Simulation):
+    # Drawable versions of the simulation entities
+    dinosaur_class = Dinosaur
+    obstacle_class = Obstacle
+    buff_class = Buff
+    
+    # Spawn chunks are made on a background thread, off the frame
+    background_spawns = True
+    
+    def __init__(self, curve=None, persistent=True):
+        # persistent=False leaves out the score store and leaderboard, for games that are
+        # only drawn (offscreen rendering, spectator tiles)
+        super().__init__(curve=curve)
         self.game_state = GameState.MENU
-        self.difficulty_level = 1
-        self.distance_traveled = 0
-        self.game_time = 0
-        
-        self.dinosaur = Dinosaur()
-        self.obstacles = []
-        self.buffs = []
-        self.clouds = []
-        
-        # Optimization - adjusted limits
-        self.max_obstacles = 12
-        self.max_buffs = 5  # LESS BUFFS
-        self.max_clouds = 6
-        
-        self.obstacle_timer = 0
-        self.obstacle_frequency = 100  # MORE OBSTACLES
-        self.buff_timer = 0
-        self.buff_frequency = 500  # BUFFS LESS FREQUENT
-        self.cloud_timer = 0
         
         # Menu buttons
         button_width = 220
@@ -501,66 +298,69 @@ class Game:
         self.credits_button = Button(button_x, 360, button_width, button_height, "📝 CREDITS")
         self.back_button = Button(20, 20, 100, 40, "🔙 BACK")
         
-        # Load high score
-        self.load_high_score()
-        
-    def load_high_score(self):
-        try:
-            if os.path.exists("super_square_run_highscore.txt"):
-                with open("super_square_run_highscore.txt", "r") as f:
-                    self.high_score = int(f.read())
-        except:
-            self.high_score = 0
-            
-    def save_high_score(self):
-        try:
-            with open("super_square_run_highscore.txt", "w") as f:
-                f.write(str(int(self.high_score)))
-        except:
-            pass
-        
-    def reset(self):
-        self.dinosaur = Dinosaur()
-        self.obstacles.clear()
-        self.buffs.clear()
-        self.clouds.clear()
-        self.game_speed = GAME_SPEED_INITIAL
-        self.score = 0
-        self.distance_traveled = 0
-        self.game_time = 0
-        self.difficulty_level = 1
-        self.game_state = GameState.PLAYING
-        self.obstacle_timer = 0
-        self.buff_timer = 0
-        self.obstacle_frequency = 100
-        
-    def update_difficulty(self):
-        self.distance_traveled += self.game_speed
-        self.game_time += 1
-        
-        # Increase difficulty faster
-        score_factor = self.score / 800  # Faster
-        time_factor = self.game_time / 4000  # Faster
-        combined_factor = score_factor + time_factor
-        
-        # More aggressive level system
-        new_level = 1 + int(combined_factor * 3)
-        
-        if new_level > self.difficulty_level:
-            self.difficulty_level = new_level
-            
-        # Increase speed faster
-        score_speed_boost = min(self.score / 3000, 4.0)  # Up to 4.0 boost
-        self.game_speed = GAME_SPEED_INITIAL + (self.difficulty_level * 0.7) + score_speed_boost
-        
-        # Adjust obstacle frequency - MORE OBSTACLES
-        base_frequency = 100
-        min_frequency = 15  # Many more obstacles
-        level_reduction = self.difficulty_level * 10
-        score_reduction = min(int(self.score / 150), 50)
-        
-        self.obstacle_frequency = max(min_frequency, 
-                                     base_frequency - level_reduction - score_reduction)
+        # Pre-drawn background layers (see render_cache.py)
+        self.background = Layer(SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.ground_lines = Layer(SCREEN_WIDTH + 60, 2)
+        # The controls and credits screens never change: one texture each
+        self.controls_screen = Layer(SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.credits_screen = Layer(SCREEN_WIDTH, SCREEN_HEIGHT)
+        
+        # Labels with numbers in them, formatted again only when the number changes
+        self.score_label = NumberText("🏆 SCORE: {}")
+        self.high_score_label = NumberText("👑 HIGH SCORE: {}")
+        self.menu_high_score_label = NumberText("🏆 HIGH SCORE: {}")
+        self.level_label = NumberText("📊 LEVEL: {}")
+        self.speed_label = NumberText("⚡ SPEED: {:.1f}", 1)
+        self.difficulty_label = NumberText("🔥 DIFFICULTY: {}/10")
+        self.final_score_label = NumberText("🏆 Final Score: {}")
+        self.level_reached_label = NumberText("📈 Level reached: {}")
+        self.max_speed_label = NumberText("⚡ Maximum speed: {:.1f}", 1)
+        
+        # Frame profiler, F1 shows the overlay and F2 writes the numbers to profiles/
+        self.profiler = Profiler()
+        self.profiler.instrument(self, SIMULATION_SECTIONS + [
+            "draw", "draw_gradient_background", "draw_menu", "draw_controls",
+            "draw_credits", "draw_game", "draw_game_over"])
+        self.profile_summary = None
+        
+        # Autopilot, A switches it on and off
+        self.planner = Planner()
+        self.autopilot = False
+        
+        # Every finished run goes into the score store (see scores.py), the high score
+        # is the best run in it on this curve (or in the old high score file, from before
+        # there was one, which only had default curve runs)
+        self.scores = None
+        if persistent:
+            self.scores = ScoreStore()
+            self.high_score = self.scores.best_score(curve_key(self.curve))
+            if self.curve is DEFAULT_CURVE:
+                self.high_score = max(self.high_score, legacy_high_score())
+        
+        # Shared leaderboard for several machines: SSR_LEADERBOARD=http://host:8765 (see
+        # leaderboard.py), SSR_PLAYER=name. Off without it
+        leaderboard_url = os.environ.get("SSR_LEADERBOARD")
+        self.leaderboard = None
+        if leaderboard_url and persistent:
+            self.leaderboard = LeaderboardClient(leaderboard_url, os.environ.get("SSR_PLAYER"))
+        self.leaderboard_ticket = None
+        self.leaderboard_label = NumberText("🌐 LEADERBOARD: #{}")
+        
+    def unload_labels(self):
+        for value in vars(self).values():
+            if isinstance(value, NumberText):
+                value.unload()
+        
+    def record_run(self, run):
+        # Only queued here, the store's writer thread does the disk part
+        if self.scores:
+            self.scores.add(RunRecord.from_simulation(run, self.autopilot))
+        # Autopilot runs stay off the shared leaderboard, and so do runs on other curves:
+        # the server checks a run by playing it back on the default one
+        if self.leaderboard and not self.autopilot and self.curve is DEFAULT_CURVE:
+            self.leaderboard_ticket = self.leaderboard.submit(run)
+        else:
+            self.leaderboard_ticket = None
         
     def update(self):
         if self.game_state == GameState.MENU:
@@ -581,188 +381,98 @@ class Game:
                 self.game_state = GameState.MENU
                 
         elif self.game_state == GameState.PLAYING:
-            self.dinosaur.update()
-            self.update_difficulty()
-            
-            # Faster speed increase
-            score_speed_increment = min(self.score / 30000, 0.003)
-            self.game_speed += GAME_SPEED_INCREMENT + score_speed_increment
-            
-            # Update score
-            self.score += 0.1 * (1 + self.difficulty_level * 0.15)
-            
-            # Remove off-screen objects
-            self.cleanup_off_screen_objects()
-            
-            # Update obstacles
-            for obstacle in self.obstacles:
-                obstacle.update(self.game_speed)
-                
-                # Collision with dinosaur
-                if not self.dinosaur.buffs["invincible"]["active"]:
-                    if rl.check_collision_recs(self.dinosaur.get_rect(), obstacle.get_rect()):
-                        self.game_state = GameState.GAME_OVER
-                        if self.score > self.high_score:
-                            self.high_score = self.score
-                            self.save_high_score()
-                
-                # COLLISION WITH PROJECTILES - FIXED
-                if self.dinosaur.buffs["weapon"]["active"]:
-                    bullets_to_remove = []
-                    for bullet in self.dinosaur.buffs["weapon"]["bullets"]:
-                        bullet_rect = rl.Rectangle(bullet["x"], bullet["y"], 
-                                                  bullet["width"], bullet["height"])
-                        if rl.check_collision_recs(bullet_rect, obstacle.get_rect()):
-                            obstacle.destroyed = True
-                            self.score += 20  # More points for destroying
-                            bullets_to_remove.append(bullet)
-                    
-                    # Remove bullets that hit
-                    for bullet in bullets_to_remove:
-                        if bullet in self.dinosaur.buffs["weapon"]["bullets"]:
-                            self.dinosaur.buffs["weapon"]["bullets"].remove(bullet)
-                
-                # Mark as passed
-                if not obstacle.passed and obstacle.x < self.dinosaur.x:
-                    obstacle.passed = True
-                    self.score += 5
-            
-            # Buffs
-            for buff in self.buffs:
-                buff.update(self.game_speed)
-                
-                if rl.check_collision_recs(self.dinosaur.get_rect(), buff.get_rect()):
-                    buff.collected = True
-                    self.dinosaur.activate_buff(buff.type)
-                    self.score += 30  # More points for collecting hard buff
-            
-            # Clouds
-            for cloud in self.clouds:
-                cloud["x"] -= cloud["speed"]
-            
-            # Generate obstacles - MORE CHALLENGING
-            self.obstacle_timer += 1
-            if self.obstacle_timer >= self.obstacle_frequency and len(self.obstacles) < self.max_obstacles:
-                self.obstacle_timer = 0
-                
-                # MORE BIRDS as difficulty increases
-                cactus_chance = 0.7 - (self.difficulty_level * 0.04)  # Less cacti
-                cactus_chance = max(0.4, cactus_chance)  # Minimum 40%
-                
-                obstacle_type = "cactus" if random.random() < cactus_chance else "bird"
-                
-                # Add obstacle
-                self.obstacles.append(Obstacle(SCREEN_WIDTH, obstacle_type, self.difficulty_level, self.score))
-                
-                # MORE CHANCE FOR DOUBLE OBSTACLES
-                if self.difficulty_level > 2 and random.random() < 0.4:
-                    extra_type = "bird" if obstacle_type == "cactus" else "cactus"
-                    extra_x = SCREEN_WIDTH + random.randint(30, 100)  # Closer
-                    self.obstacles.append(Obstacle(extra_x, extra_type, self.difficulty_level, self.score))
-            
-            # Generate buffs - LESS FREQUENT AND HARDER
-            self.buff_timer += 1
-            buff_spawn_chance = 0.5 - (self.difficulty_level * 0.06)  # Less buffs
-            buff_spawn_chance = max(0.2, buff_spawn_chance)  # Minimum 20%
-            
-            if (self.buff_timer >= self.buff_frequency and 
-                len(self.buffs) < self.max_buffs and 
-                random.random() < buff_spawn_chance):
-                
-                self.buff_timer = 0
-                self.buffs.append(Buff(SCREEN_WIDTH, self.difficulty_level, self.score))
-            
-            # Generate clouds
-            self.cloud_timer += 1
-            if self.cloud_timer >= 100 and len(self.clouds) < self.max_clouds:
-                self.cloud_timer = 0
-                if random.random() < 0.4:
-                    self.clouds.append(self.create_cloud())
+            # Game logic lives in the headless engine
+            super().update()
                     
         elif self.game_state == GameState.GAME_OVER:
             if rl.is_key_pressed(rl.KEY_SPACE) or rl.is_key_pressed(rl.KEY_R) or rl.is_key_pressed(rl.KEY_ENTER):
                 self.reset()
     
-    def cleanup_off_screen_objects(self):
-        """Remove objects completely off screen"""
-        # Obstacles
-        self.obstacles = [obs for obs in self.obstacles 
-                         if obs.x > -100 and not obs.destroyed]
-        
-        # Buffs
-        self.buffs = [buff for buff in self.buffs 
-                     if buff.x > -100 and not buff.collected]
-        
-        # Clouds
-        self.clouds = [cloud for cloud in self.clouds 
-                      if cloud["x"] > -200]
-                
-    def create_cloud(self):
-        return {
-            "x": SCREEN_WIDTH + random.randint(0, 100),
-            "y": random.randint(30, 150),
-            "width": random.randint(60, 100),
-            "height": random.randint(20, 40),
-            "speed": CLOUD_SPEED + random.uniform(-0.3, 0.3),
-            "color": LIGHT_GRAY
-        }
-        
     def draw_cloud(self, cloud):
-        x, y, width, height = cloud["x"], cloud["y"], cloud["width"], cloud["height"]
+        SPRITES.draw(("cloud", cloud.width, cloud.height), cloud.width, cloud.height,
+                     cloud.x, cloud.y, self.paint_cloud, cloud.width, cloud.height)
         
+    def paint_cloud(self, x, y, width, height):
         # Shadow
         shadow_rect = rl.Rectangle(x + 3, y + 3, width, height)
         rl.draw_rectangle_rounded(shadow_rect, 0.5, 8, SHADOW_COLOR)
         
         # Cloud
         cloud_rect = rl.Rectangle(x, y, width, height)
-        rl.draw_rectangle_rounded(cloud_rect, 0.5, 8, cloud["color"])
+        rl.draw_rectangle_rounded(cloud_rect, 0.5, 8, LIGHT_GRAY)
         rl.draw_rectangle_rounded_lines(cloud_rect, 0.5, 8, WHITE)
         
     def draw_gradient_background(self):
+        self.draw_backdrop(self.background, self.ground_lines, self.background_look(self.score))
+        
+    def background_look(self, score):
         # Sky with gradient
-        score_factor = min(self.score / 3000, 1.0)  # Faster
+        score_factor = min(score / 3000, 1.0)  # Faster
         
-        top_color = rl.Color(
+        top_color = (
             int(10 + score_factor * 25),
             int(10 + score_factor * 12), 
-            int(40 + score_factor * 25), 
-            255
+            int(40 + score_factor * 25)
         )
-        bottom_color = rl.Color(
+        bottom_color = (
             int(30 + score_factor * 35),
             int(30 + score_factor * 18), 
-            int(80 + score_factor * 35), 
-            255
+            int(80 + score_factor * 35)
         )
+        star_step = int(score/80) % 105
+        ground_darkness = min(40 + int(score/80), 100)
+        return top_color, bottom_color, star_step, ground_darkness
+        
+    def draw_backdrop(self, background, ground_lines, look):
+        # Sky, stars and ground only change every few hundred points: repaint them then
+        background.update(look, self.paint_background, *look)
+        background.draw(0, 0)
         
-        rl.draw_rectangle_gradient_v(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT, top_color, bottom_color)
+        # Ground lines: one strip that scrolls by showing a different part of it
+        ground_y = SCREEN_HEIGHT - GROUND_HEIGHT
+        ground_lines.update("lines", self.paint_ground_lines)
+        line_offset = int(self.score * 2) % 40
+        ground_lines.draw(0, ground_y, line_offset or 40, SCREEN_WIDTH)
+        
+    def paint_background(self, top_color, bottom_color, star_step, ground_darkness):
+        rl.draw_rectangle_gradient_v(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT,
+                                     PALETTE.rgb(*top_color), PALETTE.rgb(*bottom_color))
         
         # Stars
         for i in range(50):
             star_x = (i * 37) % SCREEN_WIDTH
             star_y = (i * 23) % (SCREEN_HEIGHT - GROUND_HEIGHT)
             star_size = 1 + (i % 3)
-            brightness = 150 + ((i + int(self.score/80)) % 105)
+            brightness = 150 + ((i + star_step) % 105)
             rl.draw_rectangle(int(star_x), int(star_y), star_size, star_size, 
-                             rl.Color(brightness, brightness, brightness, 255))
+                             PALETTE.gray(brightness))
         
         # Ground
         ground_y = SCREEN_HEIGHT - GROUND_HEIGHT
-        ground_darkness = min(40 + int(self.score/80), 100)
         rl.draw_rectangle_gradient_v(0, ground_y, SCREEN_WIDTH, GROUND_HEIGHT, 
-                                    rl.Color(ground_darkness, ground_darkness, ground_darkness, 255), 
-                                    rl.Color(20, 20, 20, 255))
+                                    PALETTE.gray(ground_darkness), 
+                                    PALETTE.gray(20))
         
-        # Ground lines
+    def paint_ground_lines(self):
+        # A line every 40 px; the strip is drawn from x = 1..40 so the gaps line up with the old layout
         line_color = NEON_GREEN
-        for i in range(0, SCREEN_WIDTH, 40):
-            line_x = (i - int(self.score * 2) % 40) % SCREEN_WIDTH
-            rl.draw_line(int(line_x), ground_y + 1, int(line_x + 20), ground_y + 1, 
-                         rl.Color(line_color.r, line_color.g, line_color.b, 100))
-            rl.draw_line(int(line_x), ground_y, int(line_x + 20), ground_y, line_color)
+        for line_x in range(40, SCREEN_WIDTH + 40 + 1, 40):
+            rl.draw_line(line_x, 1, line_x + 20, 1, 
+                         PALETTE.alpha(line_color, 100))
+            rl.draw_line(line_x, 0, line_x + 20, 0, line_color)
             
     def draw_menu(self):
+        # Draw floating game elements
+        self.draw_floating_game_elements()
+        
+        # Buttons with icons
+        self.play_button.draw()
+        self.controls_button.draw()
+        self.credits_button.draw()
+        
+        # All the text comes from the text cache, in one blend mode
+        TEXT.begin()
+        
         # SUPER SQUARE RUN title
         title = "SUPER SQUARE RUN"
         title_size = 52
@@ -771,19 +481,19 @@ class Game:
         glow_intensity = abs(math.sin(time * 2)) * 100 + 155
         
         for offset in range(3, 0, -1):
-            glow_color = rl.Color(NEON_PINK.r, NEON_PINK.g, NEON_PINK.b, int(glow_intensity / offset))
-            title_width = rl.measure_text(title, title_size + offset)
-            rl.draw_text(title, (SCREEN_WIDTH - title_width) // 2 + offset, 
-                        103 + offset, title_size + offset, glow_color)
+            glow_color = PALETTE.alpha(NEON_PINK, int(glow_intensity / offset))
+            title_width = TEXT.width(title, title_size + offset)
+            TEXT.draw(title, (SCREEN_WIDTH - title_width) // 2 + offset, 
+                      103 + offset, title_size + offset, glow_color)
         
-        title_width = rl.measure_text(title, title_size)
+        title_width = TEXT.width(title, title_size)
         title_x = (SCREEN_WIDTH - title_width) // 2
         title_y = 100
         
         # Gradient in title
         for i, letter in enumerate(title):
             if letter != ' ':
-                letter_x = title_x + rl.measure_text(title[:i], title_size)
+                letter_x = title_x + TEXT.width(title[:i], title_size)
                 color_index = (i + int(time * 5)) % 3
                 if color_index == 0:
                     letter_color = NEON_PINK
@@ -792,30 +502,24 @@ class Game:
                 else:
                     letter_color = NEON_GREEN
                 
-                rl.draw_text(letter, int(letter_x), int(title_y), title_size, letter_color)
+                TEXT.draw(letter, int(letter_x), int(title_y), title_size, letter_color)
         
         # Subtitle with basic controls
         subtitle = "Press SPACE to jump • DOWN ARROW to duck"
-        subtitle_width = rl.measure_text(subtitle, 22)
-        rl.draw_text(subtitle, (SCREEN_WIDTH - subtitle_width) // 2, 170, 22, WHITE)
-        
-        # Draw floating game elements
-        self.draw_floating_game_elements()
+        subtitle_width = TEXT.width(subtitle, 22)
+        TEXT.draw(subtitle, (SCREEN_WIDTH - subtitle_width) // 2, 170, 22, WHITE)
         
         # High score
-        hs_text = f"🏆 HIGH SCORE: {int(self.high_score)}"
-        hs_width = rl.measure_text(hs_text, 26)
-        rl.draw_text(hs_text, (SCREEN_WIDTH - hs_width) // 2, 430, 26, YELLOW)
-        
-        # Buttons with icons
-        self.play_button.draw()
-        self.controls_button.draw()
-        self.credits_button.draw()
+        hs_text = self.menu_high_score_label.get(self.high_score)
+        hs_width = TEXT.width(hs_text, 26)
+        TEXT.draw_label(self.menu_high_score_label, (SCREEN_WIDTH - hs_width) // 2, 430, 26, YELLOW)
         
         # Basic controls in menu
         controls_text = "ESC: Back to Menu • F: Shoot (with weapon)"
-        controls_width = rl.measure_text(controls_text, 18)
-        rl.draw_text(controls_text, (SCREEN_WIDTH - controls_width) // 2, 480, 18, LIGHT_GRAY)
+        controls_width = TEXT.width(controls_text, 18)
+        TEXT.draw(controls_text, (SCREEN_WIDTH - controls_width) // 2, 480, 18, LIGHT_GRAY)
+        
+        TEXT.end()
         
     def draw_floating_game_elements(self):
         time = rl.get_time()
@@ -851,6 +555,12 @@ class Game:
         rl.draw_rectangle_rounded_lines(bird_rect, 0.2, 4, BLACK)
         
     def draw_controls(self):
+        # Drawn into a texture the first time, the back button goes on top
+        self.controls_screen.update("controls", self.paint_controls)
+        self.controls_screen.draw(0, 0)
+        self.back_button.draw()
+        
+    def paint_controls(self):
         # Title
         title = "🎮 COMPLETE CONTROLS"
         title_width = rl.measure_text(title, 40)
@@ -858,7 +568,7 @@ class Game:
         
         # Background for readability
         bg_rect = rl.Rectangle(40, 120, SCREEN_WIDTH - 80, 320)
-        rl.draw_rectangle_rounded(bg_rect, 0.1, 6, rl.Color(0, 0, 0, 200))
+        rl.draw_rectangle_rounded(bg_rect, 0.1, 6, PALETTE.rgb(0, 0, 0, 200))
         
         # Main controls section
         rl.draw_text("MAIN CONTROLS:", 60, 140, 26, NEON_GREEN)
@@ -894,9 +604,12 @@ class Game:
         rl.draw_text("• Ducking is essential for passing low birds", 80, tips_y + 30, 18, LIGHT_GRAY)
         rl.draw_text("• Buffs become rarer and harder as you progress", 80, tips_y + 55, 18, LIGHT_GRAY)
         
+    def draw_credits(self):
+        self.credits_screen.update("credits", self.paint_credits)
+        self.credits_screen.draw(0, 0)
         self.back_button.draw()
         
-    def draw_credits(self):
+    def paint_credits(self):
         # Title
         title = "📝 CREDITS"
         title_width = rl.measure_text(title, 48)
@@ -904,7 +617,7 @@ class Game:
         
         # Background for readability
         bg_rect = rl.Rectangle(50, 120, SCREEN_WIDTH - 100, 300)
-        rl.draw_rectangle_rounded(bg_rect, 0.1, 6, rl.Color(0, 0, 0, 180))
+        rl.draw_rectangle_rounded(bg_rect, 0.1, 6, PALETTE.rgb(0, 0, 0, 180))
         
         # Credits
         credits = [
@@ -933,12 +646,14 @@ class Game:
                    (YELLOW if "✨" in line else LIGHT_GRAY))))
             rl.draw_text(line, (SCREEN_WIDTH - line_width) // 2, 130 + i * 22, 18, color)
         
-        self.back_button.draw()
+    def draw_game(self, detail=DETAIL_FULL):
+        # Everything on the track comes from the sprite cache, in one blend mode
+        SPRITES.begin()
         
-    def draw_game(self):
         # Clouds
-        for cloud in self.clouds:
-            self.draw_cloud(cloud)
+        if detail > DETAIL_LOW:
+            for cloud in self.clouds:
+                self.draw_cloud(cloud)
             
         # Buffs
         for buff in self.buffs:
@@ -951,38 +666,50 @@ class Game:
         # Dinosaur
         self.dinosaur.draw()
         
-        # Game interface
-        score_text = f"🏆 SCORE: {int(self.score)}"
-        score_x = SCREEN_WIDTH - rl.measure_text(score_text, 26) - 20
+        SPRITES.end()
+        if detail == DETAIL_LOW:
+            return
+        self.dinosaur.draw_buff_indicators()
+        if detail < DETAIL_FULL:
+            return
+        
+        # Game interface, all from the text cache in one blend mode
+        TEXT.begin()
+        score_text = self.score_label.get(self.score)
+        score_x = SCREEN_WIDTH - TEXT.width(score_text, 26) - 20
         
         score_glow = min(100 + int(self.score / 80), 200)
-        rl.draw_text(score_text, int(score_x + 2), 22, 26, rl.Color(255, 255, 255, score_glow))
-        rl.draw_text(score_text, int(score_x), 20, 26, YELLOW)
+        TEXT.draw_label(self.score_label, int(score_x + 2), 22, 26, PALETTE.alpha(WHITE, score_glow))
+        TEXT.draw_label(self.score_label, int(score_x), 20, 26, YELLOW)
         
-        high_score_text = f"👑 HIGH SCORE: {int(self.high_score)}"
-        high_score_x = SCREEN_WIDTH - rl.measure_text(high_score_text, 22) - 20
-        rl.draw_text(high_score_text, int(high_score_x), 55, 22, NEON_GREEN)
+        high_score_text = self.high_score_label.get(self.high_score)
+        high_score_x = SCREEN_WIDTH - TEXT.width(high_score_text, 22) - 20
+        TEXT.draw_label(self.high_score_label, int(high_score_x), 55, 22, NEON_GREEN)
         
         if self.game_state == GameState.PLAYING:
             # Left side information
-            level_text = f"📊 LEVEL: {self.difficulty_level}"
-            rl.draw_text(level_text, 20, 20, 22, WHITE)
-            
-            speed_text = f"⚡ SPEED: {self.game_speed:.1f}"
-            rl.draw_text(speed_text, 20, 50, 18, LIGHT_GRAY)
+            self.level_label.get(self.difficulty_level)
+            self.speed_label.get(self.game_speed)
+            TEXT.draw_label(self.level_label, 20, 20, 22, WHITE)
+            TEXT.draw_label(self.speed_label, 20, 50, 18, LIGHT_GRAY)
             
             # Active controls on screen
             controls_y = 85
-            rl.draw_text("🎮 CONTROLS:", 20, controls_y, 16, NEON_BLUE)
-            rl.draw_text("SPACE: Jump  ↓: Duck  F: Shoot", 20, controls_y + 20, 14, LIGHT_GRAY)
+            TEXT.draw("🎮 CONTROLS:", 20, controls_y, 16, NEON_BLUE)
+            TEXT.draw("SPACE: Jump  ↓: Duck  F: Shoot", 20, controls_y + 20, 14, LIGHT_GRAY)
+            if self.autopilot:
+                autopilot_color = NEON_GREEN if self.planner.last_survives else RED
+                TEXT.draw("🤖 AUTOPILOT (A)", 20, controls_y + 40, 16, autopilot_color)
             
             # Difficulty indicator
             diff_level = min(10, self.difficulty_level)
-            diff_text = f"🔥 DIFFICULTY: {diff_level}/10"
-            diff_width = rl.measure_text(diff_text, 18)
+            diff_text = self.difficulty_label.get(diff_level)
+            diff_width = TEXT.width(diff_text, 18)
             diff_color = GREEN if diff_level < 4 else (YELLOW if diff_level < 7 else RED)
-            rl.draw_text(diff_text, SCREEN_WIDTH - diff_width - 20, 85, 18, diff_color)
-            
+            TEXT.draw_label(self.difficulty_label, SCREEN_WIDTH - diff_width - 20, 85, 18, diff_color)
+        TEXT.end()
+        
+        if self.game_state == GameState.PLAYING:
             # Visual difficulty bar
             bar_width = 200
             bar_height = 10
@@ -999,39 +726,49 @@ class Game:
             
     def draw_game_over(self):
         # Dark overlay
-        rl.draw_rectangle(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT, rl.Color(0, 0, 0, 180))
+        rl.draw_rectangle(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT, PALETTE.rgb(0, 0, 0, 180))
         
         # GAME OVER title
+        TEXT.begin()
         game_over_text = "GAME OVER!"
-        go_width = rl.measure_text(game_over_text, 60)
+        go_width = TEXT.width(game_over_text, 60)
         
         time = rl.get_time()
         glow = abs(math.sin(time * 3)) * 100 + 155
         for offset in range(3, 0, -1):
-            glow_color = rl.Color(255, 50, 50, int(glow / offset))
-            rl.draw_text(game_over_text, (SCREEN_WIDTH - go_width) // 2 + offset, 
-                        103 + offset, 60 + offset, glow_color)
+            glow_color = PALETTE.alpha(GLOW_RED, int(glow / offset))
+            TEXT.draw(game_over_text, (SCREEN_WIDTH - go_width) // 2 + offset, 
+                      103 + offset, 60 + offset, glow_color)
         
-        rl.draw_text(game_over_text, (SCREEN_WIDTH - go_width) // 2, 100, 60, RED)
+        TEXT.draw(game_over_text, (SCREEN_WIDTH - go_width) // 2, 100, 60, RED)
         
         # Statistics
-        score_text = f"🏆 Final Score: {int(self.score)}"
-        level_text = f"📈 Level reached: {self.difficulty_level}"
-        speed_text = f"⚡ Maximum speed: {self.game_speed:.1f}"
+        score_text = self.final_score_label.get(self.score)
+        level_text = self.level_reached_label.get(self.difficulty_level)
+        speed_text = self.max_speed_label.get(self.game_speed)
         restart_text = "🔄 Press SPACE, ENTER or R to play again"
         menu_text = "🏠 Press ESC to return to menu"
         
-        score_width = rl.measure_text(score_text, 36)
-        level_width = rl.measure_text(level_text, 28)
-        speed_width = rl.measure_text(speed_text, 24)
-        restart_width = rl.measure_text(restart_text, 20)
-        menu_width = rl.measure_text(menu_text, 18)
-        
-        rl.draw_text(score_text, (SCREEN_WIDTH - score_width) // 2, 180, 36, YELLOW)
-        rl.draw_text(level_text, (SCREEN_WIDTH - level_width) // 2, 230, 28, WHITE)
-        rl.draw_text(speed_text, (SCREEN_WIDTH - speed_width) // 2, 270, 24, NEON_BLUE)
-        rl.draw_text(restart_text, (SCREEN_WIDTH - restart_width) // 2, 320, 20, NEON_GREEN)
-        rl.draw_text(menu_text, (SCREEN_WIDTH - menu_width) // 2, 350, 18, LIGHT_GRAY)
+        score_width = TEXT.width(score_text, 36)
+        level_width = TEXT.width(level_text, 28)
+        speed_width = TEXT.width(speed_text, 24)
+        restart_width = TEXT.width(restart_text, 20)
+        menu_width = TEXT.width(menu_text, 18)
+        
+        TEXT.draw_label(self.final_score_label, (SCREEN_WIDTH - score_width) // 2, 180, 36, YELLOW)
+        TEXT.draw_label(self.level_reached_label, (SCREEN_WIDTH - level_width) // 2, 230, 28, WHITE)
+        TEXT.draw_label(self.max_speed_label, (SCREEN_WIDTH - speed_width) // 2, 270, 24, NEON_BLUE)
+        TEXT.draw(restart_text, (SCREEN_WIDTH - restart_width) // 2, 320, 20, NEON_GREEN)
+        TEXT.draw(menu_text, (SCREEN_WIDTH - menu_width) // 2, 350, 18, LIGHT_GRAY)
+        
+        # Rank on the shared leaderboard, once the server has checked the run
+        if self.leaderboard_ticket is not None:
+            result = self.leaderboard.results.get(self.leaderboard_ticket)
+            if result is not None and result["accepted"]:
+                rank_text = self.leaderboard_label.get(result["rank"])
+                rank_width = TEXT.width(rank_text, 22)
+                TEXT.draw_label(self.leaderboard_label, (SCREEN_WIDTH - rank_width) // 2, 390, 22, NEON_PINK)
+        TEXT.end()
         
     def draw(self):
         self.draw_gradient_background()
@@ -1047,6 +784,55 @@ class Game:
         elif self.game_state == GameState.GAME_OVER:
             self.draw_game()
             self.draw_game_over()
+            
+    def draw_profiler(self):
+        # Sorting every ring for percentiles is not free, refresh twice a second
+        if self.profile_summary is None or self.profiler.frame_count % 30 == 0:
+            self.profile_summary = self.profiler.summary()
+        summary = self.profile_summary
+        
+        panel_x = 10
+        panel_y = 60
+        panel_width = 330
+        line_height = 14
+        rows = len(summary["sections"]) + 4
+        rl.draw_rectangle(panel_x, panel_y, panel_width, rows * line_height + 70, PALETTE.rgb(0, 0, 0, 190))
+        
+        frame = summary["frame"]
+        text_y = panel_y + 6
+        rl.draw_text(f"FRAME  p50 {frame['p50']:.2f}  p95 {frame['p95']:.2f}  p99 {frame['p99']:.2f}  max {frame['max']:.1f} ms",
+                     panel_x + 6, text_y, 10, NEON_GREEN)
+        text_y += line_height
+        gc_stats = summary["gc"]
+        rl.draw_text(f"GC  {gc_stats['collections']} pauses  p99 {gc_stats['p99']:.2f}  max {gc_stats['max']:.2f} ms",
+                     panel_x + 6, text_y, 10, ORANGE)
+        text_y += line_height + 4
+        
+        for name, stats in summary["sections"].items():
+            if name == "gc":
+                continue
+            color = RED if stats["p95"] > 4 else WHITE
+            rl.draw_text(f"{name[:26]:26}", panel_x + 6, text_y, 10, color)
+            rl.draw_text(f"{stats['p50']:6.3f} {stats['p95']:6.3f} {stats['max']:6.2f}",
+                         panel_x + 190, text_y, 10, color)
+            text_y += line_height
+            
+        # Frame time histogram, one bar per millisecond, 16.6 ms budget marked
+        histogram = summary["histogram_ms"]
+        tallest = max(max(histogram), 1)
+        bar_width = (panel_width - 12) // len(histogram)
+        base_y = text_y + 44
+        for i, count in enumerate(histogram):
+            bar_height = int(40 * count / tallest)
+            color = NEON_GREEN if i < 17 else RED
+            rl.draw_rectangle(panel_x + 6 + i * bar_width, base_y - bar_height, bar_width - 1, bar_height, color)
+        budget_x = panel_x + 6 + int(16.6 * bar_width)
+        rl.draw_line(budget_x, base_y - 42, budget_x, base_y, YELLOW)
+
+class ShownGame(Game):
+    # With the simulation thread the run is only restored from its snapshots here, every
+    # frame, so there are no spawn chunks to make ahead (like spectator.TileGame)
+    background_spawns = False
 
 def main():
     # Initialize window
@@ -1055,7 +841,28 @@ def main():
     # Performance settings
     rl.set_target_fps(60)
     
-    game = Game()
+    # python main.py [curve.json] plays with another difficulty curve
+    game_class = ShownGame if THREADED_SIMULATION else Game
+    game = game_class(DifficultyCurve.load(sys.argv[1]) if len(sys.argv) > 1 else None)
+    accumulator = 0.0
+    pending_action = 0
+    
+    # While a run is going the simulation thread owns it; game only shows its snapshots
+    runner = None
+    if THREADED_SIMULATION:
+        runner = SimulationThread(game.curve)
+        game.profiler.instrument(runner.sim, SIMULATION_SECTIONS, prefix="sim.")
+        # The planner that plays is the one on the simulation thread: the HUD shows that one
+        game.planner = runner.planner
+    run_started = False
+    
+    # Replays are written on their own thread, like the score records
+    replays = replay.ReplayWriter()
+    
+    # Gameplay event log, SSR_EVENTS=1 writes the events of every run this session to one
+    # file in events/ (see events.py)
+    events = EventLog() if os.environ.get("SSR_EVENTS") else None
+    (runner.sim if runner else game).events = events
     
     # Main game loop
     while not rl.window_should_close():
@@ -1063,32 +870,104 @@ def main():
         if rl.is_key_pressed(rl.KEY_ESCAPE):
             if game.game_state in [GameState.PLAYING, GameState.GAME_OVER]:
                 game.game_state = GameState.MENU
+                if runner:
+                    runner.stop()
+                    run_started = False
             elif game.game_state in [GameState.CONTROLS, GameState.CREDITS]:
                 game.game_state = GameState.MENU
         
         # Game controls
         if game.game_state == GameState.PLAYING:
+            # Key presses wait here until a simulation tick uses them
             if rl.is_key_pressed(rl.KEY_SPACE) or rl.is_key_pressed(rl.KEY_UP):
-                game.dinosaur.jump()
+                pending_action |= ACTION_JUMP
                 
             if rl.is_key_pressed(rl.KEY_F):
-                game.dinosaur.shoot()
+                pending_action |= ACTION_SHOOT
                 
             # Duck - NOW USEFUL!
-            if rl.is_key_down(rl.KEY_DOWN):
-                game.dinosaur.duck(True)
+            held_action = ACTION_DUCK if rl.is_key_down(rl.KEY_DOWN) else 0
+            
+            if rl.is_key_pressed(rl.KEY_A):
+                game.autopilot = not game.autopilot
+                if runner:
+                    runner.set_autopilot(game.autopilot)
+                else:
+                    game.planner.reset()
+                
+            if runner:
+                if not run_started:
+                    runner.start(game.seed, game.high_score, game.autopilot)
+                    run_started = True
+                runner.send(time.perf_counter(), pending_action, held_action)
+                pending_action = 0
+                runner.show(game, time.perf_counter())
+            elif FIXED_TIMESTEP:
+                accumulator += min(rl.get_frame_time(), MAX_FRAME_TIME)
+                while accumulator >= TICK_TIME and game.game_state == GameState.PLAYING:
+                    if game.autopilot:
+                        pending_action = game.planner.choose(game)
+                        held_action = 0
+                    game.step(pending_action | held_action)
+                    pending_action = 0
+                    accumulator -= TICK_TIME
             else:
-                game.dinosaur.duck(False)
+                if game.autopilot:
+                    pending_action = game.planner.choose(game)
+                    held_action = 0
+                game.step(pending_action | held_action)
+                pending_action = 0
+                
+            if game.game_state == GameState.GAME_OVER:
+                run = game
+                if runner:
+                    # The last snapshot had the crash in it: the run and its inputs are in runner.sim
+                    runner.stop()
+                    run_started = False
+                    run = runner.sim
+                # Keep a score record of every finished run, and a replay (seed + inputs, a few
+                # KB). Replays play back with the default curve, so runs on other curves only
+                # get the score record
+                game.record_run(run)
+                if game.curve is DEFAULT_CURVE:
+                    replays.save(run)
+        else:
+            accumulator = 0.0
+            pending_action = 0
+            
+            # Menus and game over screen
+            game.update()
         
-        # Update game logic
-        game.update()
+        # Profiler overlay and export
+        if rl.is_key_pressed(rl.KEY_F1):
+            game.profiler.toggle()
+        if rl.is_key_pressed(rl.KEY_F2) and game.profiler.enabled:
+            game.profiler.export()
         
         # Draw
         rl.begin_drawing()
         game.draw()
+        if game.profiler.enabled:
+            game.draw_profiler()
         rl.end_drawing()
+        game.profiler.end_frame()
         
     # Close window
+    if runner:
+        runner.close()
+    SPRITES.unload()
+    TEXT.unload()
+    game.background.unload()
+    game.ground_lines.unload()
+    game.controls_screen.unload()
+    game.credits_screen.unload()
+    game.unload_labels()
+    game.scores.close()
+    replays.close()
+    if game.leaderboard:
+        game.leaderboard.close()
+    if events:
+        events.close()
     rl.close_window()
 
 if __name__ == "__main__":
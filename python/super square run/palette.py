@@ -0,0 +1,47 @@
+"""Colour tables, so drawing doesn't make new rl.Color structs every frame.
+
+Every variant the game draws (a colour at some alpha for the glows, gray
+levels for the stars and the ground, the darker shade of a bird's wing) is
+looked up by index in a table. A table is only made the first time it is
+asked for and each entry is filled on first use, so nothing is built
+before the window is open and the first frame pays for a few entries, not
+for all of them.
+"""
+import raylibpy as rl
+
+class Palette:
+    def __init__(self):
+        self.ramps = {}  # (r, g, b) -> 256 entries, the colour at each alpha
+        self.grays = [None] * 256
+        self.colors = {}  # (r, g, b, a) -> Color, for one-off shades
+
+    def alpha(self, color, alpha):
+        """color with its alpha set to alpha (0-255)."""
+        key = (color.r, color.g, color.b)
+        ramp = self.ramps.get(key)
+        if ramp is None:
+            ramp = self.ramps[key] = [None] * 256
+        shade = ramp[alpha]
+        if shade is None:
+            shade = ramp[alpha] = rl.Color(color.r, color.g, color.b, alpha)
+        return shade
+
+    def gray(self, level):
+        """Opaque gray, level 0-255."""
+        shade = self.grays[level]
+        if shade is None:
+            shade = self.grays[level] = rl.Color(level, level, level, 255)
+        return shade
+
+    def rgb(self, r, g, b, a=255):
+        key = (r, g, b, a)
+        color = self.colors.get(key)
+        if color is None:
+            color = self.colors[key] = rl.Color(r, g, b, a)
+        return color
+
+    def darker(self, color, amount):
+        return self.rgb(max(color.r - amount, 0), max(color.g - amount, 0), max(color.b - amount, 0),
+                        color.a)
+
+PALETTE = Palette()
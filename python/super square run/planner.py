@@ -0,0 +1,204 @@
+"""Autopilot: picks jump, duck or shoot by trying them out on copies of the run.
+
+The planner does a beam search over the next `horizon` ticks. Every
+`decision_ticks` ticks each state in the beam branches into the actions
+that make sense there (jump, duck, shoot, nothing), the branches are played
+out on a scratch Simulation restored from snapshots, and `beam_width`
+survivors go on to the next level. The score barely tells branches apart,
+so survivors are ranked by score less a small cost for every decision spent
+in the air (on the ground every move is still open), and each parent's best
+child gets in before any parent's second best, so one branch can't fill the
+whole beam with near copies of itself. The beam is kept between
+decisions, so most decisions only search one level deeper. The random stream is part
+of the snapshot, so the planner sees the obstacles that are about to
+spawn: it answers "can this still be survived?", which is what a
+regression bot and a difficulty oracle need.
+
+A search stops early when its time budget runs out and goes with the best
+branch found so far (and carries on from there next time), so a decision
+always fits in one 60 Hz frame.
+"""
+import time
+
+from engine import (Simulation, GameState, ACTION_NONE, ACTION_JUMP, ACTION_DUCK,
+                    ACTION_SHOOT, BUFF_DOUBLE_JUMP, BUFF_WEAPON)
+
+# Taken off a branch's value for each decision it spent in the air: enough to break ties
+# between equal scores, never enough to outweigh a point of score
+AIRBORNE_COST = 0.01
+
+class Planner:
+    def __init__(self, horizon=120, decision_ticks=2, beam_width=8, time_budget=0.008):
+        self.horizon = horizon
+        self.decision_ticks = decision_ticks
+        self.beam_width = beam_width
+        self.time_budget = time_budget
+        self.scratch = Simulation(0)
+        self.plan = []  # Actions still to play from the last decision
+        self.last_search_time = 0.0
+        self.last_survives = True
+        self.reset()
+
+    def reset(self):
+        self.plan.clear()
+        # Beam entries: (value, actions from the root, snapshot, decisions spent in the air).
+        # Kept between decisions:
+        # after one is played, the branches that started with it are still valid, so each
+        # decision only has to search one level deeper
+        self.beam = []
+        self.depth = 0
+        self.root = None
+        self.best_dead = None
+
+    def actions(self, sim):
+        dino = sim.dinosaur
+        actions = [ACTION_NONE, ACTION_DUCK]
+        # A jump in the air only does something with double jump left
+        if not dino.is_jumping or (dino.active_buffs & BUFF_DOUBLE_JUMP and dino.jumps_remaining > 0):
+            actions.append(ACTION_JUMP)
+        if dino.active_buffs & BUFF_WEAPON and len(dino.bullets) < 3:
+            actions.append(ACTION_SHOOT)
+        return actions
+
+    def play_segment(self, action):
+        """Play one decision on the scratch sim. Returns the ticks survived."""
+        sim = self.scratch
+        held = action & ACTION_DUCK
+        for tick in range(self.decision_ticks):
+            if not sim.step(action):
+                return tick
+            action = held
+        return self.decision_ticks
+
+    def expand(self, deadline):
+        """Grow the beam by one decision. Returns False if it ran out of time first."""
+        scratch = self.scratch
+        children = {}
+        for parent, (_, path, state, airborne) in enumerate(self.beam):
+            scratch.restore(state)
+            for action in self.actions(scratch):
+                if time.perf_counter() > deadline:
+                    return False
+                scratch.restore(state)
+                alive = self.play_segment(action)
+                child_path = path + (action,)
+                if scratch.game_state == GameState.PLAYING:
+                    # Different inputs often end in the same place (duck then stand vs
+                    # nothing); keep one of each so the beam holds different futures
+                    key = (scratch.dinosaur.state(), scratch.score)
+                    if key not in children:
+                        child_airborne = airborne + scratch.dinosaur.is_jumping
+                        value = scratch.score - AIRBORNE_COST * child_airborne
+                        children[key] = (value, child_path, scratch.snapshot(), child_airborne, parent)
+                else:
+                    # Crashing later is better, in case nothing survives
+                    dead = (self.depth + alive, child_path)
+                    if self.best_dead is None or dead[0] > self.best_dead[0]:
+                        self.best_dead = dead
+        self.beam = self.select(children.values())
+        self.depth += self.decision_ticks
+        return True
+
+    def select(self, children):
+        """The children that go on to the next level, best first: every parent's best child,
+        then every parent's second best and so on, each round best first."""
+        ranked = sorted(children, key=lambda child: child[0], reverse=True)
+        taken = {}
+        rounds = []
+        for child in ranked:
+            parent = child[4]
+            rounds.append(taken.get(parent, 0))
+            taken[parent] = rounds[-1] + 1
+        order = sorted(range(len(ranked)), key=rounds.__getitem__)[:self.beam_width]
+        return [ranked[index][:4] for index in sorted(order)]
+
+    def search(self, sim):
+        """Extend the search from the current state of sim (which is not changed) until the
+        horizon or the time budget. Returns (first action, whether some branch survives the
+        whole horizon)."""
+        start = time.perf_counter()
+        deadline = start + self.time_budget
+        root = sim.snapshot()
+        self.scratch.curve = sim.curve
+        if root != self.root or not self.beam:
+            # First decision, or the run went somewhere the beam did not expect
+            self.beam = [(sim.score, (), root, 0)]
+            self.depth = 0
+            self.best_dead = None
+        self.root = root
+
+        while self.beam and self.depth < self.horizon:
+            if not self.expand(deadline):
+                break
+
+        if self.beam and self.beam[0][1]:
+            action = self.beam[0][1][0]
+            self.last_survives = self.depth >= self.horizon
+        else:
+            action = self.best_dead[1][0] if self.best_dead else ACTION_NONE
+            self.last_survives = False
+        self.last_search_time = time.perf_counter() - start
+        return action, self.last_survives
+
+    def advance(self, action):
+        """Move the root of the beam past one played decision."""
+        self.beam = [(value, path[1:], state, airborne) for value, path, state, airborne in self.beam
+                     if path and path[0] == action]
+        self.depth -= self.decision_ticks
+        self.best_dead = None
+        if self.beam:
+            # The state the real run will be in when it asks again
+            self.scratch.restore(self.root)
+            self.play_segment(action)
+            self.root = self.scratch.snapshot()
+
+    def choose(self, sim):
+        """Next action for sim. Searches again once the last decision has been played out."""
+        if not self.plan:
+            action, _ = self.search(sim)
+            self.advance(action)
+            self.plan = [action] + [action & ACTION_DUCK] * (self.decision_ticks - 1)
+            self.plan.reverse()
+        return self.plan.pop()
+
+def play(seed, planner=None, max_ticks=20000):
+    """Play a whole run on autopilot. Returns (sim, list of search times in seconds)."""
+    planner = planner or Planner()
+    planner.reset()
+    sim = Simulation(seed)
+    search_times = []
+    for _ in range(max_ticks):
+        searching = not planner.plan
+        action = planner.choose(sim)
+        if searching:
+            search_times.append(planner.last_search_time)
+        if not sim.step(action):
+            break
+    return sim, search_times
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Autopilot runs: is the game still survivable at level N?")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--level", type=int, default=8, help="a run passes when it reaches this level")
+    parser.add_argument("--max-ticks", type=int, default=20000)
+    parser.add_argument("--budget", type=float, default=8.0, help="search time budget in ms")
+    args = parser.parse_args()
+
+    planner = Planner(time_budget=args.budget / 1000)
+    passed = 0
+    all_times = []
+    for seed in range(args.runs):
+        sim, search_times = play(seed, planner, args.max_ticks)
+        all_times += search_times
+        reached = sim.difficulty_level >= args.level
+        passed += reached
+        print(f"seed {seed:4}: score {int(sim.score):6}  level {sim.difficulty_level:3}  "
+              f"ticks {sim.game_time:6}  {'ok' if reached else 'FAILED'}")
+
+    all_times.sort()
+    p50 = all_times[len(all_times) // 2] * 1000
+    p99 = all_times[min(int(len(all_times) * 0.99), len(all_times) - 1)] * 1000
+    print(f"{passed}/{args.runs} runs reached level {args.level}; "
+          f"search p50 {p50:.2f} ms, p99 {p99:.2f} ms, max {all_times[-1] * 1000:.2f} ms")
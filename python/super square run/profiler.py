@@ -0,0 +1,323 @@
+"""Frame profiler: where do the 16.6 ms go?
+
+Profiler.instrument(obj, names) swaps the named methods of one object for
+timed wrappers while profiling is on, and puts the originals back when it is
+turned off, so a disabled profiler costs nothing but one attribute check per
+frame. Timings go into fixed-size ring buffers: per-section samples for
+rolling percentiles, per-frame times for the histogram, garbage collector
+pauses, and a list of recent calls for the Chrome trace. Methods of an
+object on another thread (the simulation thread) are instrumented with a
+prefix, so their sections stay apart; every call is recorded under one
+lock, with the thread it ran on, and each thread gets its own row in the
+trace. Garbage collector pauses can happen in the middle of recording a call,
+so the collector callback only notes them down, and the next call recorded
+(or the next frame) moves them into the rings and the trace.
+"""
+import csv
+import gc
+import json
+import os
+import threading
+import time
+from array import array
+
+PROFILE_DIR = "profiles"
+
+# Frame time histogram: 1 ms buckets, the last one holds everything slower
+HISTOGRAM_BUCKETS = 34
+
+# Collector pauses that can wait for the next recorded call; more than this many are dropped
+GC_SLOTS = 64
+
+class Ring:
+    """The last `size` float samples."""
+
+    def __init__(self, size):
+        self.values = array("d", bytes(8 * size))
+        self.size = size
+        self.index = 0
+        self.count = 0
+
+    def add(self, value):
+        self.values[self.index] = value
+        self.index = (self.index + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+
+    def samples(self):
+        if self.count < self.size:
+            return self.values[:self.count]
+        return self.values[self.index:] + self.values[:self.index]
+
+    def clear(self):
+        self.index = 0
+        self.count = 0
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+class Profiler:
+    def __init__(self, samples=600, trace_events=20000):
+        self.enabled = False
+        self.sample_size = samples
+        self.sections = {}  # name -> Ring of durations in ms
+        self.frames = Ring(samples)
+        self.histogram = [0] * HISTOGRAM_BUCKETS
+        self.gc_pauses = Ring(samples)
+        self.gc_count = 0
+        self.gc_start = 0.0
+        self.frame_start = 0.0
+        self.frame_count = 0
+
+        # Chrome trace: (name, start, duration, thread) of the last trace_events calls
+        self.trace_size = trace_events
+        self.trace_names = [None] * trace_events
+        self.trace_start = array("d", bytes(8 * trace_events))
+        self.trace_duration = array("d", bytes(8 * trace_events))
+        self.trace_threads = [0] * trace_events
+        self.thread_names = {}  # Thread id -> name, for the trace rows
+        self.trace_index = 0
+        self.trace_count = 0
+        self.origin = time.perf_counter()
+        # Calls can be recorded from several threads. Reentrant, so clear() can use the
+        # methods that take it too
+        self.lock = threading.RLock()
+        # Collector pauses not recorded yet: (generation, start, duration, thread id, thread
+        # name) slots that only on_gc writes, up to gc_noted; the lock holder takes them up
+        # to gc_taken
+        self.gc_slots = [None] * GC_SLOTS
+        self.gc_noted = 0
+        self.gc_taken = 0
+        # Made up front: the collector can run on any thread, while the overlay reads sections
+        self.gc_calls = self.section("gc")
+
+        self.targets = []  # (obj, method names, section prefix) registered with instrument()
+
+    def instrument(self, obj, names, prefix=""):
+        """Time these methods of obj whenever the profiler is on, as sections prefix + name."""
+        self.targets.append((obj, names, prefix))
+        if self.enabled:
+            self.wrap(obj, names, prefix)
+
+    def wrap(self, obj, names, prefix):
+        for name in names:
+            # Bind the class function, not obj.name, so wrapping twice can't nest
+            method = getattr(type(obj), name).__get__(obj)
+            setattr(obj, name, self.timed(prefix + name, method))
+
+    def timed(self, name, method):
+        ring = self.section(name)
+        record = self.record
+        clock = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                record(name, ring, start, clock() - start)
+        return wrapper
+
+    def section(self, name):
+        with self.lock:
+            ring = self.sections.get(name)
+            if ring is None:
+                ring = self.sections[name] = Ring(self.sample_size)
+            return ring
+
+    def section_items(self):
+        """(name, ring) pairs, copied so another thread can add a section meanwhile."""
+        with self.lock:
+            return list(self.sections.items())
+
+    def record(self, name, ring, start, duration):
+        thread = threading.get_ident()
+        with self.lock:
+            if thread not in self.thread_names:
+                self.thread_names[thread] = threading.current_thread().name
+            self.add_call(name, ring, start, duration, thread)
+            if self.gc_noted != self.gc_taken:
+                self.take_gc_pauses()
+
+    def add_call(self, name, ring, start, duration, thread):
+        # Only with the lock held
+        ring.add(duration * 1000)
+        i = self.trace_index
+        self.trace_names[i] = name
+        self.trace_start[i] = start
+        self.trace_duration[i] = duration
+        self.trace_threads[i] = thread
+        self.trace_index = (i + 1) % self.trace_size
+        if self.trace_count < self.trace_size:
+            self.trace_count += 1
+
+    def take_gc_pauses(self):
+        """Move the pauses on_gc noted into the rings and the trace (with the lock held).
+        A collection during this only adds a slot past the ones being taken."""
+        while self.gc_taken != self.gc_noted:
+            generation, start, duration, thread, thread_name = self.gc_slots[self.gc_taken % GC_SLOTS]
+            self.thread_names.setdefault(thread, thread_name)
+            self.gc_count += 1
+            self.gc_pauses.add(duration * 1000)
+            self.add_call(f"gc gen{generation}", self.gc_calls, start, duration, thread)
+            self.gc_taken += 1
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        for obj, names, prefix in self.targets:
+            self.wrap(obj, names, prefix)
+        gc.callbacks.append(self.on_gc)
+        self.frame_start = time.perf_counter()
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        for obj, names, _ in self.targets:
+            for name in names:
+                # Drop the instance attribute, the class method shows through again
+                obj.__dict__.pop(name, None)
+        gc.callbacks.remove(self.on_gc)
+
+    def toggle(self):
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+
+    def clear(self):
+        with self.lock:
+            for _, ring in self.section_items():
+                ring.clear()
+            self.frames.clear()
+            self.gc_pauses.clear()
+            self.histogram = [0] * HISTOGRAM_BUCKETS
+            self.gc_count = 0
+            self.gc_taken = self.gc_noted
+            self.frame_count = 0
+            self.trace_index = 0
+            self.trace_count = 0
+
+    def on_gc(self, phase, info):
+        # Can run inside record() on the same thread, so no lock and nothing shared but its slot
+        if phase == "start":
+            self.gc_start = time.perf_counter()
+        elif self.gc_noted - self.gc_taken < GC_SLOTS:
+            pause = time.perf_counter() - self.gc_start
+            thread = threading.current_thread()
+            self.gc_slots[self.gc_noted % GC_SLOTS] = (info["generation"], self.gc_start, pause,
+                                                        thread.ident, thread.name)
+            self.gc_noted += 1
+
+    def end_frame(self):
+        """Call once per drawn frame. Does nothing while profiling is off."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        ms = (now - self.frame_start) * 1000
+        self.frame_start = now
+        with self.lock:
+            self.frames.add(ms)
+            self.histogram[min(int(ms), HISTOGRAM_BUCKETS - 1)] += 1
+            self.frame_count += 1
+            if self.gc_noted != self.gc_taken:
+                self.take_gc_pauses()
+
+    def stats(self, ring):
+        with self.lock:
+            ordered = sorted(ring.samples())
+        count = len(ordered)
+        return {
+            "count": count,
+            "mean": sum(ordered) / count if count else 0.0,
+            "p50": percentile(ordered, 0.5),
+            "p95": percentile(ordered, 0.95),
+            "p99": percentile(ordered, 0.99),
+            "max": ordered[-1] if count else 0.0,
+        }
+
+    def summary(self):
+        """Rolling stats (in ms) over the last `samples` frames / calls."""
+        return {
+            "frame": self.stats(self.frames),
+            "sections": {name: self.stats(ring) for name, ring in self.section_items()},
+            "histogram_ms": self.histogram,
+            "gc": dict(self.stats(self.gc_pauses), collections=self.gc_count),
+            "frames": self.frame_count,
+        }
+
+    def trace_events(self):
+        """Recorded calls, oldest first, as (name, start, duration in seconds, thread id)."""
+        with self.lock:
+            first = (self.trace_index - self.trace_count) % self.trace_size
+            indexes = [(first + k) % self.trace_size for k in range(self.trace_count)]
+            return [(self.trace_names[i], self.trace_start[i], self.trace_duration[i],
+                     self.trace_threads[i]) for i in indexes]
+
+    def export_csv(self, path):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["section", "count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+            rows = [("frame", self.stats(self.frames)), ("gc", self.stats(self.gc_pauses))]
+            rows += [(name, self.stats(ring)) for name, ring in self.section_items() if name != "gc"]
+            for name, s in rows:
+                writer.writerow([name, s["count"], f"{s['mean']:.4f}", f"{s['p50']:.4f}",
+                                 f"{s['p95']:.4f}", f"{s['p99']:.4f}", f"{s['max']:.4f}"])
+
+    def export_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def export_chrome_trace(self, path):
+        """Open in chrome://tracing or https://ui.perfetto.dev"""
+        pid = os.getpid()
+        calls = self.trace_events()
+        events = [{"name": name, "ph": "X", "pid": pid, "tid": thread,
+                   "ts": (start - self.origin) * 1e6, "dur": duration * 1e6}
+                  for name, start, duration, thread in calls]
+        # Name the rows after the threads
+        for thread in {call[3] for call in calls}:
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": thread,
+                           "args": {"name": self.thread_names.get(thread, str(thread))}})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def export(self, directory=PROFILE_DIR):
+        """Write CSV, JSON and Chrome trace files. Returns their paths."""
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"profile_{time.strftime('%Y%m%d_%H%M%S')}")
+        paths = [base + ".csv", base + ".json", base + ".trace.json"]
+        self.export_csv(paths[0])
+        self.export_json(paths[1])
+        self.export_chrome_trace(paths[2])
+        return paths
+
+# What gets timed in a Simulation (the draw_* methods are added by main.py)
+SIMULATION_SECTIONS = ["update", "update_difficulty", "cleanup_off_screen_objects",
+                       "check_obstacle_collisions", "check_buff_collisions", "make_obstacles"]
+
+if __name__ == "__main__":
+    import sys
+
+    from engine import Simulation, simple_policy
+
+    # Profile headless runs, one "frame" per tick
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    profiler = Profiler(samples=10000)
+    sim = Simulation()
+    profiler.instrument(sim, SIMULATION_SECTIONS)
+    profiler.enable()
+    for seed in range(runs):
+        sim.reset(seed)
+        while sim.step(simple_policy(sim)):
+            profiler.end_frame()
+    profiler.disable()
+
+    for name, s in profiler.summary()["sections"].items():
+        print(f"{name:28} {s['count']:6} calls  p50 {s['p50'] * 1000:7.1f} us  "
+              f"p99 {s['p99'] * 1000:7.1f} us  max {s['max'] * 1000:7.1f} us")
+    print("written:", ", ".join(profiler.export()))
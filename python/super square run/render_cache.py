@@ -0,0 +1,254 @@
+"""Cached drawing for the scene.
+
+Most of what the game draws looks the same from one frame to the next: the
+sky, stars and ground only change every few hundred points, and an obstacle
+of a given size always looks the same. Each of those is drawn once into a
+RenderTexture and then put on screen with a single draw call per frame,
+instead of many rectangle/line calls that each cross into C.
+
+Text works the same way: TextCache keeps each string (at each font size)
+in a texture, and a NumberText label has a texture of its own that is
+repainted in place when the number in it changes, so the HUD is a handful
+of textured quads per frame and a running score doesn't push the fixed
+strings out of the cache.
+
+A Viewport draws a whole scene scaled into part of the window (the
+spectator view tiles many games this way), with the same caches.
+"""
+from collections import OrderedDict
+
+import raylibpy as rl
+
+MARGIN = 4  # Room around a sprite for its shadow and the bird wing
+
+class Layer:
+    """A RenderTexture that is only repainted when its key changes."""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.target = None
+        self.key = None
+        # Render textures come out upside down, hence the negative height
+        self.source = rl.Rectangle(0, 0, width, -height)
+        self.position = rl.Vector2(0, 0)
+
+    def update(self, key, paint, *args):
+        if self.target is None:
+            self.target = rl.load_render_texture(self.width, self.height)
+        if key == self.key:
+            return
+
+        # Painting happens in texture space: step out of a viewport we are drawing in, if any
+        viewport = Viewport.active
+        if viewport is not None:
+            viewport.leave()
+        rl.begin_texture_mode(self.target)
+        rl.clear_background(rl.BLANK)
+        # Keep premultiplied colour in the texture, so shadows and see-through lines
+        # blend the same way as when they were drawn straight to the screen
+        rl.rl_set_blend_factors_separate(rl.RL_SRC_ALPHA, rl.RL_ONE_MINUS_SRC_ALPHA,
+                                         rl.RL_ONE, rl.RL_ONE_MINUS_SRC_ALPHA,
+                                         rl.RL_FUNC_ADD, rl.RL_FUNC_ADD)
+        rl.begin_blend_mode(rl.BLEND_CUSTOM_SEPARATE)
+        paint(*args)
+        rl.end_blend_mode()
+        rl.end_texture_mode()
+        if viewport is not None:
+            viewport.enter()
+        self.key = key
+
+    def blit(self, x, y, offset_x=0, width=None, tint=rl.WHITE):
+        # Caller must be in BLEND_ALPHA_PREMULTIPLY mode
+        self.source.x = offset_x
+        self.source.width = width or self.width
+        self.position.x = x
+        self.position.y = y
+        rl.draw_texture_rec(self.target.texture, self.source, self.position, tint)
+
+    def draw(self, x, y, offset_x=0, width=None):
+        rl.begin_blend_mode(rl.BLEND_ALPHA_PREMULTIPLY)
+        self.blit(x, y, offset_x, width)
+        rl.end_blend_mode()
+
+    def unload(self):
+        if self.target is not None:
+            rl.unload_render_texture(self.target)
+            self.target = None
+            self.key = None
+
+class Viewport:
+    """Draw a screen-sized scene into a rectangle of the window, scaled by zoom and clipped
+    to the rectangle (a Camera2D and a scissor). Layers painted in between (a sprite that
+    was not cached yet) take the viewport down and put it back around their painting."""
+
+    active = None  # The viewport being drawn in
+
+    def __init__(self, x, y, width, height, zoom):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.zoom = zoom
+        self.camera = rl.Camera2D(rl.Vector2(x, y), rl.Vector2(0, 0), 0.0, zoom)
+
+    def begin(self):
+        Viewport.active = self
+        self.enter()
+
+    def end(self):
+        self.leave()
+        Viewport.active = None
+
+    def enter(self):
+        rl.begin_scissor_mode(self.x, self.y, self.width, self.height)
+        rl.begin_mode2d(self.camera)
+
+    def leave(self):
+        rl.end_mode2d()
+        rl.end_scissor_mode()
+
+class SpriteCache:
+    """One Layer per distinct look. Draw sprites between begin() and end(), so the whole
+    group goes out in a single blend mode (and a single raylib batch)."""
+
+    def __init__(self, max_sprites=256):
+        self.max_sprites = max_sprites
+        self.sprites = OrderedDict()  # Least recently drawn first, so the first key is the one to evict
+        self.drawing = False
+
+    def begin(self):
+        rl.begin_blend_mode(rl.BLEND_ALPHA_PREMULTIPLY)
+        self.drawing = True
+
+    def end(self):
+        rl.end_blend_mode()
+        self.drawing = False
+
+    def draw(self, key, width, height, x, y, paint, *args):
+        """Draw the sprite for key with its top-left corner at (x, y).
+        paint(x, y, *args) is only called the first time, to draw it into the texture."""
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = self.render(key, width, height, paint, args)
+        else:
+            self.sprites.move_to_end(key)
+        sprite.blit(int(x) - MARGIN, int(y) - MARGIN)
+
+    def render(self, key, width, height, paint, args):
+        if len(self.sprites) >= self.max_sprites:
+            # Flush first, queued draws may still use the texture we are about to free
+            rl.rl_draw_render_batch_active()
+            self.sprites.popitem(last=False)[1].unload()
+
+        sprite = Layer(width + MARGIN * 2, height + MARGIN * 2)
+        if self.drawing:
+            rl.end_blend_mode()
+        sprite.update(key, paint, MARGIN, MARGIN, *args)
+        if self.drawing:
+            rl.begin_blend_mode(rl.BLEND_ALPHA_PREMULTIPLY)
+        self.sprites[key] = sprite
+        return sprite
+
+    def unload(self):
+        for sprite in self.sprites.values():
+            sprite.unload()
+        self.sprites.clear()
+
+def paint_text(x, y, text, size):
+    rl.draw_text(text, x, y, size, rl.WHITE)
+
+class TextCache:
+    """Strings drawn once into textures. They are drawn in white, so one texture serves
+    every colour: draw() tints it. Like sprites, draw text between begin() and end()."""
+
+    def __init__(self, max_texts=256):
+        self.sprites = SpriteCache(max_texts)
+        self.widths = {}
+        self.tints = {}
+
+    def begin(self):
+        self.sprites.begin()
+
+    def end(self):
+        self.sprites.end()
+
+    def width(self, text, size):
+        """rl.measure_text, remembered."""
+        key = (text, size)
+        width = self.widths.get(key)
+        if width is None:
+            if len(self.widths) >= self.sprites.max_sprites * 4:
+                self.widths.clear()
+            width = self.widths[key] = rl.measure_text(text, size)
+        return width
+
+    def tint(self, color):
+        # The textures hold premultiplied colour, so a see-through tint has to be premultiplied too
+        if color.a == 255:
+            return color
+        key = (color.r, color.g, color.b, color.a)
+        tint = self.tints.get(key)
+        if tint is None:
+            alpha = color.a
+            tint = self.tints[key] = rl.Color(color.r * alpha // 255, color.g * alpha // 255,
+                                              color.b * alpha // 255, alpha)
+        return tint
+
+    def draw(self, text, x, y, size, color):
+        """Same as rl.draw_text(text, x, y, size, color)."""
+        key = (text, size)
+        sprite = self.sprites.sprites.get(key)
+        if sprite is None:
+            sprite = self.sprites.render(key, self.width(text, size), size, paint_text, key)
+        else:
+            self.sprites.sprites.move_to_end(key)
+        sprite.blit(int(x) - MARGIN, int(y) - MARGIN, tint=self.tint(color))
+
+    def draw_label(self, label, x, y, size, color):
+        """Draw label.text (after label.get(value)) from the label's own texture."""
+        text = label.text
+        key = (text, size)
+        width = self.width(text, size) + MARGIN * 2
+        layer = label.layer
+        if layer is None or layer.width < width or layer.height != size + MARGIN * 2:
+            if layer is not None:
+                rl.rl_draw_render_batch_active()
+                layer.unload()
+            # Room for a few more digits, so a growing number keeps its texture
+            layer = label.layer = Layer(width + size * 2, size + MARGIN * 2)
+        if layer.key != key:
+            drawing = self.sprites.drawing
+            if drawing:
+                rl.end_blend_mode()
+            layer.update(key, paint_text, MARGIN, MARGIN, text, size)
+            if drawing:
+                rl.begin_blend_mode(rl.BLEND_ALPHA_PREMULTIPLY)
+        layer.blit(int(x) - MARGIN, int(y) - MARGIN, width=width, tint=self.tint(color))
+
+    def unload(self):
+        self.sprites.unload()
+        self.widths.clear()
+
+class NumberText:
+    """A label with a number in it ("SCORE: {}"), only formatted again when the number
+    as shown changes. digits=None shows int(value), otherwise value rounded to digits."""
+
+    def __init__(self, template, digits=None):
+        self.template = template
+        self.digits = digits
+        self.value = None
+        self.text = ""
+        self.layer = None  # Painted by TextCache.draw_label
+
+    def get(self, value):
+        value = int(value) if self.digits is None else round(value, self.digits)
+        if value != self.value:
+            self.value = value
+            self.text = self.template.format(value)
+        return self.text
+
+    def unload(self):
+        if self.layer is not None:
+            self.layer.unload()
+            self.layer = None
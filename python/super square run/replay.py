@@ -0,0 +1,168 @@
+"""Input replays: a run saved as its seed plus one action byte per tick.
+
+A replay of a 10 minute run is a few kilobytes. Playing it back rebuilds the
+whole run with the headless engine, far faster than real time, and a
+ReplayPlayer can jump to any tick using keyframe snapshots.
+"""
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+
+from engine import Simulation, RULES_VERSION
+
+MAGIC = b"SSRR"
+FORMAT_VERSION = 1
+# magic, format version, rules version, seed, tick count, final score
+HEADER = struct.Struct("<4sBBQId")
+
+REPLAY_DIR = "replays"
+
+class Replay:
+    def __init__(self, seed, actions, score=0, rules_version=RULES_VERSION):
+        self.seed = seed
+        self.actions = bytes(actions)
+        self.score = score
+        self.rules_version = rules_version
+
+    @classmethod
+    def from_simulation(cls, sim):
+        return cls(sim.seed, sim.input_log, sim.score)
+
+    def to_bytes(self):
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, self.rules_version, self.seed,
+                             len(self.actions), self.score)
+        return header + zlib.compress(self.actions, 9)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, rules_version, seed, ticks, score = HEADER.unpack_from(data)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("not a Super Square Run replay")
+        actions = zlib.decompress(data[HEADER.size:])
+        if len(actions) != ticks:
+            raise ValueError("replay is truncated")
+        return cls(seed, actions, score, rules_version)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+def run_path(directory, seed):
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"run_{time.strftime('%Y%m%d_%H%M%S')}_{seed}.ssr")
+
+def save_run(sim, directory=REPLAY_DIR):
+    """Write the finished run to the replay folder. Returns the file path."""
+    path = run_path(directory, sim.seed)
+    Replay.from_simulation(sim).save(path)
+    return path
+
+class ReplayWriter:
+    """save_run() on a background thread, so a game over never waits for the disk. The
+    inputs are copied when the run is queued; compressing and writing happen on the thread."""
+
+    def __init__(self, directory=REPLAY_DIR):
+        self.directory = directory
+        self.queue = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self.loop, name="replays", daemon=True)
+        self.thread.start()
+
+    def save(self, sim):
+        self.queue.put(Replay.from_simulation(sim))
+
+    def loop(self):
+        while True:
+            replay = self.queue.get()
+            if replay is None:
+                return
+            try:
+                replay.save(run_path(self.directory, replay.seed))
+            except OSError as error:
+                # Losing a replay is better than taking the game down with it
+                print(f"replays: could not save a run: {error}")
+
+    def close(self):
+        """Write what is still queued, then stop."""
+        self.queue.put(None)
+        self.thread.join()
+
+class ReplayPlayer:
+    """Plays a replay back headlessly. Seeking restores the nearest keyframe
+    (taken every keyframe_interval ticks) and steps forward from there.
+
+    Keyframes are taken as playback first gets to them, so making a player
+    costs nothing and playing to the end once costs one pass; after that,
+    every seek up to the furthest tick reached costs at most
+    keyframe_interval ticks."""
+
+    def __init__(self, replay, keyframe_interval=600):
+        if replay.rules_version != RULES_VERSION:
+            raise ValueError(f"replay was recorded with rules v{replay.rules_version}, "
+                             f"this engine is v{RULES_VERSION}")
+        self.replay = replay
+        self.keyframe_interval = keyframe_interval
+        self.sim = Simulation(replay.seed)
+        self.tick = 0
+        self.keyframes = {0: self.sim.snapshot()}
+        self.last_keyframe = 0
+
+    @property
+    def length(self):
+        return len(self.replay.actions)
+
+    def step(self):
+        if self.tick >= self.length:
+            return False
+        self.sim.step(self.replay.actions[self.tick])
+        self.tick += 1
+        if self.tick > self.last_keyframe and self.tick % self.keyframe_interval == 0:
+            self.keyframes[self.tick] = self.sim.snapshot()
+            self.last_keyframe = self.tick
+        return True
+
+    def seek(self, tick):
+        """Put the game in the state it had after `tick` ticks."""
+        tick = max(0, min(tick, self.length))
+        if not (self.tick <= tick < self.tick + self.keyframe_interval):
+            # Start from the closest keyframe at or before tick, as far as they are taken
+            start = min(tick - tick % self.keyframe_interval, self.last_keyframe)
+            if start > self.tick or tick < self.tick:
+                self.sim.restore(self.keyframes[start])
+                self.tick = start
+        while self.tick < tick:
+            self.step()
+        return self.sim
+
+    def play_to_end(self):
+        return self.seek(self.length)
+
+def verify(replay):
+    """Re-simulate a replay. Returns (matches, simulated score)."""
+    sim = ReplayPlayer(replay).play_to_end()
+    return sim.score == replay.score, sim.score
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("usage: python replay.py <file.ssr> [tick]")
+        sys.exit(1)
+
+    replay = Replay.load(sys.argv[1])
+    player = ReplayPlayer(replay)
+    start = time.perf_counter()
+    sim = player.seek(int(sys.argv[2])) if len(sys.argv) > 2 else player.play_to_end()
+    elapsed = time.perf_counter() - start
+
+    print(f"seed {replay.seed}, {player.length} ticks, recorded score {int(replay.score)}")
+    print(f"tick {player.tick}: score {int(sim.score)}, level {sim.difficulty_level}, "
+          f"speed {sim.game_speed:.1f}, {len(sim.obstacles)} obstacles")
+    print(f"simulated in {elapsed:.2f}s ({player.tick / max(elapsed, 1e-9) / 60:.0f}x real time)")
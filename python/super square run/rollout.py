@@ -0,0 +1,270 @@
+"""Play out many seeded runs on every CPU core, for balance tuning.
+
+The runs are split into chunks and handed to a process pool. Workers write
+one row of statistics per run straight into a shared-memory NumPy array, so
+nothing but chunk numbers travels back through pickling. Finished chunks are
+checkpointed to disk now and then, and when a chunk fails or a worker dies;
+start again with the same arguments and the runner skips what is already done.
+
+    python rollout.py --runs 20000
+    python rollout.py --runs 5000 --sweep game_speed_increment=0.0003;0.0005;0.0008 \\
+                      --sweep base_obstacle_frequency=80;100;120
+    python rollout.py --runs 5000 --curve gentle.json
+"""
+import argparse
+import importlib
+import itertools
+import json
+import os
+import queue
+import time
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+
+import engine
+from engine import Simulation
+from difficulty import DEFAULTS as CURVE_DEFAULTS, DifficultyCurve
+
+# One row per run
+FIELDS = ["config", "seed", "score", "ticks", "level", "max_speed", "death",
+          "double_jump", "giant", "invincible", "weapon", "kills"]
+COLUMN = {name: i for i, name in enumerate(FIELDS)}
+# The buff columns in engine.BUFF_TYPES order, like Simulation.buff_counts
+BUFF_COLUMNS = [COLUMN[buff.name] for buff in engine.BUFF_TYPES]
+
+# Death cause column
+DEATH_NONE = 0  # Still alive after max_ticks
+DEATH_CACTUS = 1
+DEATH_BIRD = 2
+
+# A sweep changes difficulty curve parameters, or these Simulation settings (with their
+# defaults), which size its pools and scratch lists when it is made
+SIM_PARAMS = {"max_obstacles": 12, "max_buffs": 5}
+# Sweep names for curve parameters that go by another name there
+CURVE_ALIASES = {"obstacle_frequency": "base_obstacle_frequency"}
+
+def load_policy(spec):
+    """"module:function", e.g. "engine:simple_policy". The function gets the Simulation
+    and returns an action bitmask."""
+    module, _, name = spec.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+def check_params(params):
+    for name in params:
+        if name not in SIM_PARAMS and CURVE_ALIASES.get(name, name) not in CURVE_DEFAULTS:
+            raise ValueError(f"unknown parameter {name}")
+
+def config_curve(curve, params):
+    """The curve with the difficulty parameters in params changed."""
+    changes = {CURVE_ALIASES.get(name, name): value for name, value in params.items()
+               if name not in SIM_PARAMS}
+    return curve.with_params(**changes) if changes else curve
+
+def config_sim(params, sims):
+    """A Simulation with the settings in params (the others at their defaults), shared
+    through sims by every config with the same settings."""
+    settings = {name: params.get(name, default) for name, default in SIM_PARAMS.items()}
+    key = tuple(settings.values())
+    if key not in sims:
+        sims[key] = Simulation(0, **settings)
+    return sims[key]
+
+def play(sim, policy, seed, max_ticks, row, curve):
+    """Play one run and fill in its row."""
+    sim.curve = curve
+    sim.reset(seed)
+
+    max_speed = sim.game_speed
+    for _ in range(max_ticks):
+        alive = sim.step(policy(sim))
+        if sim.game_speed > max_speed:
+            max_speed = sim.game_speed
+        if not alive:
+            break
+
+    death = DEATH_NONE
+    if sim.death_cause is not None:
+        death = DEATH_CACTUS if sim.death_cause == "cactus" else DEATH_BIRD
+
+    row[COLUMN["score"]] = sim.score
+    row[COLUMN["ticks"]] = sim.game_time
+    row[COLUMN["level"]] = sim.difficulty_level
+    row[COLUMN["max_speed"]] = max_speed
+    row[COLUMN["death"]] = death
+    row[BUFF_COLUMNS] = sim.buff_counts
+    row[COLUMN["kills"]] = sim.obstacles_shot
+
+# Worker process state, set up once by init_worker
+worker = {}
+
+def init_worker(shm_name, shape, policy_spec, configs, runs_per_config, base_seed, max_ticks, curve_path):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    curve = DifficultyCurve.load(curve_path) if curve_path else DifficultyCurve()
+    sims = {}
+    worker.update(
+        shm=shm,
+        results=np.ndarray(shape, dtype=np.float64, buffer=shm.buf),
+        policy=load_policy(policy_spec),
+        runs_per_config=runs_per_config,
+        base_seed=base_seed,
+        max_ticks=max_ticks,
+        sims=[config_sim(params, sims) for params in configs],
+        # One curve per config, so each keeps its compiled rows between runs
+        curves=[config_curve(curve, params) for params in configs],
+    )
+
+def run_chunk(chunk):
+    start, end = chunk
+    results = worker["results"]
+    for i in range(start, end):
+        config, run = divmod(i, worker["runs_per_config"])
+        seed = worker["base_seed"] + run
+        row = results[i]
+        row[COLUMN["config"]] = config
+        row[COLUMN["seed"]] = seed
+        play(worker["sims"][config], worker["policy"], seed, worker["max_ticks"], row,
+             worker["curves"][config])
+    return chunk
+
+def save_checkpoint(path, results, done, meta):
+    # Write to a temporary file first, so a crash mid-write leaves the old checkpoint intact
+    temp = path + ".tmp.npz"
+    np.savez(temp, results=results, done=done, meta=json.dumps(meta))
+    os.replace(temp, path)
+
+def load_checkpoint(path, meta):
+    if not os.path.exists(path):
+        return None
+    data = np.load(path)
+    if json.loads(str(data["meta"])) != meta:
+        raise ValueError(f"{path} was made with different settings, delete it to start over")
+    return data["results"], data["done"]
+
+def rollout(configs, runs_per_config, policy_spec="engine:simple_policy", base_seed=0,
+            max_ticks=20000, workers=None, chunk_size=50, checkpoint=None, checkpoint_every=10.0,
+            curve_path=None, chunk_timeout=600.0):
+    """Play runs_per_config seeds for every parameter dict in configs. Returns the results
+    array, one row per run (columns in FIELDS), config-major. Difficulty parameters in a
+    config change the curve from curve_path (or the default curve).
+
+    If a chunk fails, or none finishes for chunk_timeout seconds (a worker died), the
+    checkpoint is written and the error raised."""
+    for params in configs:
+        check_params(params)
+    total = len(configs) * runs_per_config
+    chunks = [(start, min(start + chunk_size, total)) for start in range(0, total, chunk_size)]
+    meta = {"configs": configs, "runs": runs_per_config, "policy": policy_spec,
+            "seed": base_seed, "max_ticks": max_ticks, "chunk_size": chunk_size, "curve": curve_path}
+
+    shape = (total, len(FIELDS))
+    shm = shared_memory.SharedMemory(create=True, size=max(1, total * len(FIELDS) * 8))
+    try:
+        results = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        results[:] = 0
+        done = np.zeros(len(chunks), dtype=bool)
+
+        saved = load_checkpoint(checkpoint, meta) if checkpoint else None
+        if saved is not None:
+            results[:], done[:] = saved
+            print(f"resuming: {done.sum()} of {len(chunks)} chunks already done")
+
+        todo = [chunk for chunk, finished in zip(chunks, done) if not finished]
+        chunk_number = {chunk: i for i, chunk in enumerate(chunks)}
+        start_time = last_save = time.perf_counter()
+        runs_done = 0
+
+        # Finished chunks, or the exception a chunk raised, in the order they come in. A worker
+        # that dies outright (killed, out of memory) takes its chunk with it and nothing comes,
+        # so waiting longer than chunk_timeout for the next one counts as a failure too
+        finished = queue.Queue()
+        with Pool(workers, init_worker, (shm.name, shape, policy_spec, configs,
+                                         runs_per_config, base_seed, max_ticks, curve_path)) as pool:
+            for chunk in todo:
+                pool.apply_async(run_chunk, (chunk,), callback=finished.put, error_callback=finished.put)
+            try:
+                for count in range(1, len(todo) + 1):
+                    try:
+                        chunk = finished.get(timeout=chunk_timeout)
+                    except queue.Empty:
+                        raise RuntimeError(f"no chunk finished in {chunk_timeout:.0f}s, "
+                                           f"a worker probably died") from None
+                    if isinstance(chunk, BaseException):
+                        raise chunk
+                    done[chunk_number[chunk]] = True
+                    runs_done += chunk[1] - chunk[0]
+                    now = time.perf_counter()
+                    if checkpoint and now - last_save >= checkpoint_every:
+                        save_checkpoint(checkpoint, results, done, meta)
+                        last_save = now
+                    if count % max(1, len(todo) // 20) == 0 or count == len(todo):
+                        print(f"{count}/{len(todo)} chunks, {runs_done / (now - start_time):.0f} runs/s")
+            except BaseException:
+                # Keep what the other chunks finished, so the next start picks up from there
+                if checkpoint:
+                    save_checkpoint(checkpoint, results, done, meta)
+                raise
+
+        if checkpoint:
+            save_checkpoint(checkpoint, results, done, meta)
+        return results.copy()
+    finally:
+        shm.close()
+        shm.unlink()
+
+def parse_sweep(specs):
+    """["name=v1;v2", ...] -> list of parameter dicts, one per combination. Values are JSON."""
+    axes = []
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        axes.append([(name, json.loads(value)) for value in values.split(";")])
+    return [dict(combination) for combination in itertools.product(*axes)]
+
+def summary(results, configs):
+    for i, params in enumerate(configs):
+        rows = results[results[:, COLUMN["config"]] == i]
+        if not len(rows):
+            continue
+        score = rows[:, COLUMN["score"]]
+        death = rows[:, COLUMN["death"]]
+        buffs = rows[:, BUFF_COLUMNS].mean(axis=0)
+        print(params or "defaults")
+        print(f"  {len(rows)} runs  score mean {score.mean():.0f}  median {np.median(score):.0f}  "
+              f"p90 {np.percentile(score, 90):.0f}  level {rows[:, COLUMN['level']].mean():.1f}  "
+              f"ticks {rows[:, COLUMN['ticks']].mean():.0f}")
+        print(f"  deaths: cactus {np.mean(death == DEATH_CACTUS):.0%}  bird {np.mean(death == DEATH_BIRD):.0%}  "
+              f"survived {np.mean(death == DEATH_NONE):.0%}  kills {rows[:, COLUMN['kills']].mean():.1f}")
+        print("  buffs per run: " + "  ".join(f"{buff.name} {count:.2f}"
+                                              for buff, count in zip(engine.BUFF_TYPES, buffs)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Play many seeded runs in parallel")
+    parser.add_argument("--runs", type=int, default=1000, help="seeds per parameter combination")
+    parser.add_argument("--seed", type=int, default=0, help="first seed")
+    parser.add_argument("--policy", default="engine:simple_policy", help="module:function")
+    parser.add_argument("--max-ticks", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=None, help="default: one per CPU")
+    parser.add_argument("--chunk", type=int, default=50, help="runs per work item")
+    parser.add_argument("--sweep", action="append", default=[],
+                        help="name=value;value;... (JSON values), may be repeated")
+    parser.add_argument("--checkpoint", default="rollout_checkpoint.npz")
+    parser.add_argument("--out", default="rollout_results.npz")
+    parser.add_argument("--curve", help="difficulty curve JSON (default: the built-in curve)")
+    parser.add_argument("--timeout", type=float, default=600.0,
+                        help="give up (after checkpointing) when no chunk finishes for this many seconds")
+    args = parser.parse_args()
+
+    configs = parse_sweep(args.sweep) if args.sweep else [{}]
+    start = time.perf_counter()
+    results = rollout(configs, args.runs, args.policy, args.seed, args.max_ticks,
+                      args.workers, args.chunk, args.checkpoint, curve_path=args.curve,
+                      chunk_timeout=args.timeout)
+    elapsed = time.perf_counter() - start
+    np.savez(args.out, results=results, fields=FIELDS, configs=json.dumps(configs))
+    if args.checkpoint and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    print(f"{len(results)} runs in {elapsed:.1f}s, written to {args.out}")
+    summary(results, configs)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""Score store: every finished run in an SQLite database, with top-N and percentile queries.
+
+A run record has the score, level reached, duration, buffs picked up, what
+ended it, the seed (enough to find the replay) and the difficulty curve it
+was played on. Records are written by one background thread, so a game
+over never waits for the disk; each insert is its own transaction, so a
+crash loses at most the runs still in the queue, never half a row. The
+database is in WAL mode: `python scores.py` can read it while the game is
+writing.
+
+    python scores.py                # best runs, score percentiles, what ends runs
+    python scores.py --top 20 --seed 42
+    python scores.py --curve gentle
+"""
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from difficulty import DEFAULT_CURVE
+from engine import RULES_VERSION, TICK_RATE
+
+DEFAULT_PATH = "super_square_run_scores.db"
+# Where the high score was kept before there was a score store
+LEGACY_HIGH_SCORE_PATH = "super_square_run_highscore.txt"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    finished REAL NOT NULL,
+    score REAL NOT NULL,
+    level INTEGER NOT NULL,
+    ticks INTEGER NOT NULL,
+    buffs INTEGER NOT NULL,
+    death_cause TEXT,
+    seed INTEGER,
+    rules_version INTEGER NOT NULL,
+    autopilot INTEGER NOT NULL DEFAULT 0,
+    curve TEXT NOT NULL DEFAULT 'default'
+);
+CREATE INDEX IF NOT EXISTS runs_by_score ON runs (score);
+CREATE INDEX IF NOT EXISTS runs_by_seed ON runs (seed, score);
+"""
+CURVE_INDEX = "CREATE INDEX IF NOT EXISTS runs_by_curve ON runs (curve, score)"
+
+COLUMNS = ("finished", "score", "level", "ticks", "buffs", "death_cause", "seed",
+           "rules_version", "autopilot", "curve")
+INSERT = f"INSERT INTO runs ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+def connect(path):
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(SCHEMA)
+    # Stores from before runs had a curve: every run in them was on the default one
+    if "curve" not in [column[1] for column in connection.execute("PRAGMA table_info(runs)")]:
+        with connection:
+            connection.execute("ALTER TABLE runs ADD COLUMN curve TEXT NOT NULL DEFAULT 'default'")
+    connection.execute(CURVE_INDEX)
+    return connection
+
+def curve_key(curve):
+    """What goes in the curve column for a run on this curve. Only the built-in curve
+    itself is "default": a changed copy or a file that calls itself "default" is
+    "custom", so its runs never count towards the default curve's results."""
+    if curve is DEFAULT_CURVE:
+        return DEFAULT_CURVE.name
+    if curve.name == DEFAULT_CURVE.name:
+        return "custom"
+    return curve.name
+
+def where(seed=None, curve=None):
+    """A WHERE clause (or nothing) and its arguments, for the queries that can be narrowed
+    to one seed or one curve."""
+    conditions = []
+    args = ()
+    if seed is not None:
+        conditions.append("seed = ?")
+        args += (seed,)
+    if curve is not None:
+        conditions.append("curve = ?")
+        args += (curve,)
+    if not conditions:
+        return "", args
+    return " WHERE " + " AND ".join(conditions), args
+
+class RunRecord:
+    def __init__(self, score, level, ticks, buffs=0, death_cause=None, seed=None,
+                 autopilot=False, finished=None, rules_version=RULES_VERSION, curve="default"):
+        self.finished = finished if finished is not None else time.time()
+        self.score = score
+        self.level = level
+        self.ticks = ticks
+        self.buffs = buffs
+        self.death_cause = death_cause
+        self.seed = seed
+        self.rules_version = rules_version
+        self.autopilot = autopilot
+        self.curve = curve
+
+    @classmethod
+    def from_simulation(cls, sim, autopilot=False):
+        return cls(sim.score, sim.difficulty_level, sim.game_time, sim.buffs_collected,
+                   sim.death_cause, sim.seed, autopilot, curve=curve_key(sim.curve))
+
+    @classmethod
+    def from_row(cls, row):
+        finished, score, level, ticks, buffs, death_cause, seed, rules_version, autopilot, curve = row
+        return cls(score, level, ticks, buffs, death_cause, seed, bool(autopilot), finished,
+                   rules_version, curve)
+
+    def row(self):
+        return (self.finished, self.score, self.level, self.ticks, self.buffs, self.death_cause,
+                self.seed, self.rules_version, int(self.autopilot), self.curve)
+
+    @property
+    def seconds(self):
+        return self.ticks / TICK_RATE
+
+class ScoreStore:
+    """Reads run on the calling thread (a few indexed queries, for menus and tools);
+    add() only queues the record for the writer thread."""
+
+    def __init__(self, path=DEFAULT_PATH, background=True):
+        self.path = path
+        self.connection = connect(path)
+        self.best = self.best_score()
+
+        self.queue = queue.Queue()
+        self.writer = None
+        if background:
+            self.writer = threading.Thread(target=self.write_loop, name="scores", daemon=True)
+            self.writer.start()
+
+    def add(self, record):
+        self.best = max(self.best, record.score)
+        if self.writer is None:
+            self.write(self.connection, record)
+        else:
+            self.queue.put(record)
+
+    def write(self, connection, record):
+        with connection:
+            connection.execute(INSERT, record.row())
+
+    def write_loop(self):
+        connection = connect(self.path)
+        while True:
+            record = self.queue.get()
+            try:
+                if record is None:
+                    break
+                self.write(connection, record)
+            except Exception as error:
+                # Losing a record is better than taking the game down with it, or the writer:
+                # without it nothing else gets saved and flush() never returns
+                print(f"score store: could not save a run: {error!r}")
+            finally:
+                self.queue.task_done()
+        connection.close()
+
+    def flush(self):
+        """Wait until every queued record is in the database."""
+        if self.writer is not None:
+            self.queue.join()
+
+    def close(self):
+        if self.writer is not None:
+            self.queue.put(None)
+            self.writer.join()
+            self.writer = None
+        self.connection.close()
+
+    def count(self, curve=None):
+        clause, args = where(curve=curve)
+        return self.connection.execute("SELECT COUNT(*) FROM runs" + clause, args).fetchone()[0]
+
+    def best_score(self, curve=None):
+        """The best score on record (on one curve, if given), 0 with no runs."""
+        clause, args = where(curve=curve)
+        return self.connection.execute("SELECT COALESCE(MAX(score), 0) FROM runs" + clause,
+                                       args).fetchone()[0]
+
+    def top(self, n=10, seed=None, curve=None):
+        """The n best runs, best first (of one seed and one curve, if given)."""
+        clause, args = where(seed, curve)
+        query = f"SELECT {', '.join(COLUMNS)} FROM runs{clause} ORDER BY score DESC LIMIT ?"
+        return [RunRecord.from_row(row) for row in self.connection.execute(query, args + (n,))]
+
+    def percentiles(self, percents=(50, 90, 99), curve=None):
+        """{percent: score} by nearest rank. Each one is an offset into the score index."""
+        count = self.count(curve)
+        clause, args = where(curve=curve)
+        result = {}
+        for percent in percents:
+            if not count:
+                result[percent] = 0
+                continue
+            offset = max(min(int(percent / 100 * count + 0.5) - 1, count - 1), 0)
+            result[percent] = self.connection.execute(
+                f"SELECT score FROM runs{clause} ORDER BY score LIMIT 1 OFFSET ?",
+                args + (offset,)).fetchone()[0]
+        return result
+
+    def rank(self, score, curve=None):
+        """1 for a new best, 2 if one run was better, ..."""
+        clause, args = where(curve=curve)
+        clause = clause + " AND score > ?" if clause else " WHERE score > ?"
+        return self.connection.execute("SELECT COUNT(*) FROM runs" + clause,
+                                       args + (score,)).fetchone()[0] + 1
+
+    def death_causes(self, curve=None):
+        """{cause: runs}, most common first."""
+        clause, args = where(curve=curve)
+        rows = self.connection.execute("SELECT COALESCE(death_cause, 'none'), COUNT(*) FROM runs"
+                                       f"{clause} GROUP BY death_cause ORDER BY COUNT(*) DESC", args)
+        return dict(rows)
+
+    def summary(self, curve=None):
+        clause, args = where(curve=curve)
+        runs, mean_score, mean_ticks, buffs = self.connection.execute(
+            "SELECT COUNT(*), AVG(score), AVG(ticks), SUM(buffs) FROM runs" + clause, args).fetchone()
+        best = self.best if curve is None else self.best_score(curve)
+        return {"runs": runs, "best": best, "mean_score": mean_score or 0,
+                "mean_seconds": (mean_ticks or 0) / TICK_RATE, "buffs": buffs or 0,
+                "percentiles": self.percentiles(curve=curve), "death_causes": self.death_causes(curve)}
+
+def legacy_high_score(path=LEGACY_HIGH_SCORE_PATH):
+    """The high score from the old text file, 0 if there is none."""
+    if not os.path.exists(path):
+        return 0
+    try:
+        with open(path) as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return 0
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run history and statistics")
+    parser.add_argument("--db", default=DEFAULT_PATH)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--seed", type=int, help="only runs of this seed")
+    parser.add_argument("--curve", help="only runs on this difficulty curve (by name)")
+    args = parser.parse_args()
+
+    store = ScoreStore(args.db, background=False)
+    summary = store.summary(args.curve)
+    print(f"{summary['runs']} runs, best {int(summary['best'])}, mean {summary['mean_score']:.0f} "
+          f"({summary['mean_seconds']:.0f} s), {summary['buffs']} buffs picked up")
+    print("percentiles: " + "  ".join(f"p{percent} {int(score)}"
+                                      for percent, score in summary["percentiles"].items()))
+    print("ended by: " + "  ".join(f"{cause} {runs}" for cause, runs in summary["death_causes"].items()))
+    print()
+    print(f"{'score':>7} {'level':>5} {'time':>6} {'buffs':>5} {'ended by':>9} {'seed':>11}  when")
+    for record in store.top(args.top, args.seed, args.curve):
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(record.finished))
+        bot = "  (autopilot)" if record.autopilot else ""
+        if record.curve != "default":
+            bot += f"  ({record.curve} curve)"
+        print(f"{int(record.score):7} {record.level:5} {record.seconds:5.0f}s {record.buffs:5} "
+              f"{record.death_cause or '-':>9} {record.seed if record.seed is not None else '-':>11}  {when}{bot}")
+    store.close()
@@ -0,0 +1,151 @@
+"""Run the simulation on its own thread, so a slow frame can't slow the game down.
+
+The SimulationThread ticks a headless Simulation at TICK_RATE on wall-clock
+time and publishes a snapshot after every tick. The two newest are kept as
+one (previous, latest) tuple that is swapped in whole, so a reader always
+gets a matching pair. The render thread restores the latest into its Game,
+moves things back towards the previous one by how far it is between the
+two ticks (Simulation.interpolate) and draws that, at any refresh rate.
+
+Input is stamped with the time it was read and queued. Tick n runs at
+start + (n + 1) / TICK_RATE and takes the input stamped before then; input
+that turns up after its tick already ran goes into the next one.
+"""
+import queue
+import threading
+import time
+
+from engine import Simulation, TICK_TIME
+from planner import Planner
+
+MAX_BEHIND = 0.25  # After a stall longer than this, skip ahead instead of catching up
+
+class Frame:
+    __slots__ = ("time", "state")
+
+    def __init__(self, time, state):
+        self.time = time  # When the tick was due
+        self.state = state  # Simulation.snapshot()
+
+class TickedSimulation(Simulation):
+    # This is the simulation that ticks: its spawn chunks are made ahead on a background
+    # thread, so a tick never stops to build one
+    background_spawns = True
+
+class SimulationThread:
+    def __init__(self, curve=None):
+        self.sim = TickedSimulation(curve=curve)  # Only touched by the tick thread while a run is going
+        self.planner = Planner()
+        self.autopilot = False
+        self.inputs = queue.SimpleQueue()  # (time, pressed actions, held actions)
+        self.pending = None  # Input read off the queue that belongs to a later tick
+        self.held = 0
+        self.frames = None  # (previous, latest), replaced as a whole
+        self.next_tick = 0.0
+        self.ticks_skipped = 0
+
+        self.active = False  # A run is going (the tick loop runs)
+        self.closing = False
+        self.wake = threading.Condition()
+        self.thread = threading.Thread(target=self.loop, name="simulation", daemon=True)
+        self.thread.start()
+
+    def start(self, seed, high_score=0, autopilot=False):
+        """Start a new run. Ticks begin one tick from now."""
+        with self.wake:
+            self.sim.reset(seed)
+            self.sim.high_score = high_score
+            self.autopilot = autopilot
+            self.planner.reset()
+            while True:
+                try:
+                    self.inputs.get_nowait()
+                except queue.Empty:
+                    break
+            self.pending = None
+            self.held = 0
+            now = time.perf_counter()
+            first = Frame(now, self.sim.snapshot())
+            self.frames = (first, first)
+            self.next_tick = now + TICK_TIME
+            self.active = True
+            self.wake.notify()
+
+    def stop(self):
+        """Stop ticking (the run is over or was left). Waits for a tick in progress."""
+        with self.wake:
+            self.active = False
+
+    def close(self):
+        with self.wake:
+            self.active = False
+            self.closing = True
+            self.wake.notify()
+        self.thread.join()
+
+    def set_autopilot(self, on):
+        with self.wake:
+            self.autopilot = on
+            self.planner.reset()
+
+    def send(self, stamp, pressed, held):
+        """Input read at time stamp: pressed actions (jump, shoot) and held ones (duck)."""
+        self.inputs.put((stamp, pressed, held))
+
+    def take_input(self, deadline):
+        pressed = 0
+        while True:
+            if self.pending is None:
+                try:
+                    self.pending = self.inputs.get_nowait()
+                except queue.Empty:
+                    break
+            stamp, press, held = self.pending
+            if stamp >= deadline:
+                break
+            pressed |= press
+            self.held = held
+            self.pending = None
+        return pressed | self.held
+
+    def loop(self):
+        clock = time.perf_counter
+        while True:
+            with self.wake:
+                while not self.active and not self.closing:
+                    self.wake.wait()
+                if self.closing:
+                    return
+                now = clock()
+                if now >= self.next_tick:
+                    if now - self.next_tick > MAX_BEHIND:
+                        # Stalled (debugger, suspended laptop): drop the backlog
+                        skipped = int((now - self.next_tick) / TICK_TIME)
+                        self.ticks_skipped += skipped
+                        self.next_tick += skipped * TICK_TIME
+                    self.tick()
+                    continue
+                wait = self.next_tick - now
+            # Sleep outside the lock, so start() and stop() don't wait for it
+            time.sleep(wait)
+
+    def tick(self):
+        sim = self.sim
+        deadline = self.next_tick
+        action = self.take_input(deadline)
+        if self.autopilot:
+            action = self.planner.choose(sim)
+        alive = sim.step(action)
+        self.frames = (self.frames[1], Frame(deadline, sim.snapshot()))
+        self.next_tick = deadline + TICK_TIME
+        if not alive:
+            self.active = False
+
+    def show(self, game, now):
+        """Load the game (the drawable one on the render thread) with the run as it is
+        at time now. Drawing runs one tick behind, so there are two ticks to go between."""
+        previous, latest = self.frames
+        game.restore(latest.state)
+        if latest.time > previous.time:
+            alpha = (now - TICK_TIME - previous.time) / (latest.time - previous.time)
+            game.interpolate(previous.state, min(max(alpha, 0.0), 1.0))
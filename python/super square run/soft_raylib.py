@@ -0,0 +1,332 @@
+"""A raylibpy stand-in that draws into a NumPy array: game frames without a GPU or a display.
+
+main.py only draws through the raylib API (`rl.draw_*`, render textures,
+blend modes), so the backend is whichever module is imported as raylibpy:
+the real one, stub_raylib (draws nothing, for timing) or this one. install()
+puts it in sys.modules before main.py is imported; after that Game.draw()
+fills frame(), a uint8 (height, width, 3) view of the screen, at full size
+or scaled down (scale=0.25 gives 200x125 for the 800x500 screen).
+
+Rectangles, rounded rectangles and their outlines, lines and vertical
+gradients are filled straight into the array with slice assignments, and
+render textures are arrays of their own (premultiplied RGBA, like the ones
+render_cache.py paints), so the cached background and sprites cost one
+array blend each. Shapes have hard edges like raylib's (it does not
+antialias them either), so frames match the real thing to within a pixel
+along the edges. There is no font data here: text is not drawn, and
+measure_text() gives the default font's width closely enough for layouts.
+
+    import soft_raylib
+    soft_raylib.install(scale=0.5)
+    from main import Game
+    game = Game(persistent=False)
+    game.reset(1)
+    game.draw()
+    pixels = soft_raylib.frame()
+"""
+import sys
+import time
+
+import numpy as np
+
+from engine import SCREEN_WIDTH, SCREEN_HEIGHT
+
+class Color:
+    __slots__ = ("r", "g", "b", "a")
+
+    def __init__(self, r=0, g=0, b=0, a=255):
+        self.r = r
+        self.g = g
+        self.b = b
+        self.a = a
+
+class Rectangle:
+    __slots__ = ("x", "y", "width", "height")
+
+    def __init__(self, x=0, y=0, width=0, height=0):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+class Vector2:
+    __slots__ = ("x", "y")
+
+    def __init__(self, x=0, y=0):
+        self.x = x
+        self.y = y
+
+WHITE = Color(255, 255, 255, 255)
+BLACK = Color(0, 0, 0, 255)
+BLANK = Color(0, 0, 0, 0)
+
+class Texture:
+    """Premultiplied RGBA pixels at the current scale."""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.pixels = np.zeros((max(round(height * scale), 1), max(round(width * scale), 1), 4), np.uint8)
+        self.drawn = False  # Nothing to blend while it is all clear (text, here)
+        self.blend_cache = None  # (pixels, 255 - alpha, opaque), made on the first blit after a change
+
+class RenderTexture:
+    def __init__(self, width, height):
+        self.texture = Texture(width, height)
+
+scale = 1.0
+screen = None
+target = None  # The Texture being drawn into: the screen or a render texture
+clock_start = time.perf_counter()
+
+def install(width=SCREEN_WIDTH, height=SCREEN_HEIGHT, scale=1.0):
+    """Become raylibpy, with a width x height screen drawn at the given scale."""
+    module = sys.modules[__name__]
+    module.scale = scale
+    module.screen = Texture(width, height)
+    module.target = module.screen
+    sys.modules["raylibpy"] = module
+
+def frame():
+    """The screen as a (height, width, 3) uint8 view. The next frame draws over it."""
+    return screen.pixels[:, :, :3]
+
+def span(start, length, limit):
+    """Pixel range [first, last) of start..start+length at the current scale, clipped."""
+    first = round(start * scale)
+    last = round((start + length) * scale)
+    return max(first, 0), min(last, limit)
+
+def blend(region, color, mask=None):
+    """Draw color over region (or the pixels of it where mask is set)."""
+    target.drawn = True
+    alpha = color.a
+    if alpha == 255:
+        if mask is None:
+            region[:] = (color.r, color.g, color.b, 255)
+        else:
+            region[mask] = (color.r, color.g, color.b, 255)
+        return
+    if alpha == 0:
+        return
+    pixels = region if mask is None else region[mask]
+    keep = 255 - alpha
+    source = np.array((color.r * alpha, color.g * alpha, color.b * alpha, alpha * 255), np.uint16)
+    # Widen first: uint8 * a scalar stays uint8 (and wraps) with NumPy 1.x casting
+    mixed = (pixels.astype(np.uint16) * keep + source + 127) // 255
+    if mask is None:
+        region[:] = mixed
+    else:
+        region[mask] = mixed
+
+# Rectangles
+
+def draw_rectangle(x, y, width, height, color):
+    pixels = target.pixels
+    y0, y1 = span(y, height, pixels.shape[0])
+    x0, x1 = span(x, width, pixels.shape[1])
+    if y1 > y0 and x1 > x0:
+        blend(pixels[y0:y1, x0:x1], color)
+
+def draw_rectangle_rec(rect, color):
+    draw_rectangle(rect.x, rect.y, rect.width, rect.height, color)
+
+def draw_rectangle_lines(x, y, width, height, color):
+    draw_rectangle(x, y, width, 1 / scale, color)
+    draw_rectangle(x, y + height - 1 / scale, width, 1 / scale, color)
+    draw_rectangle(x, y + 1 / scale, 1 / scale, height - 2 / scale, color)
+    draw_rectangle(x + width - 1 / scale, y + 1 / scale, 1 / scale, height - 2 / scale, color)
+
+def draw_rectangle_gradient_v(x, y, width, height, top, bottom):
+    pixels = target.pixels
+    y0, y1 = span(y, height, pixels.shape[0])
+    x0, x1 = span(x, width, pixels.shape[1])
+    if y1 <= y0 or x1 <= x0:
+        return
+    # Colour at the middle of each row, like the interpolated quad raylib draws
+    first = round(y * scale)
+    rows = round((y + height) * scale) - first
+    t = ((np.arange(y0, y1) - first + 0.5) / max(rows, 1))[:, None]
+    top_color = np.array((top.r, top.g, top.b, top.a), np.float32)
+    bottom_color = np.array((bottom.r, bottom.g, bottom.b, bottom.a), np.float32)
+    colors = top_color + (bottom_color - top_color) * t
+    target.drawn = True
+    region = pixels[y0:y1, x0:x1]
+    if top.a == 255 and bottom.a == 255:
+        region[:] = (colors + 0.5).astype(np.uint8)[:, None, :]
+    else:
+        alpha = colors[:, None, 3:] / 255
+        mixed = colors[:, None, :3] * alpha + region[:, :, :3] * (1 - alpha)
+        region[:, :, :3] = (mixed + 0.5).astype(np.uint8)
+        region[:, :, 3:] = (colors[:, None, 3:] + region[:, :, 3:] * (1 - alpha) + 0.5).astype(np.uint8)
+
+# Rounded rectangles: a mask per (width, height, radius) in pixels, made once
+
+masks = {}
+outlines = {}
+
+def rounded_mask(width, height, radius):
+    key = (width, height, radius)
+    mask = masks.get(key)
+    if mask is None:
+        ys = np.arange(height)[:, None] + 0.5
+        xs = np.arange(width)[None, :] + 0.5
+        # Distance from the nearest corner centre, for the pixels in a corner square
+        cx = np.clip(xs, radius, width - radius)
+        cy = np.clip(ys, radius, height - radius)
+        mask = masks[key] = (xs - cx) ** 2 + (ys - cy) ** 2 <= radius * radius
+    return mask
+
+def outline_mask(width, height, radius):
+    key = (width, height, radius)
+    outline = outlines.get(key)
+    if outline is None:
+        mask = rounded_mask(width, height, radius)
+        inside = np.zeros_like(mask)
+        inside[1:-1, 1:-1] = mask[1:-1, 1:-1] & mask[:-2, 1:-1] & mask[2:, 1:-1] & mask[1:-1, :-2] & mask[1:-1, 2:]
+        outline = outlines[key] = mask & ~inside
+    return outline
+
+def rounded_region(rect, roundness, make_mask):
+    pixels = target.pixels
+    first_x = round(rect.x * scale)
+    first_y = round(rect.y * scale)
+    width = round((rect.x + rect.width) * scale) - first_x
+    height = round((rect.y + rect.height) * scale) - first_y
+    if width <= 0 or height <= 0:
+        return None, None
+    radius = roundness * min(width, height) / 2
+    mask = make_mask(width, height, radius)
+    y0, y1 = max(first_y, 0), min(first_y + height, pixels.shape[0])
+    x0, x1 = max(first_x, 0), min(first_x + width, pixels.shape[1])
+    if y1 <= y0 or x1 <= x0:
+        return None, None
+    mask = mask[y0 - first_y:y1 - first_y, x0 - first_x:x1 - first_x]
+    return pixels[y0:y1, x0:x1], mask
+
+def draw_rectangle_rounded(rect, roundness, segments, color):
+    region, mask = rounded_region(rect, roundness, rounded_mask)
+    if region is not None:
+        blend(region, color, mask)
+
+def draw_rectangle_rounded_lines(rect, roundness, segments, color):
+    region, mask = rounded_region(rect, roundness, outline_mask)
+    if region is not None:
+        blend(region, color, mask)
+
+def draw_line(start_x, start_y, end_x, end_y, color):
+    pixels = target.pixels
+    if start_y == end_y:
+        draw_rectangle(min(start_x, end_x), start_y, abs(end_x - start_x), 1 / scale, color)
+    elif start_x == end_x:
+        draw_rectangle(start_x, min(start_y, end_y), 1 / scale, abs(end_y - start_y), color)
+    else:
+        steps = int(max(abs(end_x - start_x), abs(end_y - start_y)) * scale) + 1
+        xs = np.round(np.linspace(start_x, end_x, steps) * scale).astype(np.intp)
+        ys = np.round(np.linspace(start_y, end_y, steps) * scale).astype(np.intp)
+        keep = (xs >= 0) & (xs < pixels.shape[1]) & (ys >= 0) & (ys < pixels.shape[0])
+        mask = np.zeros(pixels.shape[:2], bool)
+        mask[ys[keep], xs[keep]] = True
+        blend(pixels, color, mask)
+
+def clear_background(color):
+    target.pixels[:] = (color.r, color.g, color.b, color.a)
+    target.drawn = color.a != 0
+
+# Text: measured, not drawn (see the module docstring)
+
+def measure_text(text, size):
+    # The default font is about 5 px per glyph plus 1 px spacing at size 10
+    return int(len(text) * size * 0.6)
+
+def draw_text(text, x, y, size, color):
+    pass
+
+# Render textures
+
+def load_render_texture(width, height):
+    return RenderTexture(width, height)
+
+def unload_render_texture(render_texture):
+    render_texture.texture.pixels = None
+
+def begin_texture_mode(render_texture):
+    global target
+    target = render_texture.texture
+    target.blend_cache = None
+
+def end_texture_mode():
+    global target
+    target = screen
+
+def draw_texture_rec(texture, source, position, tint):
+    """Blend part of a (premultiplied) texture onto the target, as BLEND_ALPHA_PREMULTIPLY does."""
+    if not texture.drawn:
+        return
+    pixels = target.pixels
+    texels = texture.pixels
+    sx0, sx1 = span(source.x, abs(source.width), texels.shape[1])
+    width = sx1 - sx0
+    height = min(round(abs(source.height) * scale), texels.shape[0])
+    dx0 = round(position.x * scale)
+    dy0 = round(position.y * scale)
+    # Clip against the target
+    x0, y0 = max(dx0, 0), max(dy0, 0)
+    x1, y1 = min(dx0 + width, pixels.shape[1]), min(dy0 + height, pixels.shape[0])
+    if x1 <= x0 or y1 <= y0:
+        return
+
+    if texture.blend_cache is None:
+        texture.blend_cache = (texels.astype(np.uint16),
+                               (255 - texels[:, :, 3:]).astype(np.uint16),
+                               bool(texels[:, :, 3].min() == 255))
+    source_pixels, keep, opaque = texture.blend_cache
+    # GPU render textures are stored upside down, hence the negative height in the source
+    # rect; these are stored the right way up, so a positive height is the one that flips
+    rows = slice(y0 - dy0, y1 - dy0)
+    columns = slice(sx0 + x0 - dx0, sx0 + x1 - dx0)
+    source_pixels = source_pixels[rows, columns]
+    keep = keep[rows, columns]
+    if source.height > 0:
+        source_pixels = source_pixels[::-1]
+        keep = keep[::-1]
+    region = pixels[y0:y1, x0:x1]
+    target.drawn = True
+    if tint.r == tint.g == tint.b == tint.a == 255:
+        if opaque:
+            region[:] = source_pixels
+        else:
+            region[:] = source_pixels + (region * keep + 127) // 255
+    else:
+        tint_values = np.array((tint.r, tint.g, tint.b, tint.a), np.uint16)
+        tinted = (source_pixels * tint_values + 127) // 255
+        region[:] = tinted + (region * (255 - tinted[:, :, 3:]) + 127) // 255
+
+# Everything else (window, input, blend modes) does nothing
+
+def get_time():
+    return time.perf_counter() - clock_start
+
+def get_frame_time():
+    return 1 / 60
+
+def get_mouse_position():
+    return Vector2(-1, -1)
+
+def check_collision_point_rec(point, rect):
+    return rect.x <= point.x < rect.x + rect.width and rect.y <= point.y < rect.y + rect.height
+
+def init_window(width, height, title):
+    install(width, height, scale)
+
+def window_should_close():
+    return False
+
+def no_op(*args):
+    return 0
+
+def __getattr__(name):
+    # Constants (KEY_*, BLEND_*...) are just 0, anything else does nothing
+    value = 0 if name.isupper() else no_op
+    globals()[name] = value
+    return value
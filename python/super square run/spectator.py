@@ -0,0 +1,366 @@
+"""Spectator view: many live runs tiled in one window, for events and bot tournaments.
+
+The bots play on worker processes (the planner is too slow to run 16 of
+them next to the drawing), each ticking its share of the runs at TICK_RATE
+and sending a snapshot of every run after every tick. The window keeps the
+two newest snapshots of each run and draws it like sim_thread.py does:
+restored into a Game and interpolated to the current time. With --player
+the first tile is played from the keyboard, on a SimulationThread.
+
+Each tile is a Viewport (render_cache.py): the game's own draw code, scaled
+into its part of the window. The tiles share the sprite and text caches and
+one set of sky/ground layers (a tile's look is rounded to LOOK_STEP points,
+so a dozen textures serve every tile), and small tiles get less detail: no
+HUD below DETAIL_REDUCED_ZOOM, no clouds or buff indicators below
+DETAIL_LOW_ZOOM. The name and score of each tile are drawn on top at window
+size, so they stay readable.
+
+    python spectator.py --tiles 16
+    python spectator.py --tiles 8 --same-seed --player
+    python spectator.py --tiles 12 --policy engine:simple_policy --width 1920 --height 1080
+"""
+import argparse
+import math
+import os
+import time
+from multiprocessing import Pipe, Process
+
+import raylibpy as rl
+
+from engine import (SCREEN_WIDTH, SCREEN_HEIGHT, GameState, Simulation, TICK_TIME,
+                    ACTION_JUMP, ACTION_DUCK, ACTION_SHOOT)
+from difficulty import DifficultyCurve
+from planner import Planner
+from render_cache import Layer, Viewport, NumberText
+from rollout import load_policy
+from sim_thread import Frame, SimulationThread, MAX_BEHIND
+from main import (Game, SPRITES, TEXT, DETAIL_LOW, DETAIL_REDUCED, DETAIL_FULL,
+                  WHITE, YELLOW, NEON_GREEN, LIGHT_GRAY, GRAY)
+from palette import PALETTE
+
+PLANNER_BUDGET = 0.008  # Planner search time per decision, shared by the runs of one worker
+MIN_PLANNER_BUDGET = 0.001  # Less than this and the search can't finish a level: the bot stops looking ahead
+RESTART_DELAY = 3.0  # Seconds a finished run stays on screen before the next one starts
+LOOK_STEP = 400  # Tiles share sky/ground layers, one per this many points
+LAST_LOOK = 4800  # The look stops changing here (see Game.background_look)
+DETAIL_REDUCED_ZOOM = 0.6  # Below this zoom a tile has no HUD
+DETAIL_LOW_ZOOM = 0.35  # Below this, no clouds or buff indicators either
+TILE_GAP = 4
+LABEL_SIZE = 16
+
+# Bot side (worker processes)
+
+def run_seed(first_seed, tile, run, tiles, same_seed):
+    """Seed of a tile's nth run: every run different, or (same_seed) every tile on the same
+    seeds in the same order, so the bots are compared on equal terms."""
+    return first_seed + run if same_seed else first_seed + run * tiles + tile
+
+class BotRun:
+    """One tile's runs, played by a bot, one after the other."""
+
+    def __init__(self, tile, settings, curve, budget):
+        self.tile = tile
+        self.settings = settings  # (first seed, tiles, same_seed, policy)
+        self.sim = Simulation(curve=curve)
+        policy = settings[3]
+        if policy == "planner":
+            self.planner = Planner(time_budget=budget)
+            self.policy = self.planner.choose
+        else:
+            self.planner = None
+            self.policy = load_policy(policy)
+        self.runs = 0
+        self.restart_at = None
+        self.start()
+
+    def start(self):
+        first_seed, tiles, same_seed, _ = self.settings
+        self.sim.reset(run_seed(first_seed, self.tile, self.runs, tiles, same_seed))
+        if self.planner:
+            self.planner.reset()
+        self.restart_at = None
+
+    def tick(self, now):
+        """One tick. Returns True if the run changed (a finished run sits still until it restarts)."""
+        if self.restart_at is not None:
+            if now < self.restart_at:
+                return False
+            self.runs += 1
+            self.start()
+            return True
+        if not self.sim.step(self.policy(self.sim)):
+            self.restart_at = now + RESTART_DELAY
+        return True
+
+def bot_worker(tiles, settings, curve_path, connection):
+    """Tick the runs of the given tiles on wall-clock time until the window says stop.
+    Sends (tick time, [(tile, snapshot), ...]) after every tick."""
+    curve = DifficultyCurve.load(curve_path) if curve_path else None
+    budget = max(PLANNER_BUDGET / len(tiles), MIN_PLANNER_BUDGET)
+    runs = [BotRun(tile, settings, curve, budget) for tile in tiles]
+    for run in runs:
+        connection.send((time.perf_counter(), [(run.tile, run.sim.snapshot())]))
+    next_tick = time.perf_counter() + TICK_TIME
+    while not connection.poll():
+        now = time.perf_counter()
+        if now < next_tick:
+            time.sleep(next_tick - now)
+            continue
+        if now - next_tick > MAX_BEHIND:
+            # Too slow for this many runs (or stalled): skip ahead instead of running to catch up
+            next_tick += int((now - next_tick) / TICK_TIME) * TICK_TIME
+        states = [(run.tile, run.sim.snapshot()) for run in runs if run.tick(next_tick)]
+        if states:
+            connection.send((next_tick, states))
+        next_tick += TICK_TIME
+    connection.close()
+
+# Window side
+
+class TileGame(Game):
+    # Only ever restored from snapshots, so there are no spawn chunks to make ahead
+    background_spawns = False
+
+class Backdrops:
+    """Sky and ground layers shared by every tile. A tile's look is taken at a multiple of
+    LOOK_STEP points, so tiles that are close in score use the same texture."""
+
+    def __init__(self):
+        self.layers = {}  # Rounded score -> Layer
+        self.ground_lines = Layer(SCREEN_WIDTH + 60, 2)
+
+    def draw(self, game):
+        score = min(int(game.score) // LOOK_STEP * LOOK_STEP, LAST_LOOK)
+        layer = self.layers.get(score)
+        if layer is None:
+            layer = self.layers[score] = Layer(SCREEN_WIDTH, SCREEN_HEIGHT)
+        game.draw_backdrop(layer, self.ground_lines, game.background_look(score))
+
+    def unload(self):
+        for layer in self.layers.values():
+            layer.unload()
+        self.ground_lines.unload()
+
+class Tile:
+    def __init__(self, index, viewport, curve, name):
+        self.index = index
+        self.viewport = viewport
+        self.game = TileGame(curve, persistent=False)
+        self.name = name
+        self.frames = None  # (previous, latest) Frames from the bot, like SimulationThread.frames
+        self.runner = None  # SimulationThread, for the tile the player plays
+        self.runs = 0
+        self.best = 0
+        self.finished = False  # The run on screen has been counted
+        self.score_label = NumberText("{}")
+        self.best_label = NumberText("BEST {}")
+        zoom = viewport.zoom
+        self.detail = (DETAIL_FULL if zoom >= DETAIL_REDUCED_ZOOM else
+                       DETAIL_REDUCED if zoom >= DETAIL_LOW_ZOOM else DETAIL_LOW)
+
+    def push(self, stamp, state):
+        frame = Frame(stamp, state)
+        self.frames = (frame, frame) if self.frames is None else (self.frames[1], frame)
+
+    def show(self, now):
+        """Load the game with the run as it is at time now (one tick behind, interpolated)."""
+        if self.runner is not None:
+            if self.runner.frames is None:
+                return False
+            self.runner.show(self.game, now)
+        elif self.frames is None:
+            return False
+        else:
+            previous, latest = self.frames
+            self.game.restore(latest.state)
+            if latest.time > previous.time:
+                alpha = (now - TICK_TIME - previous.time) / (latest.time - previous.time)
+                self.game.interpolate(previous.state, min(max(alpha, 0.0), 1.0))
+
+        # Count each run once, when it ends
+        game = self.game
+        if game.game_state == GameState.GAME_OVER:
+            if not self.finished:
+                self.finished = True
+                self.runs += 1
+                self.best = max(self.best, int(game.score))
+        else:
+            self.finished = False
+        return True
+
+class SpectatorView:
+    def __init__(self, tiles, width, height, first_seed=0, same_seed=False, policy="planner",
+                 curve_path=None, player=False, workers=None):
+        self.width = width
+        self.height = height
+        self.same_seed = same_seed
+        self.first_seed = first_seed
+        curve = DifficultyCurve.load(curve_path) if curve_path else None
+        bot_name = "BOT" if policy == "planner" else policy.rpartition(":")[2].upper()
+        self.tiles = []
+        for index, viewport in enumerate(layout(tiles, width, height)):
+            name = "PLAYER" if player and index == 0 else f"{bot_name} {index + 1}"
+            self.tiles.append(Tile(index, viewport, curve, name))
+        self.backdrops = Backdrops()
+
+        self.player = None
+        self.pending_action = 0
+        if player:
+            self.player = self.tiles[0]
+            self.player.runner = SimulationThread(curve)
+            self.start_player()
+
+        # Bot tiles are dealt out to the workers in turn
+        bot_tiles = [tile.index for tile in self.tiles if tile is not self.player]
+        workers = min(workers or os.cpu_count(), len(bot_tiles))
+        settings = (first_seed, tiles, same_seed, policy)
+        self.connections = []
+        self.workers = []
+        for share in range(workers):
+            mine, theirs = Pipe()
+            worker = Process(target=bot_worker, args=(bot_tiles[share::workers], settings,
+                                                      curve_path, theirs), daemon=True)
+            worker.start()
+            theirs.close()
+            self.connections.append(mine)
+            self.workers.append(worker)
+
+    def start_player(self):
+        tile = self.player
+        seed = run_seed(self.first_seed, tile.index, tile.runs, len(self.tiles), self.same_seed)
+        tile.runner.start(seed)
+
+    def receive(self):
+        # Everything the bots sent since last frame; only the two newest states of a tile matter
+        for connection in self.connections:
+            while connection.poll():
+                stamp, states = connection.recv()
+                for index, state in states:
+                    self.tiles[index].push(stamp, state)
+
+    def handle_input(self):
+        if self.player is None:
+            return
+        runner = self.player.runner
+        if runner.active:
+            if rl.is_key_pressed(rl.KEY_SPACE) or rl.is_key_pressed(rl.KEY_UP):
+                self.pending_action |= ACTION_JUMP
+            if rl.is_key_pressed(rl.KEY_F):
+                self.pending_action |= ACTION_SHOOT
+            held = ACTION_DUCK if rl.is_key_down(rl.KEY_DOWN) else 0
+            runner.send(time.perf_counter(), self.pending_action, held)
+            self.pending_action = 0
+        elif rl.is_key_pressed(rl.KEY_SPACE) or rl.is_key_pressed(rl.KEY_ENTER):
+            self.start_player()
+
+    def leader(self):
+        best = None
+        for tile in self.tiles:
+            if tile.frames or tile.runner:
+                if best is None or tile.game.score > best.game.score:
+                    best = tile
+        return best
+
+    def draw(self):
+        now = time.perf_counter()
+        rl.clear_background(PALETTE.gray(12))
+        overlay = PALETTE.rgb(0, 0, 0, 160)
+        for tile in self.tiles:
+            if not tile.show(now):
+                continue
+            game = tile.game
+            tile.viewport.begin()
+            self.backdrops.draw(game)
+            game.draw_game(tile.detail)
+            if game.game_state == GameState.GAME_OVER:
+                rl.draw_rectangle(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT, overlay)
+            tile.viewport.end()
+
+        # Names and scores at window size, on top of the tiles
+        leader = self.leader()
+        TEXT.begin()
+        for tile in self.tiles:
+            viewport = tile.viewport
+            x = viewport.x + 6
+            y = viewport.y + 4
+            TEXT.draw(tile.name, x, y, LABEL_SIZE, NEON_GREEN if tile is leader else WHITE)
+            score_text = tile.score_label.get(tile.game.score)
+            TEXT.draw_label(tile.score_label, viewport.x + viewport.width - TEXT.width(score_text, LABEL_SIZE) - 6,
+                            y, LABEL_SIZE, YELLOW)
+            if tile.runs:
+                tile.best_label.get(tile.best)
+                TEXT.draw_label(tile.best_label, x, y + LABEL_SIZE + 2, LABEL_SIZE - 4, LIGHT_GRAY)
+            if tile.game.game_state == GameState.GAME_OVER:
+                TEXT.draw("GAME OVER", x, viewport.y + viewport.height - LABEL_SIZE - 4, LABEL_SIZE, WHITE)
+        TEXT.end()
+        for tile in self.tiles:
+            viewport = tile.viewport
+            rl.draw_rectangle_lines(viewport.x, viewport.y, viewport.width, viewport.height,
+                                    YELLOW if tile is leader else GRAY)
+
+    def close(self):
+        for connection in self.connections:
+            connection.send(None)
+        for worker in self.workers:
+            worker.join(1.0)
+            if worker.is_alive():
+                worker.terminate()
+        if self.player:
+            self.player.runner.close()
+        self.backdrops.unload()
+        for tile in self.tiles:
+            tile.score_label.unload()
+            tile.best_label.unload()
+        SPRITES.unload()
+        TEXT.unload()
+
+def layout(count, width, height):
+    """count Viewports of the screen's shape, in the grid that makes them biggest."""
+    best = None
+    for columns in range(1, count + 1):
+        rows = math.ceil(count / columns)
+        cell_width = (width - TILE_GAP * (columns + 1)) / columns
+        cell_height = (height - TILE_GAP * (rows + 1)) / rows
+        zoom = min(cell_width / SCREEN_WIDTH, cell_height / SCREEN_HEIGHT)
+        if best is None or zoom > best[0]:
+            best = (zoom, columns, rows)
+    zoom, columns, rows = best
+    tile_width = int(SCREEN_WIDTH * zoom)
+    tile_height = int(SCREEN_HEIGHT * zoom)
+    # Centre the grid in the window
+    left = (width - columns * tile_width - (columns - 1) * TILE_GAP) // 2
+    top = (height - rows * tile_height - (rows - 1) * TILE_GAP) // 2
+    return [Viewport(left + (i % columns) * (tile_width + TILE_GAP),
+                     top + (i // columns) * (tile_height + TILE_GAP),
+                     tile_width, tile_height, zoom) for i in range(count)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch many live runs at once")
+    parser.add_argument("--tiles", type=int, default=16)
+    parser.add_argument("--width", type=int, default=1600)
+    parser.add_argument("--height", type=int, default=900)
+    parser.add_argument("--seed", type=int, default=0, help="first seed")
+    parser.add_argument("--same-seed", action="store_true", help="every tile plays the same seeds")
+    parser.add_argument("--policy", default="planner", help="planner, or module:function like engine:simple_policy")
+    parser.add_argument("--curve", help="difficulty curve JSON (default: the built-in curve)")
+    parser.add_argument("--player", action="store_true", help="play the first tile from the keyboard")
+    parser.add_argument("--workers", type=int, default=None, help="bot processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    rl.init_window(args.width, args.height, "🎮 SUPER SQUARE RUN - spectator")
+    rl.set_target_fps(60)
+    view = SpectatorView(args.tiles, args.width, args.height, args.seed, args.same_seed,
+                         args.policy, args.curve, args.player, args.workers)
+    try:
+        while not rl.window_should_close():
+            view.receive()
+            view.handle_input()
+            rl.begin_drawing()
+            view.draw()
+            rl.end_drawing()
+    finally:
+        view.close()
+        rl.close_window()
+
+if __name__ == "__main__":
+    main()
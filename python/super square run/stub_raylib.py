@@ -0,0 +1,71 @@
+"""A raylibpy stand-in that draws nothing, for timing the Python side of draw().
+
+install() puts it in sys.modules before main.py is imported. Every raylib
+function becomes a no-op that returns 0 and counts its calls, so a benchmark
+can see how many draw calls a frame makes without a window or a GPU.
+"""
+import sys
+from collections import Counter
+
+calls = Counter()
+
+class Color:
+    __slots__ = ("r", "g", "b", "a")
+
+    def __init__(self, r=0, g=0, b=0, a=255):
+        self.r = r
+        self.g = g
+        self.b = b
+        self.a = a
+
+class Rectangle:
+    __slots__ = ("x", "y", "width", "height")
+
+    def __init__(self, x=0, y=0, width=0, height=0):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+class Vector2:
+    __slots__ = ("x", "y")
+
+    def __init__(self, x=0, y=0):
+        self.x = x
+        self.y = y
+
+class Texture:
+    def __init__(self, width=0, height=0):
+        self.width = width
+        self.height = height
+
+class RenderTexture:
+    def __init__(self, width=0, height=0):
+        self.texture = Texture(width, height)
+
+def load_render_texture(width, height):
+    calls["load_render_texture"] += 1
+    return RenderTexture(width, height)
+
+def get_mouse_position():
+    return Vector2(-1, -1)
+
+def no_op(name):
+    def call(*args):
+        calls[name] += 1
+        return 0
+    call.__name__ = name
+    return call
+
+def __getattr__(name):
+    # Constants (KEY_*, BLEND_*, WHITE...) are just 0, anything else is a counted no-op
+    value = 0 if name.isupper() else no_op(name)
+    globals()[name] = value
+    return value
+
+def draw_calls():
+    """Calls that draw something (draw_*), summed over every name."""
+    return sum(count for name, count in calls.items() if name.startswith("draw_"))
+
+def install():
+    sys.modules["raylibpy"] = sys.modules[__name__]
@@ -0,0 +1,71 @@
+"""The batch environment against engine.Simulation, run by run and tick by tick."""
+import unittest
+
+from engine import Simulation, simple_policy, ACTION_SHOOT
+
+try:
+    import numpy as np
+    from batch_env import BatchEnv
+except ImportError:  # numpy is only needed for the batch tools
+    np = None
+
+# Runs of a few thousand ticks that pick up buffs, and seed 19 has a double the check drops
+SEEDS = [1, 3, 9, 19, 38, 50]
+TICKS = 4000
+
+def policy(sim):
+    # The simple bot, shooting now and then so a weapon pickup gets used
+    action = simple_policy(sim)
+    if sim.game_time % 25 == 0:
+        action |= ACTION_SHOOT
+    return action
+
+@unittest.skipIf(np is None, "needs numpy")
+class BatchParityTest(unittest.TestCase):
+    def test_runs_match_the_engine(self):
+        sims = [Simulation(seed) for seed in SEEDS]
+        env = BatchEnv(len(SEEDS))
+        env.reset(seeds=SEEDS)
+        for tick in range(TICKS):
+            live = [not done for done in env.done]
+            actions = [policy(sim) if alive else 0 for sim, alive in zip(sims, live)]
+            env.step(np.array(actions))
+            for i, sim in enumerate(sims):
+                if not live[i]:
+                    continue
+                still_playing = sim.step(actions[i])
+                message = f"seed {SEEDS[i]}, tick {tick + 1}"
+                self.assertEqual(not still_playing, env.done[i], message)
+                self.assertEqual(sim.dinosaur.y, env.dino_y[i], message)
+                self.assertAlmostEqual(sim.score, env.score[i], places=6, msg=message)
+                self.assertEqual(sim.difficulty_level, env.difficulty_level[i], message)
+
+                alive = np.flatnonzero(env.obs_alive[i])
+                alive = alive[np.argsort(env.obs_seq[i, alive])]
+                self.assertEqual([(obstacle.x, obstacle.y, obstacle.width, obstacle.height)
+                                  for obstacle in sim.obstacles],
+                                 [(env.obs_x[i, slot], env.obs_y[i, slot], env.obs_w[i, slot],
+                                   env.obs_h[i, slot]) for slot in alive], message)
+                self.assertEqual(sorted((buff.x, buff.y) for buff in sim.buffs),
+                                 sorted(zip(env.item_x[i, env.item_alive[i]], env.item_y[i, env.item_alive[i]])),
+                                 message)
+            if env.done.all():
+                break
+
+        for i, sim in enumerate(sims):
+            self.assertEqual(sim.game_time, env.game_time[i])
+            self.assertEqual(sim.unfair_doubles, env.unfair_doubles[i])
+            self.assertEqual(sim.double_obstacles, env.double_obstacles[i])
+        # The runs got far enough to see doubles, and the check dropped some of them
+        self.assertGreater(sum(sim.double_obstacles for sim in sims), 0)
+        self.assertGreater(sum(sim.unfair_doubles for sim in sims), 0)
+
+    def test_reset_draws_new_seeds(self):
+        env = BatchEnv(4, seed=1)
+        first = env.seeds.copy()
+        env.reset(np.array([True, False, True, False]))
+        self.assertEqual(list(env.seeds[[1, 3]]), list(first[[1, 3]]))
+        self.assertNotEqual(list(env.seeds[[0, 2]]), list(first[[0, 2]]))
+
+if __name__ == "__main__":
+    unittest.main()
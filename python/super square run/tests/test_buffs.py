@@ -0,0 +1,74 @@
+"""The buff table: one bit and timer per entry, its hooks, and the columns the batch tools use."""
+import unittest
+
+from engine import Dinosaur, BUFF_TYPES, BUFFS_BY_NAME, BUFF_DOUBLE_JUMP, BUFF_WEAPON
+
+try:
+    import numpy as np
+    import batch_env
+except ImportError:  # numpy is only needed for the batch tools
+    np = None
+
+class BuffTableTest(unittest.TestCase):
+    def test_each_buff_has_its_own_index_and_bit(self):
+        self.assertEqual([buff.index for buff in BUFF_TYPES], list(range(len(BUFF_TYPES))))
+        self.assertEqual([buff.bit for buff in BUFF_TYPES], [1 << i for i in range(len(BUFF_TYPES))])
+        for buff in BUFF_TYPES:
+            self.assertIs(BUFFS_BY_NAME[buff.name], buff)
+
+    def test_activate_sets_only_its_bit_and_restarts_its_timer(self):
+        dino = Dinosaur()
+        for buff in BUFF_TYPES:
+            dino.activate_buff(buff.name)
+            self.assertTrue(dino.has_buff(buff.name))
+        for _ in range(100):
+            dino.update()
+        dino.activate_buff("giant")
+        giant = BUFFS_BY_NAME["giant"]
+        self.assertEqual(dino.buff_timers[giant.index], 0)
+        self.assertEqual(dino.buff_time_left(giant), 1.0)
+        dino.remove_buff("giant")
+        self.assertFalse(dino.has_buff("giant"))
+        self.assertEqual(dino.active_buffs, (1 << len(BUFF_TYPES)) - 1 - giant.bit)
+
+    def test_a_buff_runs_out_after_its_duration(self):
+        for buff in BUFF_TYPES:
+            dino = Dinosaur()
+            dino.activate_buff(buff.name)
+            for _ in range(buff.duration - 1):
+                dino.update()
+            self.assertTrue(dino.has_buff(buff.name))
+            dino.update()
+            self.assertEqual(dino.active_buffs, 0)
+            self.assertEqual(dino.buff_time_left(buff), 0.0)
+
+    def test_hooks_run_on_activate_and_expire(self):
+        dino = Dinosaur()
+        dino.jumps_remaining = 0
+        dino.activate_buff("double_jump")
+        self.assertTrue(dino.active_buffs & BUFF_DOUBLE_JUMP)
+        self.assertEqual(dino.jumps_remaining, 2)
+
+        dino.activate_buff("weapon")
+        self.assertTrue(dino.active_buffs & BUFF_WEAPON)
+        dino.shoot()
+        self.assertTrue(dino.bullets)
+        dino.remove_buff("weapon")
+        self.assertEqual(dino.bullets, [])
+
+    def test_unknown_names_are_ignored(self):
+        dino = Dinosaur()
+        dino.activate_buff("flying")
+        dino.remove_buff("flying")
+        self.assertEqual(dino.active_buffs, 0)
+
+@unittest.skipIf(np is None, "needs numpy")
+class BatchBuffColumnsTest(unittest.TestCase):
+    def test_columns_follow_the_engine_table(self):
+        self.assertEqual(batch_env.BUFF_NAMES, [buff.name for buff in BUFF_TYPES])
+        for name in ("double_jump", "giant", "invincible", "weapon"):
+            self.assertEqual(getattr(batch_env, name.upper()), BUFFS_BY_NAME[name].index)
+        self.assertEqual(list(batch_env.BUFF_MAX_TIME), [buff.duration for buff in BUFF_TYPES])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+"""Swept collisions: sweep against its batch version and the broad phase against testing every box."""
+import random
+import unittest
+
+from collision import sweep, BoundsList
+
+try:
+    import numpy as np
+    from batch_env import sweep_times
+except ImportError:  # numpy is only needed for the batch tools
+    np = None
+
+def random_pairs(rng, count):
+    # Small integer boxes close together, so touching edges, still axes and misses all come up
+    pairs = []
+    for _ in range(count):
+        pairs.append((rng.randint(-20, 20), rng.randint(-20, 20), rng.randint(1, 12), rng.randint(1, 12),
+                      rng.choice([0, 0, rng.randint(-30, 30)]), rng.choice([0, rng.randint(-30, 30)]),
+                      rng.randint(-20, 20), rng.randint(-20, 20), rng.randint(1, 12), rng.randint(1, 12),
+                      rng.choice([0, rng.randint(-30, 30)]), rng.choice([0, 0, rng.randint(-10, 10)])))
+    return pairs
+
+class Box:
+    def __init__(self, x, y, width, height):
+        self.x, self.y, self.width, self.height = x, y, width, height
+
+class SweepTest(unittest.TestCase):
+    def test_overlap_at_the_start_is_time_zero(self):
+        self.assertEqual(sweep(0, 0, 10, 10, 5, 0, 5, 5, 10, 10, 0, 0), 0.0)
+
+    def test_fast_box_does_not_pass_through(self):
+        # 100 pixels in one tick through a 2 pixel wall: no overlap at either end of the tick
+        self.assertAlmostEqual(sweep(0, 0, 10, 10, 100, 0, 50, 0, 2, 10, 0, 0), 0.4)
+        self.assertIsNone(sweep(0, 0, 10, 10, 100, 0, 50, 20, 2, 10, 0, 0))
+
+    @unittest.skipIf(np is None, "needs numpy")
+    def test_batch_matches_sweep(self):
+        pairs = random_pairs(random.Random(3), 5000)
+        times = sweep_times(*(np.array(column, dtype=float) for column in zip(*pairs)))
+        hits = 0
+        for pair, batch in zip(pairs, times):
+            single = sweep(*pair)
+            if single is None:
+                self.assertEqual(batch, float("inf"), pair)
+            else:
+                self.assertAlmostEqual(single, batch, msg=pair)
+                hits += 1
+        self.assertGreater(hits, 100)
+
+class BoundsListTest(unittest.TestCase):
+    def test_query_finds_the_same_boxes_as_testing_them_all(self):
+        rng = random.Random(4)
+        bounds = BoundsList(4)
+        out = [0] * 64
+        for _ in range(200):
+            boxes = [Box(rng.randint(0, 300), rng.randint(0, 100), rng.randint(1, 40), rng.randint(1, 40))
+                     for _ in range(rng.randint(0, 40))]
+            starts = [box.x + rng.randint(0, 30) for box in boxes]
+            bounds.load(boxes, starts)
+            x0, y0 = rng.randint(-20, 300), rng.randint(-20, 100)
+            x1, y1 = x0 + rng.randint(1, 60), y0 + rng.randint(1, 60)
+
+            expected = [i for i, box in enumerate(boxes)
+                        if min(box.x, starts[i]) < x1 and max(box.x, starts[i]) + box.width > x0
+                        and box.y < y1 and box.y + box.height > y0]
+            found = bounds.query(x0, y0, x1, y1, out)
+            self.assertEqual(sorted(out[:found]), expected)
+
+if __name__ == "__main__":
+    unittest.main()
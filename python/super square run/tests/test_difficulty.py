@@ -0,0 +1,98 @@
+"""The default curve against the formulas update_difficulty used before there were curves."""
+import json
+import os
+import tempfile
+import unittest
+
+from difficulty import DifficultyCurve, DEFAULT_CURVE
+
+GAME_SPEED_INITIAL = 3
+
+# update_difficulty and the spawn code, as they were written into the engine
+def old_level(score, ticks):
+    return 1 + int((score / 800 + ticks / 4000) * 3)
+
+def old_speed(level, score):
+    return GAME_SPEED_INITIAL + (level * 0.7) + min(score / 3000, 4.0)
+
+def old_obstacle_frequency(level, score):
+    return max(15, 100 - level * 10 - min(int(score / 150), 50))
+
+def old_score_per_tick(level):
+    return 0.1 * (1 + level * 0.15)
+
+def old_cactus_chance(level):
+    return max(0.4, 0.7 - (level * 0.04))
+
+def old_buff_chance(level):
+    return max(0.2, 0.5 - (level * 0.06))
+
+LEVELS = [1, 2, 3, 5, 8, 12, 20, 40]
+SCORES = [0, 0.1, 149.9, 150, 777.7, 3000, 12345.6, 50000]
+
+class DefaultCurveTest(unittest.TestCase):
+    def test_level(self):
+        for score in SCORES:
+            for ticks in (0, 1, 3999, 4000, 12345, 100000):
+                self.assertEqual(DEFAULT_CURVE.level(score, ticks), old_level(score, ticks))
+
+    def test_rows(self):
+        for level in LEVELS:
+            row = DEFAULT_CURVE.row(level)
+            self.assertEqual(row.level, level)
+            self.assertEqual(row.score_per_tick, old_score_per_tick(level))
+            self.assertEqual(row.cactus_chance, old_cactus_chance(level))
+            self.assertEqual(row.double_chance, 0.4 if level > 2 else 0)
+            self.assertEqual(row.buff_chance, old_buff_chance(level))
+
+    def test_speed_and_obstacle_frequency(self):
+        # Exactly equal, not close: the runs (and replays) depend on every bit
+        for level in LEVELS:
+            row = DEFAULT_CURVE.row(level)
+            for score in SCORES:
+                self.assertEqual(DEFAULT_CURVE.speed(row, score), old_speed(level, score))
+                self.assertEqual(DEFAULT_CURVE.obstacle_frequency(row, score),
+                                 old_obstacle_frequency(level, score))
+
+class CurveFileTest(unittest.TestCase):
+    def load(self, params):
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+            json.dump(params, f)
+        try:
+            return DifficultyCurve.load(f.name)
+        finally:
+            os.remove(f.name)
+
+    def test_points_override_a_column(self):
+        curve = self.load({"name": "gentle", "speed_per_level": 0.5,
+                           "obstacle_frequency_points": [[10, 60], [1, 100], [30, 30]]})
+        self.assertEqual(curve.name, "gentle")
+        # Flat before the first point and after the last, straight lines between
+        self.assertEqual(curve.row(1).obstacle_frequency, 100)
+        self.assertEqual(curve.row(4).obstacle_frequency, round(100 - 40 * 3 / 9))
+        self.assertEqual(curve.row(10).obstacle_frequency, 60)
+        self.assertEqual(curve.row(20).obstacle_frequency, 45)
+        self.assertEqual(curve.row(50).obstacle_frequency, 30)
+        # The score term and the minimum still apply on top
+        self.assertEqual(curve.obstacle_frequency(curve.row(50), 3000), 15)
+        # Parameters without points are still used as they are
+        self.assertEqual(curve.row(4).speed, 3 + 4 * 0.5)
+        self.assertEqual(curve.row(4).cactus_chance, old_cactus_chance(4))
+
+    def test_a_file_without_a_name_is_named_after_the_file(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "steep.json")
+            with open(path, "w") as f:
+                json.dump({"speed_per_level": 3.0}, f)
+            curve = DifficultyCurve.load(path)
+        self.assertEqual(curve.name, "steep")
+        self.assertEqual(curve.speed_per_level, 3.0)
+
+    def test_unknown_parameters_are_rejected(self):
+        with self.assertRaises(ValueError):
+            self.load({"speed_per_levle": 0.5})
+        with self.assertRaises(ValueError):
+            self.load({"bird_top_points": [[1, 100]]})  # Not a per-level column
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+"""RunnerEnv and VectorEnv: observations fit their spaces, frame skip adds up the score, runs end as they should."""
+import unittest
+
+from engine import Simulation, ACTION_NONE, ACTION_JUMP, ACTION_DUCK
+
+try:
+    import numpy as np
+    from env import RunnerEnv, VectorEnv, DINO_FEATURES, OBSTACLE_FEATURES
+except ImportError:  # numpy is only needed for the batch tools
+    np = None
+
+@unittest.skipIf(np is None, "needs numpy")
+class RunnerEnvTest(unittest.TestCase):
+    def test_observations_fit_the_space(self):
+        for observation in ("features", "pixels"):
+            env = RunnerEnv(observation)
+            obs, info = env.reset(seed=4)
+            self.assertEqual(info["seed"], 4)
+            for _ in range(20):
+                space = env.observation_space
+                self.assertEqual((obs.shape, obs.dtype), (space.shape, space.dtype), observation)
+                self.assertTrue(space.contains(obs), observation)
+                obs, reward, terminated, truncated, info = env.step(env.action_space.sample())
+
+    def test_frame_skip_plays_the_action_then_holds_duck(self):
+        env = RunnerEnv(frame_skip=4)
+        env.reset(seed=8)
+        sim = Simulation(8)
+        for action, ticks in ((ACTION_NONE, [0] * 4), (ACTION_JUMP | ACTION_DUCK,
+                                                  [ACTION_JUMP | ACTION_DUCK] + [ACTION_DUCK] * 3)):
+            start = sim.score
+            for tick_action in ticks:
+                sim.step(tick_action)
+            obs, reward, terminated, truncated, info = env.step(action)
+            self.assertAlmostEqual(reward, sim.score - start)
+            self.assertEqual(env.sim.snapshot(), sim.snapshot())
+            self.assertEqual(info["ticks"], sim.game_time)
+
+    def test_truncated_at_max_ticks(self):
+        env = RunnerEnv(frame_skip=4, max_ticks=40)
+        env.reset(seed=5)  # Doing nothing survives a few hundred ticks on this seed
+        for step in range(1, 11):
+            _, _, terminated, truncated, _ = env.step(ACTION_NONE)
+            self.assertFalse(terminated)
+            self.assertEqual(truncated, step == 10)
+
+    def test_nearest_obstacles_in_order(self):
+        env = RunnerEnv(nearest_obstacles=3)
+        env.reset(seed=2)
+        sim = env.sim
+        for obstacle, x in zip(sim.obstacle_pool.free[:], (500, 300, 300, 700, 100)):
+            obstacle.spawn(x)
+            sim.obstacles.append(obstacle)
+        # The one at 100 has gone past the dino; the two at 300 keep their list order
+        expected = sorted((obstacle.x, i) for i, obstacle in enumerate(sim.obstacles)
+                          if obstacle.x + obstacle.width > sim.dinosaur.x)[:3]
+        env.encode()
+        for place, (x, _) in enumerate(expected):
+            base = DINO_FEATURES + place * OBSTACLE_FEATURES
+            self.assertEqual(env.obs[base], 1)
+            self.assertAlmostEqual(env.obs[base + 1] * 800, x - sim.dinosaur.x, places=3)
+
+@unittest.skipIf(np is None, "needs numpy")
+class VectorEnvTest(unittest.TestCase):
+    def test_steps_write_into_one_array(self):
+        envs = VectorEnv(3, seed=10)
+        self.assertEqual(len(envs.envs), 3)
+        obs_array = envs.obs
+        for i, env in enumerate(envs.envs):
+            self.assertTrue(np.shares_memory(env.obs, obs_array[i]))
+        obs, _ = envs.reset()
+        self.assertEqual(obs.shape, (3,) + envs.single_observation_space.shape)
+        self.assertEqual([env.sim.seed for env in envs.envs], [10, 11, 12])
+
+        finished = {}
+        for _ in range(200):
+            obs, rewards, terminated, truncated, info = envs.step(np.zeros(3, dtype=np.int64))
+            self.assertIs(envs.obs, obs_array)
+            self.assertTrue((obs == obs_array).all())
+            finished.update(info.get("final_obs", {}))
+        # Idle runs die, and are reset with the next seeds
+        self.assertTrue(finished)
+        self.assertGreaterEqual(envs.next_seed, 13)
+        for env in envs.envs:
+            self.assertTrue(np.shares_memory(env.obs, obs_array))
+
+if __name__ == "__main__":
+    unittest.main()
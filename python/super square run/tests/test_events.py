@@ -0,0 +1,99 @@
+"""The event log: the writer thread gets events to disk, a full ring drops and says so, close writes the rest."""
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from engine import Simulation, simple_policy
+from events import EventLog, read_events, summarize, PASSED, HEADER
+
+class HeldFile:
+    """A file whose writes wait until released, to keep the writer thread behind."""
+
+    def __init__(self, file):
+        self.file = file
+        self.released = threading.Event()
+
+    def write(self, data):
+        self.released.wait()
+        return self.file.write(data)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.001)
+
+class EventLogTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, "test.ssev")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def fill_while_held(self, log, count):
+        # The writer wakes at half full and then sits in its first write
+        held = log.file = HeldFile(log.file)
+        for tick in range(count):
+            log.add(tick, PASSED)
+        return held
+
+    def test_writer_writes_while_the_log_is_open(self):
+        log = EventLog(self.path, flush_interval=0.01)
+        for tick in range(5):
+            log.add(tick, PASSED, value=tick)
+        wait_for(lambda: os.path.getsize(self.path) > HEADER.size)
+        wait_for(lambda: log.written == 5)
+        self.assertEqual([event["value"] for event in read_events(self.path)], [0, 1, 2, 3, 4])
+        self.assertTrue(log.close())
+
+    def test_a_full_ring_drops_and_says_how_many(self):
+        log = EventLog(self.path, size=8, flush_interval=60)
+        held = self.fill_while_held(log, 12)
+        self.assertEqual(log.dropped, 4)
+        held.released.set()
+        wait_for(lambda: log.tail > 0)
+        log.add(12, PASSED)
+        self.assertTrue(log.close())
+
+        events = list(read_events(self.path))
+        self.assertEqual([event["tick"] for event in events[:8]], list(range(8)))
+        self.assertEqual((events[8]["kind"], events[8]["tick"], events[8]["value"]), ("dropped", 12, 4))
+        self.assertEqual((events[9]["kind"], events[9]["tick"]), ("passed", 12))
+        self.assertEqual(len(events), 10)
+
+    def test_close_reports_drops_after_the_last_marker(self):
+        log = EventLog(self.path, size=8, flush_interval=60)
+        held = self.fill_while_held(log, 11)
+        held.released.set()
+        self.assertTrue(log.close())
+        events = list(read_events(self.path))
+        self.assertEqual(len(events), 9)
+        self.assertEqual((events[-1]["kind"], events[-1]["tick"], events[-1]["value"]), ("dropped", 10, 3))
+
+    def test_close_writes_the_end_of_the_run(self):
+        # A timer long enough that only close gets the last events out
+        log = EventLog(self.path, flush_interval=60)
+        sim = Simulation()
+        sim.events = log
+        sim.reset(3)
+        while sim.step(simple_policy(sim)):
+            pass
+        self.assertTrue(log.close())
+        events = list(read_events(self.path))
+        self.assertEqual(len(events), log.written)
+        self.assertEqual(events[-1]["kind"], "death")
+        self.assertEqual(events[-1]["tick"], sim.game_time)
+        self.assertEqual([seed for seed, _ in summarize(events)], [3])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+"""Exporting a replay: splitting it into segments gives the same frames as rendering it in one go."""
+import os
+import tempfile
+import unittest
+
+from engine import Simulation, simple_policy
+from replay import Replay
+
+try:
+    import numpy as np
+    from export import export, plan_segments
+except ImportError:  # numpy is only needed for the batch tools
+    np = None
+
+def recorded(seed, ticks):
+    sim = Simulation(seed)
+    for _ in range(ticks):
+        if not sim.step(simple_policy(sim)):
+            break
+    return Replay.from_simulation(sim)
+
+@unittest.skipIf(np is None, "needs numpy")
+class ExportTest(unittest.TestCase):
+    def test_segments_start_where_the_run_is(self):
+        replay = recorded(41, 300)
+        plan = plan_segments(replay, 10, 200, 4)
+        self.assertEqual([(start, end) for _, _, start, end in plan],
+                         [(10, 57), (57, 105), (105, 153), (153, 201)])
+        for snapshot, actions, start, end in plan:
+            sim = Simulation(replay.seed)
+            for action in replay.actions[:start]:
+                sim.step(action)
+            self.assertEqual(sim.snapshot(), snapshot)
+            self.assertEqual(actions, replay.actions[start:end - 1])
+
+    def test_segmented_frames_match_one_segment(self):
+        replay = recorded(42, 120)
+        with tempfile.TemporaryDirectory() as folder:
+            whole = os.path.join(folder, "whole")
+            split = os.path.join(folder, "split")
+            frames = export(replay, whole, scale=0.25, workers=1, segments=1, hold=0.1)
+            self.assertEqual(export(replay, split, scale=0.25, workers=2, segments=5, hold=0.1), frames)
+
+            names = sorted(os.listdir(whole))
+            self.assertEqual(len(names), frames)
+            self.assertEqual(sorted(os.listdir(split)), names)
+            for name in names:
+                with open(os.path.join(whole, name), "rb") as a, open(os.path.join(split, name), "rb") as b:
+                    self.assertEqual(a.read(), b.read(), name)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+"""Double spawns: the fairness check against hand-built pairs."""
+import unittest
+
+from engine import Dinosaur, Obstacle, obstacles_are_fair
+
+def obstacle(obstacle_type, x, y, width, height):
+    built = Obstacle.__new__(Obstacle)
+    built.type = obstacle_type
+    built.x = x
+    built.y = y
+    built.width = width
+    built.height = height
+    return built
+
+class FairnessTest(unittest.TestCase):
+    def test_unfair_double_is_dropped(self):
+        # Too low to stand or duck under (a ducked dinosaur is 390-420, its feet off the
+        # ground), and the bird above it is in the way of every jump
+        low = obstacle("bird", 870, 380, 40, 30)
+        high = obstacle("bird", 800, 280, 40, 30)
+        dino = Dinosaur()
+        dino.duck(True)
+        _, top, _, height = dino.get_rect()
+        self.assertTrue(top < low.y + low.height and top + height > low.y)
+        self.assertFalse(obstacles_are_fair((high, low), 4))
+
+    def test_fair_doubles_are_kept(self):
+        cactus = obstacle("cactus", 800, 410, 30, 40)
+        self.assertTrue(obstacles_are_fair((cactus, obstacle("bird", 870, 380, 40, 30)), 4))
+        self.assertTrue(obstacles_are_fair((cactus, obstacle("bird", 900, 330, 40, 30)), 6))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+"""The leaderboard server and client talking over localhost."""
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+
+from engine import Simulation
+from leaderboard import Board, LeaderboardServer
+from leaderboard_client import LeaderboardClient
+from replay import Replay
+
+def finished_run(seed, jump_every=0):
+    """A replay of a short run: idle, or jumping every jump_every ticks."""
+    sim = Simulation(seed)
+    tick = 0
+    while sim.step(1 if jump_every and tick % jump_every == 0 else 0):
+        tick += 1
+    return Replay.from_simulation(sim)
+
+class LeaderboardTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        # workers=0 checks runs on a thread, top_size=1 so most runs land below the cached top
+        self.server = LeaderboardServer(Board(top_size=1), workers=0)
+        port = asyncio.run_coroutine_threadsafe(self.server.start("127.0.0.1", 0), self.loop).result(10)
+        self.url = f"http://127.0.0.1:{port}"
+
+    def tearDown(self):
+        asyncio.run_coroutine_threadsafe(self.server.close(), self.loop).result(10)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(10)
+        self.loop.close()
+
+    def restart(self, log_path):
+        """Swap the server for one that keeps its runs in log_path."""
+        asyncio.run_coroutine_threadsafe(self.server.close(), self.loop).result(10)
+        self.server = LeaderboardServer(Board(top_size=1), workers=0, log_path=log_path)
+        port = asyncio.run_coroutine_threadsafe(self.server.start("127.0.0.1", 0), self.loop).result(10)
+        self.url = f"http://127.0.0.1:{port}"
+
+    def submit(self, replays):
+        client = LeaderboardClient(self.url, "test", flush_interval=0.05)
+        tickets = [client.submit_replay(replay) for replay in replays]
+        client.close(timeout=60)
+        self.assertIsNone(client.last_error)
+        return client, [client.results[ticket] for ticket in tickets]
+
+    def test_accepts_and_ranks_runs(self):
+        runs = sorted([finished_run(1), finished_run(2, 40), finished_run(3, 25)],
+                      key=lambda replay: replay.score)
+        _, results = self.submit(runs)
+        self.assertTrue(all(result["accepted"] for result in results))
+        self.assertEqual([result["score"] for result in results], [replay.score for replay in runs])
+        # Sent worst first: each new one is the best so far
+        self.assertEqual([result["rank"] for result in results], [1, 1, 1])
+
+        client = LeaderboardClient(self.url)
+        # A score goes after the runs that have it already
+        self.assertEqual(client.rank(runs[1].score)["rank"], 3)
+        self.assertEqual(client.rank(runs[0].score - 1)["rank"], 4)
+        self.assertEqual(client.rank(runs[-1].score + 1)["rank"], 1)
+        client.close()
+
+    def test_rejects_a_score_that_does_not_match(self):
+        run = finished_run(4)
+        forged = Replay(run.seed, run.actions, run.score + 100)
+        _, (result,) = self.submit([forged])
+        self.assertFalse(result["accepted"])
+        self.assertIn("score", result["reason"])
+        self.assertEqual(len(self.server.board.entries), 0)
+
+    def test_counts_a_resent_run_once(self):
+        run = finished_run(5)
+        _, (first, again) = self.submit([run, run])
+        _, (later,) = self.submit([run])
+        for result in (first, again, later):
+            self.assertTrue(result["accepted"])
+            self.assertEqual(result["rank"], 1)
+            self.assertEqual(result["count"], 1)
+        self.assertEqual(len(self.server.board.entries), 1)
+
+    def test_top_count_follows_runs_below_the_top(self):
+        best, worse = sorted([finished_run(6, 30), finished_run(7)], key=lambda replay: -replay.score)
+        client, _ = self.submit([best])
+        self.assertEqual(client.top(1)["count"], 1)
+        client, _ = self.submit([worse])
+        board = client.top(1)
+        self.assertEqual(board["count"], 2)
+        self.assertEqual(board["top"][0]["score"], int(best.score))
+
+    def test_runs_in_the_log_are_loaded_again(self):
+        runs = [finished_run(8), finished_run(9, 35)]
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "leaderboard.jsonl")
+            self.restart(path)
+            self.submit(runs)
+            self.restart(path)
+            self.assertEqual(sorted(entry.score for entry in self.server.board.entries),
+                             sorted(replay.score for replay in runs))
+            # Known runs are not written again
+            self.submit(runs)
+            self.restart(None)
+            with open(path) as f:
+                self.assertEqual(len(f.readlines()), 2)
+
+if __name__ == "__main__":
+    unittest.main()
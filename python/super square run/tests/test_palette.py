@@ -0,0 +1,67 @@
+"""The colour tables: each shade is made once, and every drawing module shares the one palette."""
+import sys
+import unittest
+
+try:
+    import numpy as np
+    import soft_raylib
+    if "raylibpy" not in sys.modules:
+        soft_raylib.install(scale=0.25)
+except ImportError:  # numpy is only needed for the batch tools
+    np = None
+
+def drawing_on_soft_raylib():
+    return np is not None and sys.modules.get("raylibpy") is soft_raylib
+
+def entries(palette):
+    """Every colour the palette has made so far."""
+    made = [shade for ramp in palette.ramps.values() for shade in ramp if shade is not None]
+    made += [shade for shade in palette.grays if shade is not None]
+    return made + list(palette.colors.values())
+
+@unittest.skipUnless(drawing_on_soft_raylib(), "needs numpy, and raylibpy not already imported")
+class PaletteTest(unittest.TestCase):
+    def test_lookups_return_the_same_color(self):
+        import raylibpy as rl
+        from palette import Palette
+
+        palette = Palette()
+        self.assertEqual(entries(palette), [])
+        shade = palette.alpha(rl.Color(10, 20, 30, 255), 128)
+        self.assertEqual((shade.r, shade.g, shade.b, shade.a), (10, 20, 30, 128))
+        # Another Color with the same rgb reads the same ramp
+        self.assertIs(palette.alpha(rl.Color(10, 20, 30, 40), 128), shade)
+        self.assertEqual(list(palette.ramps), [(10, 20, 30)])
+        self.assertIs(palette.gray(90), palette.gray(90))
+        self.assertIs(palette.rgb(1, 2, 3), palette.rgb(1, 2, 3))
+        self.assertIs(palette.darker(rl.Color(50, 60, 70, 255), 40), palette.rgb(10, 20, 30))
+        self.assertEqual(len(entries(palette)), 4)
+
+    def test_modules_share_one_palette(self):
+        import main
+        import palette
+        import spectator
+
+        self.assertIs(main.PALETTE, palette.PALETTE)
+        self.assertIs(spectator.PALETTE, palette.PALETTE)
+
+    def test_drawing_a_frame_again_makes_no_colors(self):
+        from engine import simple_policy
+        from main import Game
+        from palette import PALETTE
+
+        game = Game(persistent=False)
+        game.reset(31)
+        for _ in range(400):
+            game.step(simple_policy(game))
+        saved = game.snapshot()
+        game.draw()
+        made = entries(PALETTE)
+        self.assertTrue(made)
+        for _ in range(3):
+            game.restore(saved)
+            game.draw()
+            self.assertEqual([id(shade) for shade in entries(PALETTE)], [id(shade) for shade in made])
+
+if __name__ == "__main__":
+    unittest.main()
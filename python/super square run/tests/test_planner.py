@@ -0,0 +1,35 @@
+"""The autopilot: searching leaves the run alone, and with time to spare it decides the same way every time."""
+import unittest
+
+from engine import Simulation, ACTION_NONE
+from planner import Planner, play
+
+def planner():
+    # A budget no search uses up, so the beam always gets to the horizon
+    return Planner(horizon=60, time_budget=10.0)
+
+class PlannerTest(unittest.TestCase):
+    def test_search_does_not_change_the_run(self):
+        sim = Simulation(5)
+        for _ in range(200):
+            sim.step(ACTION_NONE)
+        saved = sim.snapshot()
+        action, survives = planner().search(sim)
+        self.assertEqual(sim.snapshot(), saved)
+        self.assertTrue(survives)
+
+    def test_same_seed_same_decisions(self):
+        first, _ = play(5, planner(), max_ticks=600)
+        second, _ = play(5, planner(), max_ticks=600)
+        self.assertEqual(first.snapshot(), second.snapshot())
+
+    def test_outlives_doing_nothing(self):
+        idle = Simulation(5)
+        while idle.step(ACTION_NONE):
+            pass
+        sim, search_times = play(5, planner(), max_ticks=idle.game_time * 3)
+        self.assertEqual(sim.game_time, idle.game_time * 3)
+        self.assertTrue(search_times)
+
+if __name__ == "__main__":
+    unittest.main()
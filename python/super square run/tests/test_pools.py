@@ -0,0 +1,39 @@
+"""Entity pools: released objects come back out, and a run spawns without allocating."""
+import unittest
+
+from engine import Pool, Bullet, Simulation, simple_policy, ACTION_SHOOT
+
+class PoolTest(unittest.TestCase):
+    def test_released_objects_are_reused(self):
+        pool = Pool(Bullet, 2)
+        first = pool.acquire()
+        second = pool.acquire()
+        pool.release(first)
+        self.assertIs(pool.acquire(), first)
+        pool.release(second)
+        self.assertIs(pool.acquire(), second)
+
+    def test_an_empty_pool_still_hands_out_objects(self):
+        pool = Pool(Bullet, 1)
+        first = pool.acquire()
+        self.assertIsNot(pool.acquire(), first)
+
+    def test_release_keeps_at_most_capacity(self):
+        pool = Pool(Bullet, 2)
+        extra = [Bullet() for _ in range(3)]
+        for bullet in extra:
+            pool.release(bullet)
+        self.assertEqual(len(pool.free), 2)
+
+    def test_a_run_only_uses_the_objects_made_up_front(self):
+        sim = Simulation(8)
+        made = {id(item) for pool in (sim.obstacle_pool, sim.buff_pool, sim.cloud_pool,
+                                       sim.dinosaur.bullet_pool) for item in pool.free}
+        sim.dinosaur.activate_buff("weapon")
+        for _ in range(3000):
+            sim.step(simple_policy(sim) | (ACTION_SHOOT if sim.game_time % 10 == 0 else 0))
+            seen = sim.obstacles + sim.buffs + sim.clouds + sim.dinosaur.bullets
+            self.assertTrue({id(item) for item in seen} <= made)
+
+if __name__ == "__main__":
+    unittest.main()
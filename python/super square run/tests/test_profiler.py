@@ -0,0 +1,46 @@
+"""Collector pauses that land in the middle of recording a call."""
+import unittest
+
+from profiler import Profiler
+
+class Worker:
+    def __init__(self, profiler):
+        self.profiler = profiler
+
+    def work(self):
+        # What the collector does when it runs on this thread during the call
+        self.profiler.on_gc("start", {"generation": 0})
+        self.profiler.on_gc("stop", {"generation": 0})
+
+class ProfilerTest(unittest.TestCase):
+    def test_gc_pause_inside_a_call_gets_its_own_trace_slot(self):
+        profiler = Profiler(trace_events=8)
+        worker = Worker(profiler)
+        profiler.instrument(worker, ["work"])
+        profiler.enable()
+        try:
+            for _ in range(3):
+                worker.work()
+        finally:
+            profiler.disable()
+        names = [name for name, _, _, _ in profiler.trace_events()]
+        self.assertEqual(names.count("work"), 3)
+        self.assertEqual(names.count("gc gen0"), 3)
+        summary = profiler.summary()
+        self.assertEqual(summary["gc"]["collections"], 3)
+        self.assertEqual(summary["sections"]["work"]["count"], 3)
+
+    def test_pause_after_the_last_call_waits_for_the_frame(self):
+        profiler = Profiler()
+        profiler.enable()
+        try:
+            profiler.on_gc("start", {"generation": 2})
+            profiler.on_gc("stop", {"generation": 2})
+            self.assertEqual(profiler.trace_events(), [])
+            profiler.end_frame()
+        finally:
+            profiler.disable()
+        self.assertEqual([name for name, _, _, _ in profiler.trace_events()], ["gc gen2"])
+
+if __name__ == "__main__":
+    unittest.main()
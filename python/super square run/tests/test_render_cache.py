@@ -0,0 +1,65 @@
+"""Number labels: formatted and painted again only when the number as shown changes."""
+import sys
+import unittest
+
+try:
+    import numpy as np
+    import soft_raylib
+    if "raylibpy" not in sys.modules:
+        soft_raylib.install(scale=0.25)
+except ImportError:  # numpy is only needed for the batch tools
+    np = None
+
+def drawing_on_soft_raylib():
+    return np is not None and sys.modules.get("raylibpy") is soft_raylib
+
+@unittest.skipUnless(drawing_on_soft_raylib(), "needs numpy, and raylibpy not already imported")
+class NumberTextTest(unittest.TestCase):
+    def test_text_is_only_formatted_when_the_shown_value_changes(self):
+        from render_cache import NumberText
+
+        label = NumberText("SCORE: {}")
+        text = label.get(41.2)
+        self.assertEqual(text, "SCORE: 41")
+        # The same string object back while int(value) stays put
+        self.assertIs(label.get(41.9), text)
+        self.assertIs(label.get(41), text)
+        self.assertEqual(label.get(42.0), "SCORE: 42")
+
+    def test_digits_round_before_comparing(self):
+        from render_cache import NumberText
+
+        label = NumberText("{:.1f}x", digits=1)
+        text = label.get(1.23)
+        self.assertEqual(text, "1.2x")
+        self.assertIs(label.get(1.249), text)
+        self.assertEqual(label.get(1.25001), "1.3x")
+
+    def test_draw_label_repaints_only_on_new_text(self):
+        import raylibpy as rl
+        import render_cache
+        from render_cache import NumberText, TextCache
+
+        painted = []
+        paint_text = render_cache.paint_text
+        def counting_paint(*args):
+            painted.append(args[2])
+            paint_text(*args)
+
+        render_cache.paint_text = counting_paint
+        text = TextCache()
+        label = NumberText("SCORE: {}")
+        try:
+            text.begin()
+            for value in (1, 1.5, 1.9, 2, 2.4, 10, 10.1):
+                label.get(value)
+                text.draw_label(label, 10, 10, 20, rl.WHITE)
+            text.end()
+        finally:
+            render_cache.paint_text = paint_text
+            label.unload()
+            text.unload()
+        self.assertEqual(painted, ["SCORE: 1", "SCORE: 2", "SCORE: 10"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""Seeded runs, replay files and seeking: the same seed and inputs always give the same run."""
+import os
+import tempfile
+import unittest
+import zlib
+
+from engine import Simulation, simple_policy, run, ACTION_SHOOT
+from replay import Replay, ReplayPlayer, verify, HEADER, MAGIC, FORMAT_VERSION
+
+def played(seed, actions):
+    sim = Simulation(seed)
+    for action in actions:
+        sim.step(action)
+    return sim
+
+def policy(sim):
+    # The simple bot, shooting now and then so a weapon pickup gets used
+    return simple_policy(sim) | (ACTION_SHOOT if sim.game_time % 25 == 0 else 0)
+
+class SeededRunTest(unittest.TestCase):
+    def test_same_seed_same_run(self):
+        first = run(policy, seed=11)
+        second = run(policy, seed=11)
+        self.assertEqual(first.game_time, second.game_time)
+        self.assertEqual(first.score, second.score)
+        self.assertEqual(first.snapshot(), second.snapshot())
+        self.assertNotEqual(run(policy, seed=12).snapshot(), first.snapshot())
+
+    def test_reset_starts_the_seed_over(self):
+        sim = run(policy, seed=13)
+        actions = bytes(sim.input_log)
+        sim.reset(13)
+        for action in actions:
+            sim.step(action)
+        self.assertEqual(sim.snapshot(), played(13, actions).snapshot())
+
+class ReplayTest(unittest.TestCase):
+    def setUp(self):
+        self.sim = run(policy, seed=21)
+        self.replay = Replay.from_simulation(self.sim)
+
+    def test_file_round_trip(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "run.ssr")
+            self.replay.save(path)
+            loaded = Replay.load(path)
+        self.assertEqual((loaded.seed, loaded.actions, loaded.score, loaded.rules_version),
+                         (self.replay.seed, self.replay.actions, self.replay.score, self.replay.rules_version))
+        self.assertEqual(verify(loaded), (True, self.sim.score))
+
+    def test_changed_replays_are_caught(self):
+        self.assertFalse(verify(Replay(self.replay.seed, self.replay.actions, self.replay.score + 1))[0])
+        with self.assertRaises(ValueError):
+            Replay.from_bytes(b"XXXX" + self.replay.to_bytes()[4:])
+        # An input log one tick short of its header
+        replay = self.replay
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, replay.rules_version, replay.seed,
+                             len(replay.actions), replay.score)
+        with self.assertRaises(ValueError):
+            Replay.from_bytes(header + zlib.compress(replay.actions[:-1]))
+
+    def test_seek_matches_playing_from_the_start(self):
+        player = ReplayPlayer(self.replay, keyframe_interval=250)
+        length = player.length
+        # Forwards, backwards, onto keyframes and between them, and past the end
+        for tick in (length, 0, 1, 249, 250, 251, length // 2, 700, length - 1, length + 10):
+            sim = player.seek(tick)
+            expected = played(self.replay.seed, self.replay.actions[:min(tick, length)])
+            self.assertEqual(sim.snapshot(), expected.snapshot(), f"tick {tick}")
+            self.assertEqual(player.tick, min(tick, length))
+
+    def test_keyframes_are_taken_as_playback_gets_to_them(self):
+        player = ReplayPlayer(self.replay, keyframe_interval=250)
+        self.assertEqual(list(player.keyframes), [0])
+        # Backwards within what was played, then on past the last keyframe taken
+        for tick in (520, 260, 900, 10):
+            sim = player.seek(tick)
+            expected = played(self.replay.seed, self.replay.actions[:tick])
+            self.assertEqual(sim.snapshot(), expected.snapshot(), f"tick {tick}")
+        self.assertEqual(sorted(player.keyframes), [0, 250, 500, 750])
+
+if __name__ == "__main__":
+    unittest.main()
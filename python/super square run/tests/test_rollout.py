@@ -0,0 +1,48 @@
+"""Rollout sweeps: every parameter changes the runs it is meant to, and nothing leaks between configs."""
+import unittest
+
+try:
+    import numpy as np
+    from rollout import rollout, check_params, config_curve, config_sim, COLUMN
+except ImportError:  # numpy is only needed for the batch tools
+    np = None
+
+from difficulty import DEFAULT_CURVE
+from engine import Buff
+
+@unittest.skipIf(np is None, "needs numpy")
+class SweepParamsTest(unittest.TestCase):
+    def test_obstacle_frequency_changes_the_curve(self):
+        curve = config_curve(DEFAULT_CURVE, {"obstacle_frequency": 60, "max_obstacles": 4})
+        self.assertEqual(curve.base_obstacle_frequency, 60)
+        self.assertEqual(curve.row(1).obstacle_frequency, DEFAULT_CURVE.row(1).obstacle_frequency - 40)
+
+    def test_unknown_or_per_tick_names_are_rejected(self):
+        check_params({"game_speed_increment": 0.001, "late_buff_weights": [1, 0, 0, 0], "max_buffs": 2})
+        for name in ("obstacle_timer", "game_speed", "speed_per_levle"):
+            with self.assertRaises(ValueError):
+                check_params({name: 1})
+
+    def test_simulation_settings_are_made_in_not_set_on(self):
+        sims = {}
+        small = config_sim({"max_obstacles": 3, "speed_per_level": 1.0}, sims)
+        default = config_sim({}, sims)
+        self.assertIs(config_sim({"speed_per_level": 2.0}, sims), default)
+        self.assertEqual((small.max_obstacles, small.obstacle_pool.capacity, small.obstacle_bounds.capacity),
+                         (3, 4, 4))
+        self.assertEqual(default.max_obstacles, 12)
+
+    def test_buff_weights_come_from_the_curve(self):
+        curve = config_curve(DEFAULT_CURVE, {"late_buff_weights": [0, 0, 0, 1]})
+        self.assertEqual({Buff(800, 5, rolls=(0.5, 0.5, roll), curve=curve).type
+                          for roll in (0.0, 0.3, 0.6, 0.99)}, {"weapon"})
+
+    def test_sweep_changes_only_its_own_runs(self):
+        configs = [{}, {"obstacle_frequency": 60, "max_obstacles": 6}, {}]
+        results = rollout(configs, 4, max_ticks=3000, workers=1, chunk_size=3, checkpoint=None)
+        first, swept, again = (results[results[:, COLUMN["config"]] == i][:, 1:] for i in range(3))
+        self.assertTrue((first == again).all())
+        self.assertFalse((first == swept).all())
+
+if __name__ == "__main__":
+    unittest.main()
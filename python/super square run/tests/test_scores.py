@@ -0,0 +1,86 @@
+"""The score store against plain Python lists."""
+import os
+import random
+import tempfile
+import unittest
+
+from difficulty import DifficultyCurve, DEFAULT_CURVE
+from engine import Simulation
+from scores import ScoreStore, RunRecord, legacy_high_score
+
+class ScoreStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, "scores.db")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_queries_match_a_sorted_list(self):
+        rng = random.Random(7)
+        scores = [rng.randrange(0, 5000) for _ in range(200)]
+        store = ScoreStore(self.path)
+        for index, score in enumerate(scores):
+            store.add(RunRecord(score, 1 + score // 500, score * 3, seed=index,
+                                curve="gentle" if index % 4 == 0 else "default"))
+        store.close()
+
+        store = ScoreStore(self.path, background=False)
+        ranked = sorted(scores, reverse=True)
+        self.assertEqual(store.count(), len(scores))
+        self.assertEqual(store.best, ranked[0])
+        self.assertEqual([record.score for record in store.top(10)], ranked[:10])
+        for score in (ranked[0], ranked[57], ranked[-1], ranked[0] + 1, -1):
+            self.assertEqual(store.rank(score), sum(1 for other in scores if other > score) + 1)
+        ascending = ranked[::-1]
+        self.assertEqual(store.percentiles((0, 50, 100)),
+                         {0: ascending[0], 50: ascending[len(scores) // 2 - 1], 100: ascending[-1]})
+
+        gentle = sorted((score for index, score in enumerate(scores) if index % 4 == 0), reverse=True)
+        self.assertEqual([record.score for record in store.top(5, curve="gentle")], gentle[:5])
+        self.assertTrue(all(record.curve == "gentle" for record in store.top(100, curve="gentle")))
+        self.assertEqual(store.best_score("gentle"), gentle[0])
+        self.assertEqual(store.count("gentle"), len(gentle))
+        store.close()
+
+    def test_empty_store(self):
+        store = ScoreStore(self.path, background=False)
+        self.assertEqual(store.best, 0)
+        self.assertEqual(store.top(), [])
+        self.assertEqual(store.rank(100), 1)
+        self.assertEqual(store.percentiles((0, 50, 100)), {0: 0, 50: 0, 100: 0})
+        store.close()
+
+    def test_a_bad_record_does_not_stop_the_writer(self):
+        store = ScoreStore(self.path)
+        bad = RunRecord(100, 1, 300, seed=1)
+        bad.autopilot = "sometimes"  # row() can't make an int of it
+        store.add(bad)
+        store.add(RunRecord(200, 1, 600, seed=2))
+        store.flush()
+        self.assertEqual([record.seed for record in store.top()], [2])
+        store.close()
+
+    def test_runs_are_filed_under_their_curve(self):
+        def curve_of(curve):
+            return RunRecord.from_simulation(Simulation(seed=1, curve=curve)).curve
+
+        self.assertEqual(curve_of(None), "default")
+        self.assertEqual(curve_of(DEFAULT_CURVE), "default")
+        self.assertEqual(curve_of(DifficultyCurve("gentle", speed_per_level=0.5)), "gentle")
+        # Not the built-in curve, whatever it calls itself
+        self.assertEqual(curve_of(DifficultyCurve(speed_per_level=3.0)), "custom")
+        self.assertEqual(curve_of(DEFAULT_CURVE.with_params(speed_per_level=3.0)), "custom")
+
+    def test_legacy_high_score(self):
+        path = os.path.join(self.folder.name, "highscore.txt")
+        self.assertEqual(legacy_high_score(path), 0)
+        with open(path, "w") as f:
+            f.write("not a number \x00")
+        self.assertEqual(legacy_high_score(path), 0)
+        with open(path, "w") as f:
+            f.write("1234")
+        self.assertEqual(legacy_high_score(path), 1234)
+
+if __name__ == "__main__":
+    unittest.main()
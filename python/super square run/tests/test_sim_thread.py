@@ -0,0 +1,81 @@
+"""The simulation thread: ticking on its own thread plays the same run, input lands on the right tick."""
+import sys
+import time
+import unittest
+
+from engine import Simulation, TICK_TIME, ACTION_NONE, ACTION_JUMP, ACTION_DUCK, ACTION_SHOOT
+from sim_thread import SimulationThread, Frame
+
+try:
+    import numpy as np
+    import soft_raylib
+    if "raylibpy" not in sys.modules:
+        soft_raylib.install(scale=0.25)
+except ImportError:  # numpy is only needed for the batch tools
+    np = None
+
+class SimulationThreadTest(unittest.TestCase):
+    def setUp(self):
+        self.thread = SimulationThread()
+
+    def tearDown(self):
+        self.thread.close()
+
+    def test_ticks_match_a_plain_simulation(self):
+        self.thread.start(21)
+        time.sleep(0.25)
+        self.thread.stop()
+        latest = Simulation()
+        latest.restore(self.thread.frames[1].state)
+        self.assertGreater(latest.game_time, 0)
+
+        sim = Simulation(21)
+        while sim.game_time < latest.game_time:
+            sim.step(ACTION_NONE)
+        self.assertEqual(sim.snapshot(), latest.snapshot())
+
+    def test_input_goes_to_the_tick_it_was_read_before(self):
+        self.thread.send(0.5, ACTION_JUMP, 0)
+        self.thread.send(1.5, ACTION_SHOOT, ACTION_DUCK)
+        self.assertEqual(self.thread.take_input(1.0), ACTION_JUMP)
+        self.assertEqual(self.thread.take_input(2.0), ACTION_SHOOT | ACTION_DUCK)
+        # Duck stays held until input says otherwise
+        self.assertEqual(self.thread.take_input(3.0), ACTION_DUCK)
+
+    def test_show_goes_between_the_two_ticks(self):
+        sim = Simulation(22)
+        for _ in range(100):
+            sim.step(ACTION_NONE)
+        previous = sim.snapshot()
+        sim.step(ACTION_NONE)
+        latest = sim.snapshot()
+        self.thread.frames = (Frame(1.0, previous), Frame(1.0 + TICK_TIME, latest))
+
+        game = Simulation()
+        self.thread.show(game, 1.0 + 2 * TICK_TIME)
+        self.assertEqual(game.snapshot(), latest)
+        self.thread.show(game, 1.0 + TICK_TIME)
+        before = game.score
+        self.assertAlmostEqual(before, previous[0][Simulation.SNAPSHOT_FIELDS.index("score")])
+        self.thread.show(game, 1.0 + 1.5 * TICK_TIME)
+        self.assertAlmostEqual(game.score, (before + sim.score) / 2)
+
+    @unittest.skipUnless(np is not None and sys.modules.get("raylibpy") is soft_raylib,
+                         "needs numpy, and raylibpy not already imported")
+    def test_shown_game_only_restores(self):
+        from main import ShownGame
+
+        game = ShownGame(persistent=False)
+        self.thread.start(23)
+        for _ in range(20):
+            time.sleep(TICK_TIME)
+            self.thread.show(game, time.perf_counter())
+        self.thread.stop()
+        self.assertGreater(game.game_time, 0)
+        # No spawn chunks made ahead on the render thread's side
+        for stream in game.spawns.streams:
+            self.assertFalse(stream.background)
+            self.assertTrue(all(isinstance(chunk, list) for chunk in stream.chunks.values()))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+"""Snapshots of a run with pooled entities: restore, play on, and get the same run again."""
+import unittest
+
+from engine import Simulation, simple_policy, ACTION_SHOOT
+
+def policy(sim):
+    return simple_policy(sim) | (ACTION_SHOOT if sim.game_time % 10 == 0 else 0)
+
+def play(sim, ticks):
+    """Step ticks times with the bot, returning the snapshot after each step."""
+    states = []
+    for _ in range(ticks):
+        sim.step(policy(sim))
+        states.append(sim.snapshot())
+    return states
+
+class SnapshotTest(unittest.TestCase):
+    def test_restore_then_step_plays_the_same_ticks(self):
+        sim = Simulation(5)
+        play(sim, 400)
+        # Bullets in the air too, from a pooled dino
+        sim.dinosaur.activate_buff("weapon")
+        sim.step(ACTION_SHOOT)
+        saved = sim.snapshot()
+        ahead = play(sim, 600)
+
+        # The same snapshot can be restored any number of times, into a run that has
+        # moved on or into another one
+        for target in (sim, sim, Simulation(99)):
+            target.restore(saved)
+            self.assertEqual(target.snapshot(), saved)
+            self.assertEqual(play(target, 600), ahead)
+
+    def test_pooled_entities_are_never_shared(self):
+        sim = Simulation(6)
+        saved = sim.snapshot()
+        for _ in range(3):
+            sim.restore(saved)
+            play(sim, 1500)
+            # An entity is either in its list or back in its pool, never both or twice
+            for entities, pool in ((sim.obstacles, sim.obstacle_pool), (sim.buffs, sim.buff_pool),
+                                   (sim.clouds, sim.cloud_pool)):
+                self.assertLessEqual(len(pool.free), pool.capacity)
+                everything = entities + pool.free
+                self.assertEqual(len({id(entity) for entity in everything}), len(everything))
+
+    def test_a_snapshot_is_immutable(self):
+        def frozen(value):
+            if isinstance(value, tuple):
+                return all(frozen(item) for item in value)
+            return value is None or isinstance(value, (bool, int, float, str))
+
+        sim = Simulation(7)
+        play(sim, 300)
+        saved = sim.snapshot()
+        self.assertTrue(all(frozen(part) for part in saved[:5]))  # The random states aside
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+"""The NumPy rasterizer: blending and drawing a whole game frame the same way every time."""
+import sys
+import unittest
+
+try:
+    import numpy as np
+    import soft_raylib
+    if "raylibpy" not in sys.modules:
+        soft_raylib.install(scale=0.25)
+except ImportError:  # numpy is only needed for the batch tools
+    np = None
+
+def drawing_on_soft_raylib():
+    return np is not None and sys.modules.get("raylibpy") is soft_raylib
+
+@unittest.skipIf(np is None, "needs numpy")
+class BlendTest(unittest.TestCase):
+    def setUp(self):
+        self.texture = soft_raylib.Texture(8, 8)
+        self.texture.pixels = np.zeros((8, 8, 4), np.uint8)  # Whatever the scale
+        self.screen_target = soft_raylib.target
+        soft_raylib.target = self.texture
+
+    def tearDown(self):
+        soft_raylib.target = self.screen_target
+
+    def test_opaque_color_replaces(self):
+        region = self.texture.pixels
+        soft_raylib.blend(region, soft_raylib.Color(10, 20, 30, 255))
+        self.assertTrue((region == (10, 20, 30, 255)).all())
+        self.assertTrue(self.texture.drawn)
+
+    def test_translucent_color_mixes_premultiplied(self):
+        region = self.texture.pixels
+        region[:] = (200, 100, 0, 255)
+        soft_raylib.blend(region, soft_raylib.Color(0, 0, 255, 51))
+        # 0.8 of what was there plus 0.2 of the color, rounded
+        self.assertEqual(tuple(region[0, 0]), (160, 80, 51, 255))
+
+    def test_mask_only_touches_its_pixels(self):
+        region = self.texture.pixels
+        mask = np.zeros(region.shape[:2], bool)
+        mask[2:4, 2:4] = True
+        soft_raylib.blend(region, soft_raylib.Color(255, 255, 255, 255), mask)
+        self.assertEqual(int(region[:, :, 3].astype(bool).sum()), 4)
+
+@unittest.skipUnless(drawing_on_soft_raylib(), "needs numpy, and raylibpy not already imported")
+class FrameTest(unittest.TestCase):
+    def test_same_state_same_frame(self):
+        from engine import simple_policy
+        from main import Game
+
+        game = Game(persistent=False)
+        game.reset(31)
+        for _ in range(400):
+            game.step(simple_policy(game))
+        saved = game.snapshot()
+        game.draw()
+        first = soft_raylib.frame().copy()
+        self.assertEqual(first.shape, (125, 200, 3))
+        self.assertGreater(len(np.unique(first.reshape(-1, 3), axis=0)), 3)
+
+        for _ in range(30):
+            game.step(simple_policy(game))
+        game.draw()
+        self.assertFalse((soft_raylib.frame() == first).all())
+        game.restore(saved)
+        game.draw()
+        self.assertTrue((soft_raylib.frame() == first).all())
+
+if __name__ == "__main__":
+    unittest.main()
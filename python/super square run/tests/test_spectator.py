@@ -0,0 +1,79 @@
+"""Spectator mode: the tile grid, each tile's run seeds, and counting finished runs."""
+import sys
+import unittest
+
+from engine import Simulation, ACTION_NONE, TICK_TIME, SCREEN_WIDTH, SCREEN_HEIGHT
+
+try:
+    import numpy as np
+    import soft_raylib
+    if "raylibpy" not in sys.modules:
+        soft_raylib.install(scale=0.25)
+except ImportError:  # numpy is only needed for the batch tools
+    np = None
+
+def drawing_on_soft_raylib():
+    return np is not None and sys.modules.get("raylibpy") is soft_raylib
+
+@unittest.skipUnless(drawing_on_soft_raylib(), "needs numpy, and raylibpy not already imported")
+class SpectatorTest(unittest.TestCase):
+    def test_layout_fills_the_window_without_overlap(self):
+        from spectator import layout, TILE_GAP
+
+        for count, width, height in ((1, 800, 500), (4, 1280, 720), (7, 1920, 1080), (12, 1000, 1000)):
+            viewports = layout(count, width, height)
+            self.assertEqual(len(viewports), count)
+            for i, view in enumerate(viewports):
+                # The screen's shape, inside the window
+                self.assertEqual((view.width, view.height),
+                                 (int(SCREEN_WIDTH * view.zoom), int(SCREEN_HEIGHT * view.zoom)))
+                self.assertTrue(0 <= view.x and view.x + view.width <= width)
+                self.assertTrue(0 <= view.y and view.y + view.height <= height)
+                for other in viewports[:i]:
+                    apart = (view.x >= other.x + other.width + TILE_GAP or
+                             other.x >= view.x + view.width + TILE_GAP or
+                             view.y >= other.y + other.height + TILE_GAP or
+                             other.y >= view.y + view.height + TILE_GAP)
+                    self.assertTrue(apart)
+        # A wide window puts two tiles side by side, a tall one stacks them
+        wide = layout(2, 1600, 500)
+        self.assertEqual(wide[0].y, wide[1].y)
+        tall = layout(2, 800, 1000)
+        self.assertEqual(tall[0].x, tall[1].x)
+
+    def test_run_seeds(self):
+        from spectator import run_seed
+
+        tiles = 4
+        seeds = [run_seed(10, tile, run, tiles, False) for tile in range(tiles) for run in range(5)]
+        self.assertEqual(len(set(seeds)), len(seeds))
+        for run in range(5):
+            shared = {run_seed(10, tile, run, tiles, True) for tile in range(tiles)}
+            self.assertEqual(shared, {10 + run})
+
+    def test_tile_counts_each_run_once(self):
+        from render_cache import Viewport
+        from spectator import Tile
+
+        tile = Tile(0, Viewport(0, 0, 200, 125, 0.25), None, "bot")
+        self.assertFalse(tile.show(0.0))
+        sim = Simulation()
+        stamp = 0.0
+        scores = []
+        for seed in (3, 4):
+            sim.reset(seed)
+            playing = True
+            while playing:
+                playing = sim.step(ACTION_NONE)
+                stamp += TICK_TIME
+                tile.push(stamp, sim.snapshot())
+                self.assertTrue(tile.show(stamp + TICK_TIME))
+            scores.append(int(sim.score))
+            # The finished run stays on screen for a while
+            for _ in range(5):
+                tile.show(stamp + TICK_TIME)
+        self.assertEqual(tile.runs, 2)
+        self.assertEqual(tile.best, max(scores))
+
+if __name__ == "__main__":
+    unittest.main()